@@ -8,6 +8,21 @@ from django.utils.safestring import mark_safe
 from .models import WeatherSite, WeatherData, WeatherForecast, WeatherAlert
 
 
+class TimeSeriesAdminMixin:
+    """Admin for models that may be routed to the time-series database (weather.db), where
+    the site table can't be joined: sites are prefetched and searched by id instead."""
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('site')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        site_ids = list(WeatherSite.objects.filter(name__icontains=search_term).values_list('id', flat=True))
+        return queryset.filter(site_id__in=site_ids), False
+
+
 @admin.register(WeatherSite)
 class WeatherSiteAdmin(admin.ModelAdmin):
     list_display = [
@@ -51,8 +66,7 @@ class WeatherSiteAdmin(admin.ModelAdmin):
     
     def latest_weather(self, obj):
         """Display latest weather data for the site"""
-        # Relies on WeatherData.Meta.ordering = ['-timestamp']
-        latest = obj.weather_data.first()
+        latest = getattr(obj, 'latest_observation', None)
         if latest:
             return format_html(
                 '<span style="color: #0B74B0;">{}°C</span> | <span style="color: #75479C;">{}%</span>',
@@ -63,11 +77,12 @@ class WeatherSiteAdmin(admin.ModelAdmin):
     latest_weather.short_description = "Latest Weather (Temp | Humidity)"
     
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('weather_data')
+        # The snapshot row is joined in; prefetching weather_data would load every observation.
+        return super().get_queryset(request).select_related('latest_observation')
 
 
 @admin.register(WeatherData)
-class WeatherDataAdmin(admin.ModelAdmin):
+class WeatherDataAdmin(TimeSeriesAdminMixin, admin.ModelAdmin):
     list_display = [
         'site', 'timestamp', 'temperature', 'humidity', 
         'wind_speed', 'pressure', 'precipitation', 'weather_status'
@@ -144,7 +159,7 @@ class WeatherDataAdmin(admin.ModelAdmin):
 
 
 @admin.register(WeatherForecast)
-class WeatherForecastAdmin(admin.ModelAdmin):
+class WeatherForecastAdmin(TimeSeriesAdminMixin, admin.ModelAdmin):
     list_display = ['site', 'forecast_time', 'temperature_range', 'precipitation', 'created_at']
     list_filter = ['site', 'forecast_time', 'created_at']
     search_fields = ['site__name']
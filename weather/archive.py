@@ -0,0 +1,139 @@
+# weather/archive.py
+import logging
+import os
+from datetime import timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import models
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import WeatherData
+from .rollups import _bucket_starts, bucket_floor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed to write or read the Parquet archive
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Every measured WeatherData column, stored as float32.
+ARCHIVE_FIELDS = [field.attname for field in WeatherData._meta.concrete_fields if isinstance(field, models.FloatField)]
+ARCHIVE_FILE_NAME = 'part-0.parquet'
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'WEATHER_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')))
+
+
+@lru_cache(maxsize=None)
+def _warn_missing_pyarrow(archive_dir):
+    logger.warning(f"Parquet archive at {archive_dir} is not read: pyarrow is not installed (pip install pyarrow).")
+
+
+def archive_available():
+    """True when pyarrow is installed and archive_weather has written something to read."""
+    if not os.path.isdir(get_archive_dir()):
+        return False
+    if pq is None:
+        _warn_missing_pyarrow(get_archive_dir())
+        return False
+    return True
+
+
+def _next_month(month_start):
+    return (month_start + timedelta(days=32)).replace(day=1)
+
+
+def month_path(site_id, month_start):
+    """Hive-style partition path: <archive>/site=<id>/month=<YYYY-MM>/part-0.parquet."""
+    return os.path.join(get_archive_dir(), f"site={site_id}", f"month={month_start:%Y-%m}", ARCHIVE_FILE_NAME)
+
+
+def closed_months(site_id, before=None):
+    """Start of every calendar month (UTC) with stored observations for ``site_id`` that ended
+    before ``before`` (default: the start of the current month)."""
+    before = bucket_floor(before or timezone.now(), 'month')
+    oldest = WeatherData.objects.filter(site_id=site_id).aggregate(oldest=Min('timestamp'))['oldest']
+    months = []
+    month = bucket_floor(oldest, 'month') if oldest else before
+    while month < before:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def archive_month(site_id, month_start, overwrite=False):
+    """Write the site's observations for the month starting at ``month_start`` to Parquet.
+
+    Measurements are float32 and site_id is dictionary-encoded. The file is written next to its
+    final path and renamed into place, so readers never see a partial file. Returns
+    (rows, bytes) written, or None when the month is already archived and ``overwrite`` is off.
+    """
+    if pq is None:
+        raise RuntimeError("Archiving weather data needs pyarrow (pip install pyarrow).")
+    path = month_path(site_id, month_start)
+    if os.path.exists(path) and not overwrite:
+        return None
+    rows = list(
+        WeatherData.objects.filter(site_id=site_id, timestamp__gte=month_start, timestamp__lt=_next_month(month_start))
+        .order_by('timestamp').values_list('timestamp', *ARCHIVE_FIELDS)
+    )
+    if not rows:
+        return 0, 0
+    columns = list(zip(*rows))
+    table = pa.table({
+        'timestamp': pa.array(columns[0], type=pa.timestamp('ms', tz='UTC')),
+        'site_id': pa.DictionaryArray.from_arrays(pa.array(np.zeros(len(rows), dtype=np.int8)), pa.array([site_id], type=pa.int32())),
+        **{field: pa.array(values, type=pa.float32()) for field, values in zip(ARCHIVE_FIELDS, columns[1:])},
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, partial, compression='zstd', use_dictionary=['site_id'])
+    os.replace(partial, path)
+    return len(rows), os.path.getsize(path)
+
+
+def read_archive(site_id, fields, start, end):
+    """Archived observations for ``site_id`` with start <= timestamp < end.
+
+    Returns (timestamps, {field: values}) as NumPy arrays: UTC datetime64[ms] and float32 with NaN
+    for missing values. Files are memory-mapped, and only the requested columns of the months
+    overlapping the range are read.
+    """
+    tables = []
+    month = bucket_floor(start, 'month')
+    while month < end:
+        path = month_path(site_id, month)
+        if os.path.exists(path):
+            tables.append(pq.read_table(path, columns=['timestamp', *fields], memory_map=True))
+        month = _next_month(month)
+    if not tables:
+        return np.array([], dtype='datetime64[ms]'), {field: np.array([], dtype=np.float32) for field in fields}
+    table = pa.concat_tables(tables)
+    timestamps = table.column('timestamp').to_numpy()
+    start, end = (np.datetime64(moment.astimezone(dt_timezone.utc).replace(tzinfo=None), 'ms') for moment in (start, end))
+    in_range = (timestamps >= start) & (timestamps < end)
+    values = {field: table.column(field).to_numpy().astype(np.float32, copy=False)[in_range] for field in fields}
+    return timestamps[in_range], values
+
+
+def archived_series(site_id, field, start, end, resolution=None):
+    """(labels, values) for ``field`` from the archive, shaped like the rollup or raw series the
+    chart endpoints build: bucket means per ``resolution`` ('hour', 'day', 'month'), or raw rows
+    when it is None. Empty buckets and missing raw values are skipped."""
+    if not archive_available():
+        return [], []
+    timestamps, values = read_archive(site_id, [field], start, end)
+    series = pd.Series(values[field].astype(np.float64), index=pd.DatetimeIndex(timestamps).tz_localize('UTC')).dropna()
+    if series.empty:
+        return [], []
+    if resolution:
+        series = series.groupby(_bucket_starts(series.index.to_series(), resolution)).mean()
+    # Rounded to drop float32 noise (21.299999237 -> 21.3); observations carry at most two decimals.
+    return [moment.isoformat() for moment in series.index], series.round(3).tolist()
@@ -0,0 +1,140 @@
+# weather/backfill.py
+import logging
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import BackfillCheckpoint, HourlyRollup, WeatherData
+from .observations import save_observations
+from .utils import get_weather_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 31
+# Days the reanalysis archive trails real time; later hours come back empty and are skipped.
+ARCHIVE_DELAY_DAYS = 5
+
+# WeatherData field -> Open-Meteo archive hourly variable. The archive has no UV index or visibility.
+BACKFILL_FIELD_MAP = {
+    'temperature': 'temperature_2m',
+    'humidity': 'relative_humidity_2m',
+    'wind_speed': 'wind_speed_10m',
+    'wind_direction': 'wind_direction_10m',
+    'pressure': 'surface_pressure',
+    'precipitation': 'precipitation',
+    'cloud_cover': 'cloud_cover',
+    'feels_like': 'apparent_temperature',
+    'dew_point': 'dew_point_2m',
+}
+
+
+def date_windows(start, end, days=DEFAULT_WINDOW_DAYS):
+    """(first, last) date pairs of at most ``days`` days covering start..end inclusive."""
+    windows = []
+    first = start
+    while first <= end:
+        last = min(end, first + timedelta(days=days - 1))
+        windows.append((first, last))
+        first = last + timedelta(days=1)
+    return windows
+
+
+def _checkpoints(sites, start, end):
+    """{site id: last day already stored (or None)} for this date range, creating missing checkpoints."""
+    existing = dict(
+        BackfillCheckpoint.objects.filter(site__in=sites, start_date=start, end_date=end)
+        .values_list('site_id', 'completed_through')
+    )
+    BackfillCheckpoint.objects.bulk_create([
+        BackfillCheckpoint(site=site, start_date=start, end_date=end) for site in sites if site.id not in existing
+    ])
+    return {site.id: existing.get(site.id) for site in sites}
+
+
+def _day_start(day):
+    return datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+
+
+def _observed_hours(site_ids, first, last):
+    """{site id: unix seconds of each hour in first..last that already has an hourly rollup}."""
+    hours = {}
+    buckets = HourlyRollup.objects.filter(
+        site_id__in=site_ids, bucket_start__gte=_day_start(first), bucket_start__lt=_day_start(last + timedelta(days=1))
+    ).values_list('site_id', 'bucket_start')
+    for site_id, bucket_start in buckets:
+        hours.setdefault(site_id, []).append(int(bucket_start.timestamp()))
+    return {site_id: np.array(seconds, dtype=np.int64) for site_id, seconds in hours.items()}
+
+
+def build_backfill_observations(site, hourly, skip_seconds=None):
+    """Unsaved WeatherData rows for one get_archive_hourly_many() result.
+
+    Hours with no value at all (past the archive's delay) and hours in ``skip_seconds`` are
+    left out. Values are rounded to two decimals to drop float32 noise.
+    """
+    axis = hourly["time"]
+    seconds = axis["start"] + np.arange(axis["count"], dtype=np.int64) * axis["interval"]
+    columns = {}
+    for field, param in BACKFILL_FIELD_MAP.items():
+        values = hourly.get(param)
+        if values is None or len(values) != len(seconds):
+            values = np.full(len(seconds), np.nan)
+        columns[field] = np.round(np.asarray(values, dtype=np.float64), 2)
+    keep = ~np.isnan(np.vstack(list(columns.values()))).all(axis=0)
+    if skip_seconds is not None and len(skip_seconds):
+        keep &= ~np.isin(seconds, skip_seconds)
+    if not keep.any():
+        return []
+    timestamps = pd.to_datetime(seconds[keep], unit="s", utc=True).to_pydatetime()
+    # NaN -> None on the way to Python floats, as NumpyJSONEncoder does.
+    values = {field: np.where(np.isnan(column[keep]), None, column[keep]).tolist() for field, column in columns.items()}
+    return [
+        WeatherData(site=site, timestamp=timestamp, **{field: values[field][i] for field in values})
+        for i, timestamp in enumerate(timestamps)
+    ]
+
+
+def backfill_observations(sites, start, end, window_days=DEFAULT_WINDOW_DAYS, client=None, pause=0):
+    """Load hourly history for ``sites`` from start to end (dates, inclusive) from the archive API.
+
+    The range is fetched in ``window_days`` windows, each one request per client batch of sites.
+    A window's rows go in with one save_observations() call (bulk insert, rollups and snapshots in
+    one transaction) and each site's BackfillCheckpoint advances with it, so a rerun with the same
+    range starts after the last stored window. Hours that already have an hourly rollup, from
+    ingestion or an earlier run, are skipped, so nothing is counted twice.
+
+    Yields (first, last, site_count, rows) after each window is stored; upstream errors propagate.
+    """
+    client = client or get_weather_client()
+    sites = list(sites)
+    done = _checkpoints(sites, start, end)
+    alias = router.db_for_write(BackfillCheckpoint)
+    for first, last in date_windows(start, end, window_days):
+        pending = [site for site in sites if done[site.id] is None or done[site.id] < last]
+        if not pending:
+            continue
+        history = client.get_archive_hourly_many(pending, list(BACKFILL_FIELD_MAP.values()), first, last)
+        observed = _observed_hours([site.id for site in pending], first, last)
+        rows, stored = [], []
+        for site in pending:
+            if site.id not in history:
+                logger.warning(f"Backfill: no archive response for site {site.name} (ID: {site.id}) {first}..{last}.")
+                continue
+            rows += build_backfill_observations(site, history[site.id], observed.get(site.id))
+            stored.append(site)
+        # With WeatherData in another database its rows commit first; a crash in between only
+        # means the window is fetched again and its stored hours skipped.
+        with transaction.atomic(using=alias):
+            save_observations(rows)
+            BackfillCheckpoint.objects.filter(
+                site__in=stored, start_date=start, end_date=end
+            ).update(completed_through=last, updated_at=timezone.now())
+        for site in stored:
+            done[site.id] = last
+        yield first, last, len(stored), len(rows)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,274 @@
+# weather/cache_backends.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from requests_cache.backends.base import BaseCache as BaseHTTPCache, BaseStorage
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024   # bytes of stored values before least-recently-used entries are evicted
+DEFAULT_ACCESS_RESOLUTION = 10         # seconds; reads refresh an entry's LRU timestamp at most this often
+DEFAULT_BUSY_TIMEOUT = 5               # seconds a writer waits for another process's transaction
+CULL_TARGET = 0.9                      # evict down to this fraction of the limits, so the next write doesn't cull again
+
+
+class SQLiteCache(BaseCache):
+    """Django cache backend stored in a local SQLite file, shared by every worker on the host.
+
+    LOCATION is the database path. OPTIONS accepts MAX_ENTRIES and MAX_SIZE (bytes); when
+    either is exceeded the least recently used entries are evicted. ``add`` and ``incr`` are
+    single statements, so they are atomic across processes and safe for locks and counters;
+    ``delete_if_equal`` releases such a lock the same way.
+    Integers are stored natively so ``incr`` can run in SQL; other values are pickled.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._max_size = options.get('MAX_SIZE', DEFAULT_MAX_SIZE)
+        self._access_resolution = options.get('ACCESS_RESOLUTION', DEFAULT_ACCESS_RESOLUTION)
+        self._busy_timeout = options.get('BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections are per thread, and per process so a forked worker never reuses its parent's.
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL NOT NULL, size INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value, 8
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return blob, len(blob)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _write(self, sql, params, cull=True):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(sql, params)
+            changed = cursor.rowcount
+            if cull and changed:
+                self._cull(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return changed
+
+    def _cull(self, conn):
+        now = time.time()
+        conn.execute('DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?', (now,))
+        count, size = conn.execute('SELECT COUNT(*), TOTAL(size) FROM cache_entries').fetchone()
+        if count <= self._max_entries and size <= self._max_size:
+            return
+        excess_count = max(0, count - int(self._max_entries * CULL_TARGET))
+        excess_size = max(0, size - self._max_size * CULL_TARGET)
+        evicted, freed = [], 0
+        for key, entry_size in conn.execute('SELECT key, size FROM cache_entries ORDER BY accessed'):
+            if len(evicted) >= excess_count and freed >= excess_size:
+                break
+            evicted.append(key)
+            freed += entry_size
+        conn.executemany('DELETE FROM cache_entries WHERE key = ?', [(key,) for key in evicted])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        blob, size = self._encode(value)
+        now = time.time()
+        return bool(self._write(
+            'INSERT INTO cache_entries (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed, size = excluded.size '
+            'WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?',
+            (key, blob, self.get_backend_timeout(timeout), now, size, now),
+        ))
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        blob, size = self._encode(value)
+        self._write(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+            (key, blob, self.get_backend_timeout(timeout), time.time(), size),
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self.get_backend_timeout(timeout), time.time()
+        rows = []
+        for key, value in data.items():
+            blob, size = self._encode(value)
+            rows.append((self.make_and_validate_key(key, version=version), blob, expires, now, size))
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)', rows
+            )
+            self._cull(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return []
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT value, accessed FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+        ).fetchone()
+        if row is None:
+            return default
+        if row[1] < now - self._access_resolution:
+            self._connection().execute('UPDATE cache_entries SET accessed = ? WHERE key = ?', (now, key))
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ', '.join('?' * len(key_map))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) AND (expires IS NULL OR expires > ?)',
+            (*key_map, time.time()),
+        ).fetchall()
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()), cull=False,
+        ))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "UPDATE cache_entries SET value = value + ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?) AND typeof(value) = 'integer' RETURNING value",
+            (delta, key, time.time()),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found or not an integer")
+        return row[0]
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount)
+
+    def delete_if_equal(self, key, value, version=None):
+        """Delete ``key`` only if it still holds ``value``, in one statement, so a lock holder
+        can release its lock without removing one another worker has taken since it expired."""
+        key = self.make_and_validate_key(key, version=version)
+        blob, _ = self._encode(value)
+        return bool(self._connection().execute(
+            'DELETE FROM cache_entries WHERE key = ? AND value = ? AND (expires IS NULL OR expires > ?)', (key, blob, time.time())
+        ).rowcount)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._connection().execute(f"DELETE FROM cache_entries WHERE key IN ({', '.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def iter_keys(self, prefix='', version=None):
+        """Unexpired keys starting with ``prefix``, as passed to set() (default key function only)."""
+        raw_prefix = self.make_key(prefix, version=version)
+        base_length = len(self.make_key('', version=version))
+        pattern = raw_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        rows = self._connection().execute(
+            "SELECT key FROM cache_entries WHERE key LIKE ? ESCAPE '\\' AND (expires IS NULL OR expires > ?)",
+            (pattern, time.time()),
+        ).fetchall()
+        return [key[base_length:] for key, in rows]
+
+    def close(self, **kwargs):
+        # Connections are reused across requests; closing them would throw away the WAL setup.
+        pass
+
+
+class DjangoCacheStorage(BaseStorage):
+    """requests_cache storage kept in a Django cache, so upstream responses share the bounded cross-worker store."""
+
+    def __init__(self, cache_alias, namespace, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = caches[cache_alias]
+        self.namespace = namespace
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _timeout(self, value):
+        expires = getattr(value, 'expires', None)
+        if expires is None:
+            return DEFAULT_TIMEOUT
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo=dt_timezone.utc)
+        return max(1, (expires - datetime.now(dt_timezone.utc)).total_seconds())
+
+    def __getitem__(self, key):
+        value = self.cache.get(self._key(key))
+        if value is None:
+            raise KeyError(key)
+        return self.deserialize(key, value)
+
+    def __setitem__(self, key, value):
+        self.cache.set(self._key(key), self.serialize(value), self._timeout(value))
+
+    def __delitem__(self, key):
+        if not self.cache.delete(self._key(key)):
+            raise KeyError(key)
+
+    def bulk_delete(self, keys):
+        self.cache.delete_many([self._key(key) for key in keys])
+
+    def __iter__(self):
+        if not hasattr(self.cache, 'iter_keys'):
+            raise NotImplementedError(f"{type(self.cache).__name__} cannot list its keys")
+        prefix_length = len(self._key(''))
+        return iter([key[prefix_length:] for key in self.cache.iter_keys(self._key(''))])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def clear(self):
+        self.bulk_delete(list(self))
+
+
+class DjangoHTTPCache(BaseHTTPCache):
+    """requests_cache backend that stores responses and redirects in the Django cache ``cache_alias``."""
+
+    def __init__(self, cache_alias='upstream', serializer='pickle', **kwargs):
+        super().__init__(cache_name=cache_alias, **kwargs)
+        self.responses = DjangoCacheStorage(cache_alias, 'responses', serializer=serializer, **kwargs)
+        self.redirects = DjangoCacheStorage(cache_alias, 'redirects', serializer=None, **kwargs)
@@ -0,0 +1,254 @@
+# weather/caching.py
+import hashlib
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .utils import NumpyJSONEncoder, WeatherAPIClient
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_LOCK_MARGIN = 10    # seconds on top of the upstream budget for decoding and storing
+SINGLE_FLIGHT_WAIT_TIMEOUT = 15   # seconds a follower waits for the leader before giving up
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+DEFAULT_STALE_TIMEOUT = 6 * 60 * 60  # how long entries stay servable after they stop being fresh
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+
+
+def json_body(value):
+    """The exact bytes JsonResponse(value, encoder=NumpyJSONEncoder) would send."""
+    return json.dumps(value, cls=NumpyJSONEncoder).encode()
+
+
+def body_etag(body):
+    """Strong ETag for a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def json_etag(value):
+    return body_etag(json_body(value))
+
+
+class CacheEntry:
+    """A cached value, the wall-clock time it was stored and the ETag of its JSON body."""
+    __slots__ = ('value', 'stored_at', '_etag')
+
+    def __init__(self, value, stored_at=None, etag=None):
+        self.value = value
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self._etag = etag
+
+    def __getstate__(self):
+        return (self.value, self.stored_at, self._etag)
+
+    def __setstate__(self, state):
+        self.value, self.stored_at, self._etag = state
+
+    @property
+    def age(self):
+        return max(0.0, time.time() - self.stored_at)
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = json_etag(self.value)
+        return self._etag
+
+
+# Explicit keys for everything the API views cache, so ingestion and refreshes can invalidate them.
+def current_weather_key(site_id):
+    return f"weather_data_current_site_{site_id}"
+
+def forecast_summary_key(site_id):
+    return f"weather_data_forecast_summary_site_{site_id}"
+
+def dashboard_bundle_key(site_id):
+    return f"dashboard_bundle_site_{site_id}"
+
+def hourly_forecast_frame_key(site_id):
+    return f"hourly_forecast_frame_site_{site_id}"
+
+def ensemble_frame_key(site_id, forecast_days):
+    return f"ensemble_frame_site_{site_id}_days_{forecast_days}"
+
+def sites_geojson_key():
+    return "sites_geojson"
+
+def wind_rose_key(site_id, source, days, sectors, speed_bin_edges):
+    edges = '_'.join(f"{edge:g}" for edge in speed_bin_edges)
+    return f"wind_rose_site_{site_id}_{source}_days_{days}_sectors_{sectors}_bins_{edges}"
+
+
+def invalidate_observations(site_ids):
+    """Drop cached responses built from current conditions for ``site_ids``."""
+    keys = [key for site_id in site_ids for key in (current_weather_key(site_id), dashboard_bundle_key(site_id))]
+    if keys:
+        keys.append(sites_geojson_key())  # map popups show each site's latest temperature
+    cache.delete_many(keys)
+
+
+def invalidate_forecasts(site_ids):
+    """Drop cached responses built from forecasts for ``site_ids``."""
+    cache.delete_many([
+        key for site_id in site_ids
+        for key in (forecast_summary_key(site_id), dashboard_bundle_key(site_id), hourly_forecast_frame_key(site_id))
+    ])
+
+
+def get_stale_timeout():
+    return getattr(settings, 'WEATHER_CACHE_STALE_TIMEOUT', DEFAULT_STALE_TIMEOUT)
+
+
+def store(key, value, stale_timeout=None):
+    """Cache ``value`` under ``key`` as a CacheEntry. It is kept until ``stale_timeout``;
+    readers decide freshness from its age."""
+    entry = CacheEntry(value)
+    entry.etag  # computed once here rather than on every conditional request
+    cache.set(key, entry, stale_timeout or get_stale_timeout())
+
+
+def read(key):
+    """The CacheEntry stored under ``key``, or None. Bare values written by older code count as fresh."""
+    entry = cache.get(key)
+    if entry is None or isinstance(entry, CacheEntry):
+        return entry
+    return CacheEntry(entry, stored_at=time.time())
+
+
+def _lock_key(key):
+    return f"single_flight_lock:{key}"
+
+
+def get_single_flight_lock_timeout():
+    """Seconds before an abandoned cross-worker lock expires. It outlasts the client's worst case
+    (every retry timing out), so a slow but live leader never loses its lock to a second computation."""
+    return WeatherAPIClient.worst_case_request_seconds() + SINGLE_FLIGHT_LOCK_MARGIN
+
+
+def _compute_and_store(key, compute, should_cache, stale_timeout, lock_key, token):
+    try:
+        value = compute()
+        if should_cache(value):
+            store(key, value, stale_timeout)
+        return value
+    finally:
+        _release_lock(lock_key, token)
+
+
+def _release_lock(lock_key, token):
+    """Delete the lock if ``token`` still holds it; it may have expired and been taken by another worker."""
+    delete_if_equal = getattr(cache, 'delete_if_equal', None)
+    if delete_if_equal is not None:
+        delete_if_equal(lock_key, token)
+    elif cache.get(lock_key) == token:
+        # Backends without a compare-and-delete leave a small window between the two calls.
+        cache.delete(lock_key)
+
+
+def _run_in_background(key, compute, should_cache, stale_timeout, lock_key, token):
+    try:
+        return _compute_and_store(key, compute, should_cache, stale_timeout, lock_key, token)
+    except Exception as e:
+        logger.error(f"Background cache refresh for {key} failed: {e}", exc_info=True)
+    finally:
+        # Worker threads get their own DB connections; don't leak them.
+        connections.close_all()
+
+
+def _revalidate(key, compute, should_cache, stale_timeout):
+    lock_key, token = _lock_key(key), uuid.uuid4().hex
+    if cache.add(lock_key, token, get_single_flight_lock_timeout()):
+        _refresh_executor.submit(_run_in_background, key, compute, should_cache, stale_timeout, lock_key, token)
+
+
+def get_or_compute_entry(key, compute, timeout, should_cache=None, stale_timeout=None, deadline=None, fallback=None):
+    """Return the CacheEntry for ``key``, computing it with at most one caller doing the work.
+
+    Entries younger than ``timeout`` are fresh. Older entries are served immediately
+    while a single background refresh runs, and stay servable until ``stale_timeout``.
+
+    On a miss, one caller takes an atomic ``cache.add`` lock and computes; it spans
+    threads and, when the cache backend is shared, worker processes. The others poll the
+    cache until the leader stores the value. A follower only computes once the lock is
+    released without a value (the leader failed); it never starts a second computation
+    while the leader still holds it.
+
+    With ``deadline`` set, every caller, leader or follower, answers within that many
+    seconds of arriving. After that it returns ``fallback()`` (a ``(value, age)`` pair) as an
+    entry, or None. The leader's computation keeps running in the background and fills
+    the cache when it finishes. Without a deadline followers wait up to
+    SINGLE_FLIGHT_WAIT_TIMEOUT before falling back.
+
+    ``compute`` returns the value. It is cached when ``should_cache(value)`` is true;
+    by default any value that is not None is cached.
+    """
+    if should_cache is None:
+        should_cache = lambda value: value is not None
+    give_up_at = time.monotonic() + (SINGLE_FLIGHT_WAIT_TIMEOUT if deadline is None else deadline)
+
+    entry = read(key)
+    if entry is not None:
+        if entry.age >= timeout:
+            _revalidate(key, compute, should_cache, stale_timeout)
+        return entry
+
+    lock_key = _lock_key(key)
+    while True:
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, get_single_flight_lock_timeout()):
+            # A previous leader may have stored the value just before releasing the lock.
+            entry = read(key)
+            if entry is not None:
+                _release_lock(lock_key, token)
+                return entry
+            break
+        entry = _wait_for_leader(key, lock_key, give_up_at)
+        if entry is not None:
+            return entry
+        if time.monotonic() >= give_up_at:
+            logger.warning(f"Single-flight: no value for {key} within {SINGLE_FLIGHT_WAIT_TIMEOUT if deadline is None else deadline}s; serving fallback.")
+            return _fallback_entry(fallback)
+        # The lock was released without a value: the leader failed, so compete to take over.
+
+    if deadline is None:
+        return CacheEntry(_compute_and_store(key, compute, should_cache, stale_timeout, lock_key, token))
+
+    future = _refresh_executor.submit(_run_in_background, key, compute, should_cache, stale_timeout, lock_key, token)
+    try:
+        return CacheEntry(future.result(timeout=max(0.0, give_up_at - time.monotonic())))
+    except FutureTimeoutError:
+        logger.warning(f"Upstream deadline of {deadline}s exceeded for {key}; serving fallback.")
+        return _fallback_entry(fallback)
+
+
+def _fallback_entry(fallback):
+    """``fallback()`` (a ``(value, age)`` pair) as a CacheEntry, or None when there is nothing to serve."""
+    value, age = fallback() if fallback else (None, None)
+    if value is None:
+        return None
+    return CacheEntry(value, stored_at=time.time() - (age or 0.0))
+
+
+def get_or_compute(key, compute, timeout, should_cache=None, stale_timeout=None, deadline=None, fallback=None):
+    """Like get_or_compute_entry() but returns only the value."""
+    entry = get_or_compute_entry(key, compute, timeout, should_cache, stale_timeout, deadline, fallback)
+    return None if entry is None else entry.value
+
+
+def _wait_for_leader(key, lock_key, give_up_at):
+    """Poll until ``key`` has a value, the lock is released or ``give_up_at`` (monotonic) passes."""
+    while time.monotonic() < give_up_at:
+        entry = read(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key) is None:
+            return read(key)
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+    return None
@@ -0,0 +1,154 @@
+# weather/db.py
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Max
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
+
+logger = logging.getLogger(__name__)
+
+# Applied to every SQLite connection when it opens. With persistent connections (CONN_MAX_AGE)
+# this runs once per worker thread, not once per request.
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',          # readers don't block the writer and the writer doesn't block readers
+    'synchronous': 'NORMAL',        # fsync at checkpoints, not every commit; safe with WAL
+    'busy_timeout': 20000,          # ms a writer waits for the lock instead of failing with "database is locked"
+    'cache_size': -64000,           # negative means KiB: 64 MB page cache per connection
+    'mmap_size': 256 * 1024 * 1024, # read pages through the OS page cache instead of copying them
+    'temp_store': 'MEMORY',
+}
+
+
+def get_sqlite_pragmas():
+    return {**DEFAULT_SQLITE_PRAGMAS, **getattr(settings, 'WEATHER_SQLITE_PRAGMAS', {})}
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver applying get_sqlite_pragmas() to new SQLite connections."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in get_sqlite_pragmas().items():
+            if value is None:
+                continue
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+            if pragma == 'journal_mode':
+                # SQLite answers with the mode it actually uses; in-memory test databases stay 'memory'.
+                mode = cursor.fetchone()[0]
+                if mode.lower() not in (str(value).lower(), 'memory'):
+                    logger.warning(f"SQLite kept journal_mode={mode} for {connection.settings_dict['NAME']}; WAL needs a local filesystem.")
+
+# Models holding high-volume history. They can live in their own database (TIMESERIES_DATABASE),
+# so ingestion bursts and vacuums don't lock the site catalog, admin, auth and sessions.
+TIMESERIES_MODELS = {'weatherdata', 'weatherforecast', 'hourlyforecast', 'hourlyrollup', 'dailyrollup', 'monthlyrollup'}
+TIMESERIES_DATABASE = 'timeseries'
+
+
+def timeseries_alias():
+    """Database alias holding the time-series tables: 'timeseries' when configured, else 'default'."""
+    alias = getattr(settings, 'WEATHER_TIMESERIES_DATABASE', TIMESERIES_DATABASE)
+    return alias if alias in settings.DATABASES else 'default'
+
+
+def is_timeseries_model(model):
+    return model._meta.app_label == 'weather' and model._meta.model_name in TIMESERIES_MODELS
+
+
+class TimeSeriesRouter:
+    """Sends the TIMESERIES_MODELS to timeseries_alias() and everything else to the default routing.
+
+    Without a 'timeseries' database every method defers, which is the single-database layout.
+    Time-series rows reference WeatherSite by id only (no database constraint), so the
+    relation is allowed across databases; joins to the site table are not possible there.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_timeseries_model(model):
+            return timeseries_alias()
+        # Django would otherwise look a time-series row's site up in the row's own database.
+        instance = hints.get('instance')
+        if instance is not None and is_timeseries_model(type(instance)):
+            return 'default'
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_timeseries_model(type(obj1)) or is_timeseries_model(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        alias = timeseries_alias()
+        if alias == 'default':
+            return None
+        is_timeseries = app_label == 'weather' and model_name in TIMESERIES_MODELS
+        if db == alias:
+            return is_timeseries
+        return False if is_timeseries else None
+
+
+DEFAULT_MOVE_CHUNK_SIZE = 5000
+
+
+def timeseries_models():
+    return [model for model in apps.get_app_config('weather').get_models() if is_timeseries_model(model)]
+
+
+def copy_timeseries_rows(model, source, target, chunk_size=DEFAULT_MOVE_CHUNK_SIZE):
+    """Copy ``model`` rows from the ``source`` database to ``target`` in primary-key order,
+    one transaction per ``chunk_size`` rows, keeping their ids. Rows up to the highest id
+    already in ``target`` are skipped, so an interrupted copy resumes where it stopped.
+    Yields the number of rows copied after each chunk.
+    """
+    fields = [field.attname for field in model._meta.concrete_fields]
+    last_pk = model._base_manager.using(target).aggregate(last=Max('pk'))['last'] or 0
+    copied = 0
+    while True:
+        rows = list(model._base_manager.using(source).filter(pk__gt=last_pk).order_by('pk').values(*fields)[:chunk_size])
+        if not rows:
+            break
+        with transaction.atomic(using=target):
+            model._base_manager.using(target).bulk_create([model(**row) for row in rows])
+        last_pk = rows[-1][model._meta.pk.attname]
+        copied += len(rows)
+        yield copied
+    # Explicit ids don't advance PostgreSQL sequences; SQLite tracks them itself.
+    connection = connections[target]
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def delete_copied_rows(model, source, target, chunk_size=DEFAULT_MOVE_CHUNK_SIZE):
+    """Delete ``model`` rows from ``source`` whose ids are at most the highest id in ``target``,
+    ``chunk_size`` at a time. Returns the number deleted."""
+    last_pk = model._base_manager.using(target).aggregate(last=Max('pk'))['last']
+    if last_pk is None:
+        return 0
+    deleted = 0
+    while True:
+        pks = list(model._base_manager.using(source).filter(pk__lte=last_pk).values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        deleted += model._base_manager.using(source).filter(pk__in=pks).delete()[0]
+
+
+def delete_site_history(sender, instance, **kwargs):
+    """post_delete receiver for WeatherSite. Time-series foreign keys are DO_NOTHING because the
+    rows may be in another database, so the site's history is removed here instead."""
+    from .models import WeatherData, WeatherForecast, HourlyForecast, HourlyRollup, DailyRollup, MonthlyRollup
+    for model in (WeatherData, WeatherForecast, HourlyForecast, HourlyRollup, DailyRollup, MonthlyRollup):
+        model.objects.filter(site_id=instance.pk).delete()
+
+
+def connect_signals():
+    from .models import WeatherSite
+    connection_created.connect(configure_sqlite_connection, dispatch_uid='weather.db.configure_sqlite_connection')
+    post_delete.connect(delete_site_history, sender=WeatherSite, dispatch_uid='weather.db.delete_site_history')
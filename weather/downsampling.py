@@ -0,0 +1,64 @@
+# weather/downsampling.py
+import warnings
+
+import numpy as np
+
+
+def lttb_indices(series, max_points):
+    """Indices kept when Largest-Triangle-Three-Buckets reduces ``series`` to ``max_points`` points.
+
+    ``series`` is one sequence of length n or a (k, n) stack sharing the same x axis (the point
+    index). With several series each is scaled to its own range and a point scores the sum of its
+    triangle areas, so a peak or trough in any of them survives. Missing values (None/NaN) never
+    win a bucket unless the whole bucket is missing. The first and last points are always kept.
+    """
+    values = np.atleast_2d(np.asarray(series, dtype=np.float64))
+    n = values.shape[1]
+    if max_points is None or max_points < 3 or n <= max_points:
+        return np.arange(n)
+
+    with warnings.catch_warnings():
+        # All-missing series have no range; they are scaled by 1 and score nothing.
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        low = np.nanmin(values, axis=1, keepdims=True)
+        span = np.nanmax(values, axis=1, keepdims=True) - low
+    span = np.where(np.isfinite(span) & (span > 0), span, 1.0)
+    scaled = (values - np.nan_to_num(low)) / span
+    finite = np.isfinite(scaled)
+
+    # Buckets split the points between the fixed first and last one.
+    bucket_count = max_points - 2
+    edges = np.linspace(1, n - 1, bucket_count + 1).astype(np.intp)
+    inner, inner_finite = scaled[:, :n - 1], finite[:, :n - 1]
+    sums = np.add.reduceat(np.where(inner_finite, inner, 0.0), edges[:-1], axis=1)
+    counts = np.add.reduceat(inner_finite, edges[:-1], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    # Third triangle vertex for bucket i: the average of bucket i + 1, or the last point for the final bucket.
+    next_x = np.append((edges[1:-1] + edges[2:] - 1) / 2.0, n - 1)
+    next_y = np.concatenate([means[:, 1:], scaled[:, -1:]], axis=1)
+
+    selected = np.empty(max_points, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    anchor_x, anchor_y = 0.0, np.where(finite[:, 0], scaled[:, 0], 0.5)
+    for bucket in range(bucket_count):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        candidates_x = np.arange(lo, hi)
+        candidates_y = scaled[:, lo:hi]
+        target_y = np.where(np.isnan(next_y[:, bucket]), anchor_y, next_y[:, bucket])
+        areas = np.abs(
+            (anchor_x - next_x[bucket]) * (candidates_y - anchor_y[:, None])
+            - (anchor_x - candidates_x) * (target_y - anchor_y)[:, None]
+        )
+        scores = np.where(finite[:, lo:hi].any(axis=0), np.nansum(areas, axis=0), -1.0)
+        pick = lo + int(np.argmax(scores))
+        selected[bucket + 1] = pick
+        anchor_x, anchor_y = float(pick), np.where(finite[:, pick], scaled[:, pick], anchor_y)
+    return selected
+
+
+def take(values, indices):
+    """``values`` (list or NumPy array) at ``indices``, keeping its type."""
+    if isinstance(values, np.ndarray):
+        return values[indices]
+    return [values[i] for i in indices]
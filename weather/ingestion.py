@@ -0,0 +1,221 @@
+# weather/ingestion.py
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .caching import (
+    current_weather_key, forecast_summary_key, invalidate_forecasts, store,
+)
+from .models import WeatherData, WeatherForecast, HourlyForecast
+from .observations import WEATHER_DATA_FIELD_MAP, build_observation, record_observations
+from .utils import get_weather_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MINUTES = 15
+DEFAULT_FORECAST_INTERVAL_MINUTES = 60
+FORECAST_HORIZON_DAYS = 16
+FORECAST_SUMMARY_DAYS = 7
+# Rows upserted by one ingest get created_at stamps this close together; older stamps belong to earlier runs.
+RUN_ROWS_SLACK = timedelta(minutes=10)
+
+# Daily variables stored in WeatherForecast; the first three are also the dashboard's forecast summary.
+FORECAST_DAILY_PARAMS = [
+    "temperature_2m_max", "temperature_2m_min", "weather_code",
+    "precipitation_sum", "precipitation_probability_max",
+    "wind_speed_10m_max", "wind_direction_10m_dominant",
+]
+FORECAST_SUMMARY_PARAMS = ["temperature_2m_max", "temperature_2m_min", "weather_code"]
+FORECAST_FIELD_MAP = {
+    'temperature_max': 'temperature_2m_max',
+    'temperature_min': 'temperature_2m_min',
+    'precipitation': 'precipitation_sum',
+    'precipitation_probability': 'precipitation_probability_max',
+    'wind_speed': 'wind_speed_10m_max',
+    'wind_direction': 'wind_direction_10m_dominant',
+    'weather_code': 'weather_code',
+}
+# HourlyForecast field -> Open-Meteo hourly variable
+HOURLY_FORECAST_FIELD_MAP = {
+    'temperature': 'temperature_2m',
+    'feels_like': 'apparent_temperature',
+    'humidity': 'relative_humidity_2m',
+    'wind_speed': 'wind_speed_10m',
+    'wind_direction': 'wind_direction_10m',
+    'pressure': 'surface_pressure',
+    'precipitation': 'precipitation',
+    'cloud_cover': 'cloud_cover',
+    'uv_index': 'uv_index',
+}
+
+
+def ingest_current_weather(sites, client=None):
+    """Fetch current conditions for ``sites`` and store them with one bulk insert.
+
+    Responses derived from current conditions are invalidated and the fresh payloads
+    written to the keys read by get_weather_data. Returns the number of rows written.
+    """
+    client = client or get_weather_client()
+    responses = client.get_current_weather_many(sites)
+    rows = []
+    for site in sites:
+        observation = build_observation(site, responses.get(site.id))
+        if observation is None:
+            logger.warning(f"Ingestion: no current weather for site {site.name} (ID: {site.id}).")
+            continue
+        rows.append(observation)
+    record_observations(rows, wait=True)
+    for row in rows:
+        store(current_weather_key(row.site_id), responses[row.site_id])
+    return len(rows)
+
+
+def _forecast_rows(model, site, series, field_map, time_format):
+    times = series.get("time", [])
+    columns = {field: series.get(param) or [None] * len(times) for field, param in field_map.items()}
+    return [
+        model(
+            site=site,
+            forecast_time=datetime.strptime(step, time_format).replace(tzinfo=dt_timezone.utc),
+            **{field: values[index] for field, values in columns.items()},
+        )
+        for index, step in enumerate(times)
+    ]
+
+
+def _upsert_forecast_rows(model, rows, field_map):
+    model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['site', 'forecast_time'],
+        update_fields=list(field_map) + ['created_at'],
+    )
+
+
+def ingest_forecasts(sites, client=None, forecast_days=FORECAST_HORIZON_DAYS):
+    """Fetch daily and hourly forecasts for ``sites`` in one batched call and upsert them
+    into WeatherForecast and HourlyForecast.
+
+    Responses derived from forecasts are invalidated and the fresh summaries cached.
+    Returns the number of forecast rows written.
+    """
+    client = client or get_weather_client()
+    responses = client.get_forecast_many(
+        sites, daily_params=FORECAST_DAILY_PARAMS, hourly_params=list(HOURLY_FORECAST_FIELD_MAP.values()),
+        forecast_days=forecast_days
+    )
+    daily_rows, hourly_rows, summaries = [], [], {}
+    for site in sites:
+        forecast = responses.get(site.id, {})
+        daily, hourly = forecast.get("daily", {}), forecast.get("hourly", {})
+        if not daily.get("time"):
+            logger.warning(f"Ingestion: no daily forecast for site {site.name} (ID: {site.id}).")
+            continue
+        daily_rows.extend(_forecast_rows(WeatherForecast, site, daily, FORECAST_FIELD_MAP, '%Y-%m-%d'))
+        hourly_rows.extend(_forecast_rows(HourlyForecast, site, hourly, HOURLY_FORECAST_FIELD_MAP, '%Y-%m-%dT%H:%M:%SZ'))
+        summaries[site.id] = {"daily": {
+            key: daily[key][:FORECAST_SUMMARY_DAYS] for key in ["time"] + FORECAST_SUMMARY_PARAMS if key in daily
+        }}
+    # Forecast tables may live in the time-series database; the transaction has to be opened there.
+    with transaction.atomic(using=router.db_for_write(WeatherForecast)):
+        _upsert_forecast_rows(WeatherForecast, daily_rows, FORECAST_FIELD_MAP)
+        _upsert_forecast_rows(HourlyForecast, hourly_rows, HOURLY_FORECAST_FIELD_MAP)
+    invalidate_forecasts(summaries)
+    for site_id, summary in summaries.items():
+        store(forecast_summary_key(site_id), summary)
+    return len(daily_rows) + len(hourly_rows)
+
+
+def ingestion_enabled():
+    return getattr(settings, 'WEATHER_INGESTION_ENABLED', False)
+
+
+def get_ingest_interval_minutes():
+    return getattr(settings, 'WEATHER_INGEST_INTERVAL_MINUTES', DEFAULT_INTERVAL_MINUTES)
+
+
+def get_forecast_interval_minutes():
+    return getattr(settings, 'WEATHER_INGEST_FORECAST_INTERVAL_MINUTES', DEFAULT_FORECAST_INTERVAL_MINUTES)
+
+
+def current_weather_from_db(site, fresh_only=True, with_age=False):
+    """Latest stored observation shaped like get_current_weather(), or None.
+
+    With fresh_only, observations older than two ingestion intervals are ignored.
+    With with_age, returns (payload, age_seconds) instead.
+    """
+    qs = WeatherData.objects.filter(site=site)
+    if fresh_only:
+        qs = qs.filter(timestamp__gte=timezone.now() - timedelta(minutes=2 * get_ingest_interval_minutes()))
+    latest = qs.order_by('-timestamp').first()
+    if latest is None:
+        return (None, None) if with_age else None
+    payload = {api_key: getattr(latest, field) for field, api_key in WEATHER_DATA_FIELD_MAP.items()}
+    payload["time"] = latest.timestamp.isoformat()
+    payload["interval"] = None
+    if with_age:
+        return payload, (timezone.now() - latest.timestamp).total_seconds()
+    return payload
+
+
+def _latest_run_rows(model, site, fields, fresh_only):
+    """Stored forecast steps from the most recent ingest for ``site``, in time order, with one
+    indexed range query on (site, forecast_time). Returns [] when nothing (fresh) is stored.
+
+    Each ingest rewrites every step from local midnight onwards, so steps that only an earlier
+    run covered keep an older created_at and are dropped here.
+    """
+    # Steps start at local midnight, which is the previous UTC day east of Greenwich.
+    window_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    rows = list(
+        model.objects.filter(site=site, forecast_time__gte=window_start)
+        .order_by('forecast_time').values('forecast_time', 'created_at', *fields)
+    )
+    if not rows:
+        return []
+    latest = max(row['created_at'] for row in rows)
+    if fresh_only and latest < timezone.now() - timedelta(minutes=2 * get_forecast_interval_minutes()):
+        return []
+    return [row for row in rows if row['created_at'] >= latest - RUN_ROWS_SLACK]
+
+
+def daily_forecast_from_db(site, daily_params, forecast_days=FORECAST_SUMMARY_DAYS, fresh_only=True, with_age=False):
+    """Stored daily forecast shaped like get_forecast(daily_params=daily_params)["daily"] wrapped
+    in {"daily": ...}, or None. ``daily_params`` must be values of FORECAST_FIELD_MAP.
+
+    With fresh_only, forecasts ingested more than two forecast intervals ago are ignored.
+    With with_age, returns (payload, age_seconds) instead.
+    """
+    fields = {param: field for field, param in FORECAST_FIELD_MAP.items()}
+    rows = _latest_run_rows(WeatherForecast, site, [fields[param] for param in daily_params], fresh_only)[:forecast_days]
+    if not rows:
+        return (None, None) if with_age else None
+    payload = {"daily": {"time": [row['forecast_time'].strftime('%Y-%m-%d') for row in rows]}}
+    for param in daily_params:
+        payload["daily"][param] = [row[fields[param]] for row in rows]
+    if with_age:
+        return payload, (timezone.now() - min(row['created_at'] for row in rows)).total_seconds()
+    return payload
+
+
+def forecast_summary_from_db(site, forecast_days=FORECAST_SUMMARY_DAYS, fresh_only=True, with_age=False):
+    """Stored daily forecast shaped like get_forecast(daily_params=FORECAST_SUMMARY_PARAMS), or None."""
+    return daily_forecast_from_db(site, FORECAST_SUMMARY_PARAMS, forecast_days, fresh_only, with_age)
+
+
+def hourly_forecast_from_db(site, hourly_params, fresh_only=True):
+    """Stored hourly forecast shaped like get_forecast(hourly_params=hourly_params)["hourly"], or None.
+
+    ``hourly_params`` must be values of HOURLY_FORECAST_FIELD_MAP. Covers the full ingested horizon.
+    """
+    fields = {param: field for field, param in HOURLY_FORECAST_FIELD_MAP.items()}
+    rows = _latest_run_rows(HourlyForecast, site, [fields[param] for param in hourly_params], fresh_only)
+    if not rows:
+        return None
+    frame = {"time": [row['forecast_time'].strftime('%Y-%m-%dT%H:%M:%SZ') for row in rows]}
+    for param in hourly_params:
+        frame[param] = [row[fields[param]] for row in rows]
+    return frame
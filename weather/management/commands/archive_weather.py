@@ -0,0 +1,43 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.core.management.base import BaseCommand, CommandError
+from weather.archive import archive_month, closed_months, get_archive_dir, pq
+from weather.models import WeatherSite
+
+class Command(BaseCommand):
+    help = 'Exports closed months of WeatherData to Parquet files partitioned by site and month (run before compact_weather deletes them)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Only archive this site ID (repeatable)')
+        parser.add_argument('--before', help='Archive months before this one, as YYYY-MM (default: the current month)')
+        parser.add_argument('--overwrite', action='store_true', help='Rewrite months that are already archived')
+
+    def handle(self, *args, **options):
+        if pq is None:
+            raise CommandError("archive_weather needs pyarrow: pip install pyarrow")
+        before = None
+        if options['before']:
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m').replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError("--before must look like 2025-01")
+        sites = WeatherSite.objects.order_by('id')
+        if options['site_ids']:
+            sites = sites.filter(id__in=options['site_ids'])
+
+        self.stdout.write(f"Archiving closed months to {get_archive_dir()}...")
+        started = time.monotonic()
+        files = rows = size = skipped = 0
+        for site_id in sites.values_list('id', flat=True):
+            for month in closed_months(site_id, before):
+                written = archive_month(site_id, month, overwrite=options['overwrite'])
+                if written is None:
+                    skipped += 1
+                    continue
+                if written[0]:
+                    files, rows, size = files + 1, rows + written[0], size + written[1]
+                    self.stdout.write(f"  site {site_id} {month:%Y-%m}: {written[0]} rows")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rows to {files} files ({size / 1024:.0f} KiB) in {elapsed:.1f}s; {skipped} months were already archived."
+        ))
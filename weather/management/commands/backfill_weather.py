@@ -0,0 +1,52 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from weather.backfill import ARCHIVE_DELAY_DAYS, DEFAULT_WINDOW_DAYS, backfill_observations
+from weather.models import WeatherSite
+from weather.utils import get_weather_client
+
+class Command(BaseCommand):
+    help = 'Loads hourly history for sites from the Open-Meteo archive API; rerun with the same range to resume'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Backfill this site ID (repeatable; default: all active sites)')
+        parser.add_argument('--start', required=True, help='First day to load, as YYYY-MM-DD (UTC)')
+        parser.add_argument('--end', help=f'Last day to load, as YYYY-MM-DD (default: {ARCHIVE_DELAY_DAYS} days ago, where the archive ends)')
+        parser.add_argument('--window-days', type=int, default=DEFAULT_WINDOW_DAYS, help='Days fetched and stored per transaction')
+        parser.add_argument('--pause', type=float, default=0.5, help='Seconds to sleep between windows to stay within upstream rate limits')
+
+    def _parse_date(self, value, option):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"{option} must look like 2024-01-31")
+
+    def handle(self, *args, **options):
+        start = self._parse_date(options['start'], '--start')
+        end = self._parse_date(options['end'], '--end') if options['end'] else timezone.now().date() - timedelta(days=ARCHIVE_DELAY_DAYS)
+        if end < start:
+            raise CommandError("--end is before --start.")
+        if options['window_days'] < 1:
+            raise CommandError("--window-days must be at least 1.")
+        sites = WeatherSite.objects.order_by('id')
+        sites = sites.filter(id__in=options['site_ids']) if options['site_ids'] else sites.filter(is_active=True)
+        sites = list(sites)
+        if not sites:
+            raise CommandError("No sites to backfill.")
+
+        client = get_weather_client()
+        self.stdout.write(f"Backfilling {len(sites)} sites from {start} to {end} in {options['window_days']}-day windows, {client.batch_size} sites per request...")
+        started, total = time.monotonic(), 0
+        try:
+            for first, last, site_count, rows in backfill_observations(sites, start, end, options['window_days'], client, options['pause']):
+                total += rows
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"  {first}..{last}: {rows} rows for {site_count} sites ({total / elapsed:.0f} rows/s overall)")
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(f"Interrupted after {total} rows; rerun the same command to resume."))
+            return
+        except Exception as e:
+            raise CommandError(f"Backfill stopped after {total} rows: {e}. Rerun the same command to resume.")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Stored {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)."))
@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from weather.rollups import get_retention_days
+from weather.retention import (
+    DEFAULT_COMPACT_CHUNK_SIZE, DEFAULT_VACUUM_PAGES,
+    analyze, compact_observations, prune_rollups, retention_cutoff, vacuum, validate_retention,
+)
+
+class Command(BaseCommand):
+    help = 'Deletes observations and rollups past their retention (WEATHER_RETENTION_DAYS), folding raw rows into rollups first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, help='Days of raw WeatherData to keep, rounded back to a month start (default 30)')
+        parser.add_argument('--hourly-days', type=int, help='Days of hourly rollups to keep (default 365)')
+        parser.add_argument('--daily-days', type=int, help='Days of daily rollups to keep (default: forever)')
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Only compact this site ID (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_COMPACT_CHUNK_SIZE, help='Rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between transactions so ingestion can write')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+        parser.add_argument('--vacuum', action='store_true', help='Free deleted pages afterwards (incrementally on SQLite)')
+        parser.add_argument('--vacuum-pages', type=int, default=DEFAULT_VACUUM_PAGES, help='SQLite pages freed per incremental step')
+        parser.add_argument('--vacuum-full', action='store_true', help='Rewrite the SQLite file once and enable incremental vacuum (locks the database)')
+        parser.add_argument('--analyze', action='store_true', help='Refresh query planner statistics afterwards')
+
+    def handle(self, *args, **options):
+        retention = get_retention_days()
+        for tier, option in (('raw', 'raw_days'), ('hour', 'hourly_days'), ('day', 'daily_days')):
+            if options[option] is not None:
+                retention[tier] = options[option]
+        try:
+            validate_retention(retention)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        batching = {'site_ids': options['site_ids'], 'chunk_size': options['chunk_size'], 'pause': options['pause'], 'dry_run': options['dry_run']}
+        cutoff = retention_cutoff('raw', retention)
+        if cutoff is not None:
+            started = time.monotonic()
+            deleted, folded = compact_observations(cutoff, **batching)
+            self.stdout.write(f"{verb} {deleted} observations before {cutoff:%Y-%m-%d} ({folded} folded into rollups first) in {time.monotonic() - started:.1f}s.")
+        for resolution, label in (('hour', 'hourly'), ('day', 'daily'), ('month', 'monthly')):
+            cutoff = retention_cutoff(resolution, retention)
+            if cutoff is None:
+                continue
+            deleted = prune_rollups(resolution, cutoff, **batching)
+            self.stdout.write(f"{verb} {deleted} {label} rollups before {cutoff:%Y-%m-%d}.")
+        if options['dry_run']:
+            return
+
+        if options['vacuum'] or options['vacuum_full']:
+            self.stdout.write(f"Vacuum: {vacuum(pages=options['vacuum_pages'], pause=options['pause'], full=options['vacuum_full'])}.")
+        if options['analyze']:
+            analyze()
+            self.stdout.write("Planner statistics refreshed.")
+        self.stdout.write(self.style.SUCCESS("Compaction finished."))
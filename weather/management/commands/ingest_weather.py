@@ -0,0 +1,75 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from weather.models import WeatherSite
+from weather.ingestion import (
+    ingest_current_weather, ingest_forecasts,
+    get_ingest_interval_minutes, get_forecast_interval_minutes,
+)
+from weather.utils import get_weather_client, latest_model_update
+
+class Command(BaseCommand):
+    help = 'Polls all active sites on a schedule and stores observations and forecasts, so API views can serve from the database and cache (set WEATHER_INGESTION_ENABLED where it runs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Minutes between polls of each site (default WEATHER_INGEST_INTERVAL_MINUTES or 15)')
+        parser.add_argument('--forecast-interval', type=float, help='Maximum minutes between forecast refreshes; a new model run triggers one sooner (default WEATHER_INGEST_FORECAST_INTERVAL_MINUTES or 60)')
+        parser.add_argument('--group-size', type=int, help='Sites per upstream call; groups are spread evenly across the interval (default: client batch size)')
+        parser.add_argument('--jitter', type=float, default=0.1, help='Random delay added to each group, as a fraction of its slot (default 0.1)')
+        parser.add_argument('--once', action='store_true', help='Run a single cycle without staggering and exit')
+
+    def handle(self, *args, **options):
+        interval_seconds = (options['interval'] or get_ingest_interval_minutes()) * 60
+        forecast_interval_seconds = (options['forecast_interval'] or get_forecast_interval_minutes()) * 60
+        client = get_weather_client()
+        group_size = options['group_size'] or client.batch_size
+        last_forecast_at = {}  # site id -> wall-clock time of last forecast ingest
+
+        self.stdout.write(f"Starting weather ingestion: every {interval_seconds / 60:g} min, forecasts every {forecast_interval_seconds / 60:g} min.")
+        try:
+            while True:
+                cycle_start = time.monotonic()
+                close_old_connections()
+                sites = list(WeatherSite.objects.filter(is_active=True).order_by('id'))
+                groups = [sites[i:i + group_size] for i in range(0, len(sites), group_size)]
+                # Spread groups evenly across the interval instead of polling every site at once.
+                slot_seconds = 0 if options['once'] or not groups else interval_seconds / len(groups)
+
+                for index, group in enumerate(groups):
+                    # Jitter within the slot, so a single group (or several ingest processes started
+                    # together) doesn't call upstream at the same moment every interval.
+                    jitter = random.uniform(0, options['jitter'] * slot_seconds)
+                    delay = cycle_start + index * slot_seconds + jitter - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self._ingest_group(client, group, last_forecast_at, forecast_interval_seconds)
+
+                if options['once']:
+                    break
+                delay = cycle_start + interval_seconds - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Ingestion stopped."))
+
+    def _ingest_group(self, client, group, last_forecast_at, forecast_interval_seconds):
+        try:
+            written = ingest_current_weather(group, client=client)
+            self.stdout.write(f"Stored {written} of {len(group)} observations.")
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error ingesting observations for {len(group)} sites: {e}"))
+
+        # Once per model run: due when a run has been published since the last ingest, or the interval has passed.
+        now = time.time()
+        due_before = max(latest_model_update(now=now), now - forecast_interval_seconds)
+        due = [site for site in group if last_forecast_at.get(site.id, float('-inf')) <= due_before]
+        if not due:
+            return
+        try:
+            written = ingest_forecasts(due, client=client)
+            for site in due:
+                last_forecast_at[site.id] = now
+            self.stdout.write(f"Stored {written} forecast rows for {len(due)} sites.")
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Error ingesting forecasts for {len(due)} sites: {e}"))
@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from weather.db import DEFAULT_MOVE_CHUNK_SIZE, copy_timeseries_rows, delete_copied_rows, timeseries_alias, timeseries_models
+from weather.models import WeatherData, WeatherSite
+from weather.snapshots import update_latest_observations
+
+class Command(BaseCommand):
+    help = 'Copies observation, forecast and rollup history between the default and the time-series database in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='source', default='default', help='Database alias to copy from (default: default)')
+        parser.add_argument('--to', dest='target', help="Database alias to copy to (default: the configured time-series database)")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_MOVE_CHUNK_SIZE, help='Rows copied per transaction')
+        parser.add_argument('--delete-source', action='store_true', help='Delete the copied rows from the source database afterwards')
+
+    def handle(self, *args, **options):
+        source, target = options['source'], options['target'] or timeseries_alias()
+        if source == target:
+            raise CommandError("Source and target are the same database; configure a 'timeseries' database (WEATHER_TIMESERIES_DB) first.")
+        for alias in (source, target):
+            if alias not in connections:
+                raise CommandError(f"Unknown database alias '{alias}'.")
+        target_tables = set(connections[target].introspection.table_names())
+        source_tables = set(connections[source].introspection.table_names())
+
+        self.stdout.write("Copying time-series history (stop ingestion and refreshes first, or rows written meanwhile can collide)...")
+        for model in timeseries_models():
+            table = model._meta.db_table
+            if table not in target_tables:
+                raise CommandError(f"{table} does not exist in '{target}'; run: manage.py migrate --database={target}")
+            if table not in source_tables:
+                continue
+            started, copied = time.monotonic(), 0
+            for copied in copy_timeseries_rows(model, source, target, options['chunk_size']):
+                self.stdout.write(f"  {model.__name__}: {copied} rows", ending='\r')
+            self.stdout.write(f"  {model.__name__}: copied {copied} rows in {time.monotonic() - started:.1f}s")
+            if options['delete_source']:
+                deleted = delete_copied_rows(model, source, target, options['chunk_size'])
+                self.stdout.write(f"  {model.__name__}: deleted {deleted} rows from '{source}'")
+
+        # Snapshots live with the sites; make sure they reflect the history that was just copied.
+        latest = []
+        for site_id in WeatherSite.objects.values_list('id', flat=True):
+            observation = WeatherData.objects.using(target).filter(site_id=site_id).order_by('-timestamp').first()
+            if observation:
+                latest.append(observation)
+        update_latest_observations(latest)
+        self.stdout.write(self.style.SUCCESS(f"Moved time-series history from '{source}' to '{target}'."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from weather.rollups import rebuild_rollups, DEFAULT_REBUILD_CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = 'Recomputes the hourly, daily and monthly rollup tables from raw WeatherData rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Only rebuild this site ID (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_REBUILD_CHUNK_SIZE, help='Raw rows folded per batch')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding rollups (writes wait while each site is rebuilt)...")
+        folded = rebuild_rollups(site_ids=options['site_ids'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} observations into rollups."))
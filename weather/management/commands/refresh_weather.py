@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from weather.models import WeatherSite
+from weather.refresh import refresh_sites
+
+class Command(BaseCommand):
+    help = 'Fetches current weather for active sites concurrently and stores it (same engine as the bulk update endpoint)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Only refresh this site ID (repeatable)')
+        parser.add_argument('--workers', type=int, help='Maximum upstream calls in flight at once')
+        parser.add_argument('--chunk-size', type=int, help='Sites per batched upstream call')
+        parser.add_argument('--site-timeout', type=float, help='Deadline in seconds for each upstream call')
+        parser.add_argument('--batch-timeout', type=float, help='Deadline in seconds for the whole refresh')
+
+    def handle(self, *args, **options):
+        sites = WeatherSite.objects.filter(is_active=True)
+        if options['site_ids']:
+            sites = sites.filter(id__in=options['site_ids'])
+        sites = list(sites)
+
+        if not sites:
+            self.stdout.write(self.style.WARNING("No active sites to refresh."))
+            return
+
+        self.stdout.write(f"Refreshing {len(sites)} sites...")
+        summary = refresh_sites(
+            sites,
+            max_workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            site_timeout=options['site_timeout'],
+            batch_timeout=options['batch_timeout'],
+        )
+
+        names = {site.id: site.name for site in sites}
+        for site_id, seconds in sorted(summary['chunk_seconds'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {names[site_id]} (ID {site_id}): {seconds:.3f}s for its chunk")
+        if summary['failed_sites']:
+            self.stdout.write(self.style.ERROR(f"Failed: {', '.join(summary['failed_sites'])}"))
+        if summary['timed_out_sites']:
+            self.stdout.write(self.style.WARNING(f"Timed out: {', '.join(summary['timed_out_sites'])}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {summary['updated_count']} of {summary['total']} sites in {summary['elapsed']:.2f}s."
+        ))
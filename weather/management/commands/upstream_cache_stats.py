@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from weather.utils import upstream_cache_stats, reset_upstream_cache_stats
+
+class Command(BaseCommand):
+    help = 'Shows Open-Meteo cache hits and misses per endpoint, counted across all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the counters after printing them')
+
+    def handle(self, *args, **options):
+        for endpoint, counts in upstream_cache_stats().items():
+            hit_rate = 'n/a' if counts['hit_rate'] is None else f"{counts['hit_rate']:.1%}"
+            self.stdout.write(f"{endpoint:<10} hits {counts['hits']:>8}  misses {counts['misses']:>8}  hit rate {hit_rate}")
+        if options['reset']:
+            reset_upstream_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherforecast',
+            name='weather_code',
+            field=models.IntegerField(blank=True, help_text='WMO weather code', null=True),
+        ),
+        migrations.CreateModel(
+            name='HourlyForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('forecast_time', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('temperature', models.FloatField(blank=True, help_text='Temperature in Celsius', null=True)),
+                ('feels_like', models.FloatField(blank=True, help_text='Feels like temperature in Celsius', null=True)),
+                ('humidity', models.FloatField(blank=True, help_text='Relative humidity in %', null=True)),
+                ('wind_speed', models.FloatField(blank=True, help_text='Wind speed in m/s', null=True)),
+                ('wind_direction', models.FloatField(blank=True, help_text='Wind direction in degrees', null=True)),
+                ('pressure', models.FloatField(blank=True, help_text='Surface pressure in hPa', null=True)),
+                ('precipitation', models.FloatField(blank=True, help_text='Precipitation in mm', null=True)),
+                ('cloud_cover', models.FloatField(blank=True, help_text='Cloud cover in %', null=True)),
+                ('uv_index', models.FloatField(blank=True, help_text='UV Index', null=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_forecasts', to='weather.weathersite')),
+            ],
+            options={
+                'ordering': ['forecast_time'],
+                'unique_together': {('site', 'forecast_time')},
+            },
+        ),
+    ]
@@ -0,0 +1,161 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0002_hourly_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_sum', models.FloatField(blank=True, null=True)),
+                ('temperature_count', models.IntegerField(default=0)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('humidity_sum', models.FloatField(blank=True, null=True)),
+                ('humidity_count', models.IntegerField(default=0)),
+                ('wind_speed_min', models.FloatField(blank=True, null=True)),
+                ('wind_speed_max', models.FloatField(blank=True, null=True)),
+                ('wind_speed_sum', models.FloatField(blank=True, null=True)),
+                ('wind_speed_count', models.IntegerField(default=0)),
+                ('pressure_min', models.FloatField(blank=True, null=True)),
+                ('pressure_max', models.FloatField(blank=True, null=True)),
+                ('pressure_sum', models.FloatField(blank=True, null=True)),
+                ('pressure_count', models.IntegerField(default=0)),
+                ('precipitation_min', models.FloatField(blank=True, null=True)),
+                ('precipitation_max', models.FloatField(blank=True, null=True)),
+                ('precipitation_sum', models.FloatField(blank=True, null=True)),
+                ('precipitation_count', models.IntegerField(default=0)),
+                ('uv_index_min', models.FloatField(blank=True, null=True)),
+                ('uv_index_max', models.FloatField(blank=True, null=True)),
+                ('uv_index_sum', models.FloatField(blank=True, null=True)),
+                ('uv_index_count', models.IntegerField(default=0)),
+                ('cloud_cover_min', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_max', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_sum', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_count', models.IntegerField(default=0)),
+                ('visibility_min', models.FloatField(blank=True, null=True)),
+                ('visibility_max', models.FloatField(blank=True, null=True)),
+                ('visibility_sum', models.FloatField(blank=True, null=True)),
+                ('visibility_count', models.IntegerField(default=0)),
+                ('feels_like_min', models.FloatField(blank=True, null=True)),
+                ('feels_like_max', models.FloatField(blank=True, null=True)),
+                ('feels_like_sum', models.FloatField(blank=True, null=True)),
+                ('feels_like_count', models.IntegerField(default=0)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='weather.weathersite')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+                'unique_together': {('site', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_sum', models.FloatField(blank=True, null=True)),
+                ('temperature_count', models.IntegerField(default=0)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('humidity_sum', models.FloatField(blank=True, null=True)),
+                ('humidity_count', models.IntegerField(default=0)),
+                ('wind_speed_min', models.FloatField(blank=True, null=True)),
+                ('wind_speed_max', models.FloatField(blank=True, null=True)),
+                ('wind_speed_sum', models.FloatField(blank=True, null=True)),
+                ('wind_speed_count', models.IntegerField(default=0)),
+                ('pressure_min', models.FloatField(blank=True, null=True)),
+                ('pressure_max', models.FloatField(blank=True, null=True)),
+                ('pressure_sum', models.FloatField(blank=True, null=True)),
+                ('pressure_count', models.IntegerField(default=0)),
+                ('precipitation_min', models.FloatField(blank=True, null=True)),
+                ('precipitation_max', models.FloatField(blank=True, null=True)),
+                ('precipitation_sum', models.FloatField(blank=True, null=True)),
+                ('precipitation_count', models.IntegerField(default=0)),
+                ('uv_index_min', models.FloatField(blank=True, null=True)),
+                ('uv_index_max', models.FloatField(blank=True, null=True)),
+                ('uv_index_sum', models.FloatField(blank=True, null=True)),
+                ('uv_index_count', models.IntegerField(default=0)),
+                ('cloud_cover_min', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_max', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_sum', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_count', models.IntegerField(default=0)),
+                ('visibility_min', models.FloatField(blank=True, null=True)),
+                ('visibility_max', models.FloatField(blank=True, null=True)),
+                ('visibility_sum', models.FloatField(blank=True, null=True)),
+                ('visibility_count', models.IntegerField(default=0)),
+                ('feels_like_min', models.FloatField(blank=True, null=True)),
+                ('feels_like_max', models.FloatField(blank=True, null=True)),
+                ('feels_like_sum', models.FloatField(blank=True, null=True)),
+                ('feels_like_count', models.IntegerField(default=0)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='weather.weathersite')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+                'unique_together': {('site', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_sum', models.FloatField(blank=True, null=True)),
+                ('temperature_count', models.IntegerField(default=0)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('humidity_sum', models.FloatField(blank=True, null=True)),
+                ('humidity_count', models.IntegerField(default=0)),
+                ('wind_speed_min', models.FloatField(blank=True, null=True)),
+                ('wind_speed_max', models.FloatField(blank=True, null=True)),
+                ('wind_speed_sum', models.FloatField(blank=True, null=True)),
+                ('wind_speed_count', models.IntegerField(default=0)),
+                ('pressure_min', models.FloatField(blank=True, null=True)),
+                ('pressure_max', models.FloatField(blank=True, null=True)),
+                ('pressure_sum', models.FloatField(blank=True, null=True)),
+                ('pressure_count', models.IntegerField(default=0)),
+                ('precipitation_min', models.FloatField(blank=True, null=True)),
+                ('precipitation_max', models.FloatField(blank=True, null=True)),
+                ('precipitation_sum', models.FloatField(blank=True, null=True)),
+                ('precipitation_count', models.IntegerField(default=0)),
+                ('uv_index_min', models.FloatField(blank=True, null=True)),
+                ('uv_index_max', models.FloatField(blank=True, null=True)),
+                ('uv_index_sum', models.FloatField(blank=True, null=True)),
+                ('uv_index_count', models.IntegerField(default=0)),
+                ('cloud_cover_min', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_max', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_sum', models.FloatField(blank=True, null=True)),
+                ('cloud_cover_count', models.IntegerField(default=0)),
+                ('visibility_min', models.FloatField(blank=True, null=True)),
+                ('visibility_max', models.FloatField(blank=True, null=True)),
+                ('visibility_sum', models.FloatField(blank=True, null=True)),
+                ('visibility_count', models.IntegerField(default=0)),
+                ('feels_like_min', models.FloatField(blank=True, null=True)),
+                ('feels_like_max', models.FloatField(blank=True, null=True)),
+                ('feels_like_sum', models.FloatField(blank=True, null=True)),
+                ('feels_like_count', models.IntegerField(default=0)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='weather.weathersite')),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+                'unique_together': {('site', 'bucket_start')},
+            },
+        ),
+    ]
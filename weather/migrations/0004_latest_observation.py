@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SNAPSHOT_FIELDS = [
+    'temperature', 'humidity', 'wind_speed', 'wind_direction', 'pressure',
+    'precipitation', 'uv_index', 'cloud_cover', 'feels_like', 'visibility',
+]
+
+
+def populate_latest_observations(apps, schema_editor):
+    WeatherSite = apps.get_model('weather', 'WeatherSite')
+    WeatherData = apps.get_model('weather', 'WeatherData')
+    LatestObservation = apps.get_model('weather', 'LatestObservation')
+    snapshots = []
+    for site_id in WeatherSite.objects.values_list('id', flat=True):
+        latest = WeatherData.objects.filter(site_id=site_id).order_by('-timestamp').values('timestamp', *SNAPSHOT_FIELDS).first()
+        if latest:
+            snapshots.append(LatestObservation(site_id=site_id, **latest))
+    LatestObservation.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0003_weather_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestObservation',
+            fields=[
+                ('site', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_observation', serialize=False, to='weather.weathersite')),
+                ('timestamp', models.DateTimeField()),
+                ('temperature', models.FloatField(blank=True, help_text='Temperature in Celsius', null=True)),
+                ('humidity', models.FloatField(blank=True, help_text='Relative humidity in %', null=True)),
+                ('wind_speed', models.FloatField(blank=True, help_text='Wind speed in m/s', null=True)),
+                ('wind_direction', models.FloatField(blank=True, help_text='Wind direction in degrees', null=True)),
+                ('pressure', models.FloatField(blank=True, help_text='Atmospheric pressure in hPa', null=True)),
+                ('precipitation', models.FloatField(blank=True, help_text='Precipitation in mm', null=True)),
+                ('uv_index', models.FloatField(blank=True, help_text='UV Index', null=True)),
+                ('cloud_cover', models.FloatField(blank=True, help_text='Cloud cover in %', null=True)),
+                ('feels_like', models.FloatField(blank=True, help_text='Feels like temperature in Celsius', null=True)),
+                ('visibility', models.FloatField(blank=True, help_text='Visibility in km', null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_latest_observations, migrations.RunPython.noop),
+    ]
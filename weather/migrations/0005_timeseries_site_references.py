@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0004_latest_observation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyrollup',
+            name='site',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(class)ss', to='weather.weathersite'),
+        ),
+        migrations.AlterField(
+            model_name='hourlyforecast',
+            name='site',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='hourly_forecasts', to='weather.weathersite'),
+        ),
+        migrations.AlterField(
+            model_name='hourlyrollup',
+            name='site',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(class)ss', to='weather.weathersite'),
+        ),
+        migrations.AlterField(
+            model_name='monthlyrollup',
+            name='site',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='%(class)ss', to='weather.weathersite'),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='site',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='weather_data', to='weather.weathersite'),
+        ),
+        migrations.AlterField(
+            model_name='weatherforecast',
+            name='site',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='forecasts', to='weather.weathersite'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0005_timeseries_site_references'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('completed_through', models.DateField(blank=True, help_text='Last day stored; empty until the first window is written', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backfill_checkpoints', to='weather.weathersite')),
+            ],
+            options={
+                'unique_together': {('site', 'start_date', 'end_date')},
+            },
+        ),
+    ]
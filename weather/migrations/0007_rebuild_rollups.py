@@ -0,0 +1,66 @@
+from datetime import timezone as dt_timezone
+
+from django.db import connections, migrations, router, transaction
+from django.db.models import Min
+
+ROLLUP_FIELDS = [
+    'temperature', 'humidity', 'wind_speed', 'pressure', 'precipitation',
+    'uv_index', 'cloud_cover', 'visibility', 'feels_like',
+]
+ROLLUP_MODELS = {'hour': 'HourlyRollup', 'day': 'DailyRollup', 'month': 'MonthlyRollup'}
+CHUNK_SIZE = 5000
+
+
+def bucket_floor(moment, resolution):
+    moment = moment.astimezone(dt_timezone.utc)
+    if resolution == 'month':
+        return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def fold_existing_observations(apps, schema_editor):
+    # 0003 only created the rollup tables, so observations stored before it were never folded in.
+    # Same folding as rollups.rebuild_rollups(), on the historical models: UTC hour, day and month
+    # buckets holding the min, max, sum and count of each field.
+    WeatherData = apps.get_model('weather', 'WeatherData')
+    rollup_models = {resolution: apps.get_model('weather', name) for resolution, name in ROLLUP_MODELS.items()}
+    alias = router.db_for_write(WeatherData)
+    tables = connections[alias].introspection.table_names()
+    if WeatherData._meta.db_table not in tables or rollup_models['hour']._meta.db_table not in tables:
+        # The time-series database isn't migrated yet; move_timeseries copies the rollups.
+        return
+    oldest = WeatherData.objects.values('site_id').annotate(oldest=Min('timestamp')).values_list('site_id', 'oldest')
+    for site_id, oldest_timestamp in oldest:
+        buckets = {resolution: {} for resolution in rollup_models}
+        rows = WeatherData.objects.filter(site_id=site_id).order_by('pk').values_list('timestamp', *ROLLUP_FIELDS)
+        for timestamp, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            for resolution, folded in buckets.items():
+                bucket = folded.setdefault(bucket_floor(timestamp, resolution), {})
+                for field, value in zip(ROLLUP_FIELDS, values):
+                    if value is None:
+                        continue
+                    bucket[f'{field}_min'] = min(value, bucket.get(f'{field}_min', value))
+                    bucket[f'{field}_max'] = max(value, bucket.get(f'{field}_max', value))
+                    bucket[f'{field}_sum'] = bucket.get(f'{field}_sum', 0.0) + value
+                    bucket[f'{field}_count'] = bucket.get(f'{field}_count', 0) + 1
+        with transaction.atomic(using=alias):
+            for resolution, model in rollup_models.items():
+                # Buckets before the oldest raw row's month are all that is left of compacted rows.
+                model.objects.filter(site_id=site_id, bucket_start__gte=bucket_floor(oldest_timestamp, 'month')).delete()
+                model.objects.bulk_create(
+                    [model(site_id=site_id, bucket_start=bucket_start, **aggregates) for bucket_start, aggregates in buckets[resolution].items()],
+                    batch_size=500,
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0006_backfill_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_existing_observations, migrations.RunPython.noop),
+    ]
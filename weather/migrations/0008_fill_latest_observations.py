@@ -0,0 +1,35 @@
+from django.db import connections, migrations, router
+
+SNAPSHOT_FIELDS = [
+    'temperature', 'humidity', 'wind_speed', 'wind_direction', 'pressure',
+    'precipitation', 'uv_index', 'cloud_cover', 'feels_like', 'visibility',
+]
+
+
+def fill_missing_snapshots(apps, schema_editor):
+    # 0004 fills the snapshots from WeatherData in the same database. Where observations live in
+    # the time-series database (weather.db), sites can still lack one; fill those from there.
+    WeatherSite = apps.get_model('weather', 'WeatherSite')
+    WeatherData = apps.get_model('weather', 'WeatherData')
+    LatestObservation = apps.get_model('weather', 'LatestObservation')
+    alias = router.db_for_read(WeatherData)
+    if WeatherData._meta.db_table not in connections[alias].introspection.table_names():
+        # Not migrated yet; move_timeseries refreshes the snapshots after copying.
+        return
+    snapshots = []
+    for site_id in WeatherSite.objects.filter(latest_observation__isnull=True).values_list('id', flat=True):
+        latest = WeatherData.objects.filter(site_id=site_id).order_by('-timestamp').values('timestamp', *SNAPSHOT_FIELDS).first()
+        if latest:
+            snapshots.append(LatestObservation(site_id=site_id, **latest))
+    LatestObservation.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0007_rebuild_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_missing_snapshots, migrations.RunPython.noop),
+    ]
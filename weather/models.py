@@ -29,7 +29,9 @@ class WeatherSite(models.Model):
 
 class WeatherData(models.Model):
     """Model to store current weather data for each site"""
-    site = models.ForeignKey(WeatherSite, on_delete=models.CASCADE, related_name='weather_data')
+    # Time-series models reference the site by id only, since they may live in the 'timeseries'
+    # database (see weather.db); their rows are removed with the site by weather.db.delete_site_history.
+    site = models.ForeignKey(WeatherSite, on_delete=models.DO_NOTHING, db_constraint=False, related_name='weather_data')
     timestamp = models.DateTimeField(default=timezone.now)
     
     # Current weather parameters
@@ -57,9 +59,35 @@ class WeatherData(models.Model):
     def __str__(self):
         return f"{self.site.name} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+# WeatherData fields copied into LatestObservation
+SNAPSHOT_FIELDS = [
+    'temperature', 'humidity', 'wind_speed', 'wind_direction', 'pressure',
+    'precipitation', 'uv_index', 'cloud_cover', 'feels_like', 'visibility',
+]
+
+class LatestObservation(models.Model):
+    """Values of the newest WeatherData row for each site, upserted by every writer so
+    listings can show current conditions with one join"""
+    site = models.OneToOneField(WeatherSite, on_delete=models.CASCADE, primary_key=True, related_name='latest_observation')
+    timestamp = models.DateTimeField()
+
+    temperature = models.FloatField(null=True, blank=True, help_text="Temperature in Celsius")
+    humidity = models.FloatField(null=True, blank=True, help_text="Relative humidity in %")
+    wind_speed = models.FloatField(null=True, blank=True, help_text="Wind speed in m/s")
+    wind_direction = models.FloatField(null=True, blank=True, help_text="Wind direction in degrees")
+    pressure = models.FloatField(null=True, blank=True, help_text="Atmospheric pressure in hPa")
+    precipitation = models.FloatField(null=True, blank=True, help_text="Precipitation in mm")
+    uv_index = models.FloatField(null=True, blank=True, help_text="UV Index")
+    cloud_cover = models.FloatField(null=True, blank=True, help_text="Cloud cover in %")
+    feels_like = models.FloatField(null=True, blank=True, help_text="Feels like temperature in Celsius")
+    visibility = models.FloatField(null=True, blank=True, help_text="Visibility in km")
+
+    def __str__(self):
+        return f"{self.site.name} - latest at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
 class WeatherForecast(models.Model):
     """Model to store forecast data for each site"""
-    site = models.ForeignKey(WeatherSite, on_delete=models.CASCADE, related_name='forecasts')
+    site = models.ForeignKey(WeatherSite, on_delete=models.DO_NOTHING, db_constraint=False, related_name='forecasts')
     forecast_time = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -72,6 +100,7 @@ class WeatherForecast(models.Model):
     pressure = models.FloatField(null=True, blank=True)
     precipitation = models.FloatField(null=True, blank=True)
     precipitation_probability = models.FloatField(null=True, blank=True)
+    weather_code = models.IntegerField(null=True, blank=True, help_text="WMO weather code")
     
     class Meta:
         ordering = ['forecast_time']
@@ -83,6 +112,76 @@ class WeatherForecast(models.Model):
     def __str__(self):
         return f"{self.site.name} - Forecast for {self.forecast_time.strftime('%Y-%m-%d')}"
 
+class HourlyForecast(models.Model):
+    """Model to store hourly forecast steps for each site, refreshed once per model run"""
+    site = models.ForeignKey(WeatherSite, on_delete=models.DO_NOTHING, db_constraint=False, related_name='hourly_forecasts')
+    forecast_time = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    temperature = models.FloatField(null=True, blank=True, help_text="Temperature in Celsius")
+    feels_like = models.FloatField(null=True, blank=True, help_text="Feels like temperature in Celsius")
+    humidity = models.FloatField(null=True, blank=True, help_text="Relative humidity in %")
+    wind_speed = models.FloatField(null=True, blank=True, help_text="Wind speed in m/s")
+    wind_direction = models.FloatField(null=True, blank=True, help_text="Wind direction in degrees")
+    pressure = models.FloatField(null=True, blank=True, help_text="Surface pressure in hPa")
+    precipitation = models.FloatField(null=True, blank=True, help_text="Precipitation in mm")
+    cloud_cover = models.FloatField(null=True, blank=True, help_text="Cloud cover in %")
+    uv_index = models.FloatField(null=True, blank=True, help_text="UV Index")
+
+    class Meta:
+        ordering = ['forecast_time']
+        unique_together = ['site', 'forecast_time']
+
+    def __str__(self):
+        return f"{self.site.name} - Hourly forecast for {self.forecast_time.strftime('%Y-%m-%d %H:%M')}"
+
+# WeatherData fields summarised by the rollup tables. Wind direction is circular, so it is not averaged.
+ROLLUP_FIELDS = [
+    'temperature', 'humidity', 'wind_speed', 'pressure', 'precipitation',
+    'uv_index', 'cloud_cover', 'visibility', 'feels_like',
+]
+
+class WeatherRollup(models.Model):
+    """Min, max, sum and count of each ROLLUP_FIELDS field for one site and time bucket"""
+    site = models.ForeignKey(WeatherSite, on_delete=models.DO_NOTHING, db_constraint=False, related_name='%(class)ss')
+    bucket_start = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+        ordering = ['bucket_start']
+        unique_together = ['site', 'bucket_start']
+
+    def __str__(self):
+        return f"{self.site.name} - {self.bucket_start.isoformat()}"
+
+for _field in ROLLUP_FIELDS:
+    for _aggregate in ('min', 'max', 'sum'):
+        WeatherRollup.add_to_class(f'{_field}_{_aggregate}', models.FloatField(null=True, blank=True))
+    WeatherRollup.add_to_class(f'{_field}_count', models.IntegerField(default=0))
+
+class HourlyRollup(WeatherRollup):
+    """Observations summarised per UTC hour"""
+
+class DailyRollup(WeatherRollup):
+    """Observations summarised per UTC day"""
+
+class MonthlyRollup(WeatherRollup):
+    """Observations summarised per UTC calendar month"""
+
+class BackfillCheckpoint(models.Model):
+    """Progress of backfill_weather for one site and date range, so an interrupted run resumes"""
+    site = models.ForeignKey(WeatherSite, on_delete=models.CASCADE, related_name='backfill_checkpoints')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    completed_through = models.DateField(null=True, blank=True, help_text="Last day stored; empty until the first window is written")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['site', 'start_date', 'end_date']
+
+    def __str__(self):
+        return f"{self.site.name} - backfill {self.start_date}..{self.end_date} through {self.completed_through or '-'}"
+
 class WeatherAlert(models.Model):
     """Model to store weather alerts and warnings"""
     ALERT_TYPES = [
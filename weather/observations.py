@@ -0,0 +1,178 @@
+# weather/observations.py
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+
+from .caching import invalidate_observations
+from .models import LatestObservation, WeatherData
+from .rollups import update_rollups
+from .snapshots import update_latest_observations
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITER_FLUSH_MS = 200      # longest a queued row waits before its batch is written
+DEFAULT_WRITER_BATCH_SIZE = 500    # rows that trigger a write straight away
+WRITER_SHUTDOWN_TIMEOUT = 5        # seconds spent flushing queued rows at interpreter exit
+
+
+# WeatherData field -> get_current_weather() key
+WEATHER_DATA_FIELD_MAP = {'temperature':'temperature_2m', 'humidity':'relative_humidity_2m', 'wind_speed':'wind_speed_10m', 'wind_direction':'wind_direction_10m', 'pressure':'surface_pressure', 'precipitation':'precipitation', 'uv_index':'uv_index', 'cloud_cover':'cloud_cover', 'feels_like':'apparent_temperature', 'visibility':'visibility'}
+
+
+def weather_data_fields(api_response):
+    """Map a get_current_weather() response onto WeatherData field values."""
+    db_data = {k: api_response.get(v) for k, v in WEATHER_DATA_FIELD_MAP.items()}
+    for key, val in db_data.items():
+        if val is not None:
+            try: db_data[key] = float(val)
+            except (ValueError, TypeError): db_data[key] = None
+    return db_data
+
+
+def build_observation(site, api_response):
+    """Unsaved WeatherData row for a get_current_weather() response, or None when it has no data."""
+    if not api_response or not api_response.get("time"):
+        return None
+    return WeatherData(site=site, **weather_data_fields(api_response))
+
+
+def save_observations(observations, invalidate=True):
+    """Insert unsaved WeatherData rows with one bulk_create and fold them into the rollups and
+    latest-observation snapshots in the same transaction, so SQLite takes the write lock and
+    syncs once. Cached responses built from the old observations are then dropped together,
+    unless ``invalidate`` is off because the caller has already cached the fresh response.
+    """
+    observations = list(observations)
+    if not observations:
+        return observations
+    alias = router.db_for_write(WeatherData)
+    separate_snapshots = router.db_for_write(LatestObservation) != alias
+    with transaction.atomic(using=alias):
+        WeatherData.objects.bulk_create(observations)
+        update_rollups(observations)
+        if not separate_snapshots:
+            update_latest_observations(observations)
+    if separate_snapshots:
+        # The snapshots live with the sites: update them only once the observations have
+        # committed, so they never point at rows that were rolled back.
+        update_latest_observations(observations)
+    if invalidate:
+        invalidate_observations(sorted({obs.site_id for obs in observations}))
+    return observations
+
+
+class ObservationWriter:
+    """Single background thread that owns WeatherData inserts for this process.
+
+    Submitted rows are queued and written by save_observations() in batches: when
+    ``batch_size`` rows are waiting or ``flush_ms`` after the first one arrived. Request
+    threads therefore never wait on the write lock or an fsync, and one worker commits
+    once per batch instead of once per row. Other processes still write on their own
+    connections; WAL and busy_timeout (see weather.db) keep them from failing.
+    """
+
+    def __init__(self, flush_ms=DEFAULT_WRITER_FLUSH_MS, batch_size=DEFAULT_WRITER_BATCH_SIZE):
+        self.flush_seconds = flush_ms / 1000
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # A forked worker inherits the queue but not the thread, so start one per process.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()  # rows queued before the fork belong to the parent
+                self._thread = threading.Thread(target=self._run, name='observation-writer', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, observations, invalidate=True):
+        """Queue unsaved WeatherData rows. The returned Future resolves to the number of rows
+        once their batch is committed, or to the exception that rolled it back. ``invalidate``
+        is passed on to save_observations() for these rows."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((list(observations), invalidate, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far is written."""
+        if self._thread is not None and self._pid == os.getpid():
+            self.submit([]).result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            pending = len(batch[0][0])
+            flush_at = time.monotonic() + self.flush_seconds
+            while pending < self.batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                pending += len(batch[-1][0])
+            self._write(batch)
+
+    def _write(self, batch):
+        observations = [obs for rows, _, _ in batch for obs in rows]
+        # This thread keeps its connection between batches; drop it if it is broken or past CONN_MAX_AGE.
+        close_old_connections()
+        try:
+            save_observations(observations, invalidate=False)
+        except Exception as e:
+            logger.error(f"Observation writer: failed to store {len(observations)} rows: {e}", exc_info=True)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        invalidate_observations(sorted({obs.site_id for rows, invalidate, _ in batch if invalidate for obs in rows}))
+        for rows, _, future in batch:
+            future.set_result(len(rows))
+
+
+_writer = None
+_writer_guard = threading.Lock()
+
+
+def get_observation_writer():
+    global _writer
+    with _writer_guard:
+        if _writer is None:
+            _writer = ObservationWriter(
+                flush_ms=getattr(settings, 'WEATHER_WRITER_FLUSH_MS', DEFAULT_WRITER_FLUSH_MS),
+                batch_size=getattr(settings, 'WEATHER_WRITER_BATCH_SIZE', DEFAULT_WRITER_BATCH_SIZE),
+            )
+            atexit.register(_writer.flush, WRITER_SHUTDOWN_TIMEOUT)
+        return _writer
+
+
+def record_observations(observations, wait=False, invalidate=True):
+    """Store unsaved WeatherData rows through the observation writer.
+
+    With ``wait`` this returns once they are committed and re-raises a failed write. With
+    WEATHER_WRITE_QUEUE off (e.g. serverless, where a background thread can be frozen
+    mid-batch) rows are written synchronously on the calling thread. Pass
+    ``invalidate=False`` when the caller caches the response the rows came from itself: a
+    queued write lands after that, and invalidating would throw the fresh response away.
+    """
+    observations = list(observations)
+    if not observations:
+        return 0
+    if not getattr(settings, 'WEATHER_WRITE_QUEUE', True):
+        return len(save_observations(observations, invalidate=invalidate))
+    future = get_observation_writer().submit(observations, invalidate=invalidate)
+    return future.result() if wait else len(observations)
@@ -0,0 +1,142 @@
+# weather/refresh.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from .observations import build_observation, record_observations
+from .utils import get_weather_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 10
+DEFAULT_SITE_TIMEOUT = 10    # seconds a single upstream call may take once started
+DEFAULT_BATCH_TIMEOUT = 25   # seconds for the whole refresh; keep below the gunicorn worker timeout
+
+
+def _fetch_chunk(client, chunk, started_at):
+    started_at[id(chunk)] = time.monotonic()
+    return client.get_current_weather_many(chunk)
+
+
+def fetch_current_weather_concurrently(sites, max_workers=None, chunk_size=None, site_timeout=None, batch_timeout=None):
+    """Fetch current weather for many sites with bounded parallelism.
+
+    Sites are split into chunks of ``chunk_size``; each chunk is one batched
+    upstream call and at most ``max_workers`` chunks are in flight at once. A chunk
+    that runs longer than ``site_timeout`` or is still pending when ``batch_timeout``
+    expires is reported as timed out and whatever finished is returned.
+
+    Returns a dict with ``results`` ({site.id: api_response}), ``chunk_seconds``
+    ({site.id: seconds the site's chunk ran}), ``timed_out`` (list of site ids) and ``elapsed``.
+    """
+    max_workers = max_workers or getattr(settings, 'WEATHER_REFRESH_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+    chunk_size = chunk_size or getattr(settings, 'WEATHER_REFRESH_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    site_timeout = site_timeout or getattr(settings, 'WEATHER_REFRESH_SITE_TIMEOUT', DEFAULT_SITE_TIMEOUT)
+    batch_timeout = batch_timeout or getattr(settings, 'WEATHER_REFRESH_BATCH_TIMEOUT', DEFAULT_BATCH_TIMEOUT)
+
+    sites = list(sites)
+    chunks = [sites[i:i + chunk_size] for i in range(0, len(sites), chunk_size)]
+    client = get_weather_client()
+    results, chunk_seconds, timed_out = {}, {}, []
+    started_at = {}
+    batch_start = time.monotonic()
+    batch_deadline = batch_start + batch_timeout
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='weather-refresh')
+    try:
+        pending = {executor.submit(_fetch_chunk, client, chunk, started_at): chunk for chunk in chunks}
+        while pending:
+            now = time.monotonic()
+            # Expire chunks that have been running longer than the per-call deadline.
+            for future, chunk in list(pending.items()):
+                chunk_start = started_at.get(id(chunk))
+                if chunk_start is not None and now - chunk_start >= site_timeout and not future.done():
+                    logger.warning(f"Weather refresh: chunk of {len(chunk)} sites exceeded {site_timeout}s deadline.")
+                    future.cancel()
+                    for site in chunk:
+                        timed_out.append(site.id)
+                        chunk_seconds[site.id] = now - chunk_start
+                    del pending[future]
+            if not pending:
+                break
+
+            remaining = batch_deadline - now
+            if remaining <= 0:
+                logger.warning(f"Weather refresh: batch deadline of {batch_timeout}s hit with {len(pending)} chunks outstanding.")
+                for future, chunk in pending.items():
+                    future.cancel()
+                    chunk_start = started_at.get(id(chunk))
+                    for site in chunk:
+                        timed_out.append(site.id)
+                        chunk_seconds[site.id] = now - chunk_start if chunk_start is not None else 0.0
+                break
+
+            running_starts = [started_at[id(c)] for c in pending.values() if id(c) in started_at]
+            next_site_deadline = min(running_starts) + site_timeout - now if running_starts else remaining
+            done, _ = wait(pending, timeout=max(0.0, min(remaining, next_site_deadline)), return_when=FIRST_COMPLETED)
+            finished_at = time.monotonic()
+            for future in done:
+                chunk = pending.pop(future)
+                elapsed = finished_at - started_at.get(id(chunk), finished_at)
+                try:
+                    chunk_results = future.result()
+                except Exception as e:
+                    logger.error(f"Weather refresh: chunk of {len(chunk)} sites failed: {e}", exc_info=True)
+                    chunk_results = {}
+                for site in chunk:
+                    chunk_seconds[site.id] = elapsed
+                    if site.id in chunk_results:
+                        results[site.id] = chunk_results[site.id]
+    finally:
+        # Don't let a stuck upstream call hold the caller; abandoned threads finish on their own.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        'results': results,
+        'chunk_seconds': chunk_seconds,
+        'timed_out': timed_out,
+        'elapsed': time.monotonic() - batch_start,
+    }
+
+
+def refresh_sites(sites, **fetch_options):
+    """Fetch current weather for ``sites`` concurrently and store a WeatherData row per site.
+
+    Shared by the bulk update endpoint and the ``refresh_weather`` command. Once fetching
+    has finished, every row goes to the observation writer in one batch and this waits
+    until it is committed.
+    """
+    sites = list(sites)
+    outcome = fetch_current_weather_concurrently(sites, **fetch_options)
+    failed_sites, timed_out_sites, observations = [], [], []
+    timed_out_ids = set(outcome['timed_out'])
+
+    for site in sites:
+        if site.id in timed_out_ids:
+            timed_out_sites.append(site.name)
+            continue
+        api_response = outcome['results'].get(site.id)
+        observation = build_observation(site, api_response)
+        if observation is None:
+            logger.warning(f"No valid API response for site {site.name} during bulk update. API Response: {api_response}")
+            failed_sites.append(site.name)
+            continue
+        observations.append(observation)
+
+    try:
+        record_observations(observations, wait=True)
+    except Exception as e_write:
+        logger.error(f"Error storing {len(observations)} observations during bulk update: {e_write}", exc_info=True)
+        failed_sites.extend(observation.site.name for observation in observations)
+        observations = []
+    return {
+        'total': len(sites),
+        'updated_count': len(observations),
+        'failed_sites': failed_sites,
+        'timed_out_sites': timed_out_sites,
+        # Keyed by site id like the fetch results; every site in a chunk shares that chunk's duration.
+        'chunk_seconds': {site.id: round(outcome['chunk_seconds'][site.id], 3) for site in sites if site.id in outcome['chunk_seconds']},
+        'elapsed': round(outcome['elapsed'], 3),
+    }
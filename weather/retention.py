@@ -0,0 +1,168 @@
+# weather/retention.py
+import logging
+import time
+from datetime import timedelta
+
+import pandas as pd
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import ROLLUP_FIELDS, HourlyRollup, WeatherData, WeatherSite
+from .rollups import ROLLUP_MODELS, _bucket_starts, _fold_frame, bucket_floor, get_retention_days
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_CHUNK_SIZE = 5000
+DEFAULT_VACUUM_PAGES = 1000
+# Finest first: each tier must be kept at least as long as the one before it.
+RETENTION_TIERS = ('raw', 'hour', 'day', 'month')
+
+
+def validate_retention(retention):
+    """Raise ValueError unless coarser tiers are kept at least as long as finer ones."""
+    longest = 0
+    for tier in RETENTION_TIERS:
+        days = retention.get(tier)
+        if days is None:
+            longest = float('inf')
+            continue
+        if days < longest:
+            raise ValueError(f"Retention for '{tier}' ({days} days) is shorter than for a finer tier.")
+        longest = days
+
+
+def retention_cutoff(tier, retention=None, now=None):
+    """Rows of ``tier`` older than this are removed, or None when the tier is kept forever.
+
+    Raw rows go in whole calendar months, so rebuild_rollups() never finds a month only partly
+    backed by raw rows. Rollup buckets go once they start before the tier's horizon.
+    """
+    days = (retention or get_retention_days()).get(tier)
+    if days is None:
+        return None
+    horizon = (now or timezone.now()) - timedelta(days=days)
+    return bucket_floor(horizon, 'month') if tier == 'raw' else horizon
+
+
+def _site_ids(site_ids):
+    qs = WeatherSite.objects.order_by('id')
+    if site_ids:
+        qs = qs.filter(id__in=site_ids)
+    return list(qs.values_list('id', flat=True))
+
+
+def _fold_unrolled(site_id, rows):
+    """Fold raw rows whose hour has no rollup yet, i.e. rows written before rollups existed."""
+    frame = pd.DataFrame(rows, columns=['site_id', 'timestamp'] + ROLLUP_FIELDS)
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+    hours = _bucket_starts(frame['timestamp'], 'hour')
+    rolled = pd.to_datetime(list(
+        HourlyRollup.objects.filter(site_id=site_id, bucket_start__gte=hours.min(), bucket_start__lte=hours.max())
+        .values_list('bucket_start', flat=True)
+    ), utc=True)
+    unrolled = frame[~hours.isin(rolled)]
+    _fold_frame(unrolled)
+    return len(unrolled)
+
+
+def compact_observations(cutoff, site_ids=None, chunk_size=DEFAULT_COMPACT_CHUNK_SIZE, pause=0, dry_run=False):
+    """Delete WeatherData rows older than ``cutoff``, site by site in whole hours of about
+    ``chunk_size`` rows. Returns (rows_deleted, rows_folded).
+
+    Rows are already in the rollups when written; any hour without a rollup predates them and is
+    folded in the same transaction that deletes it. Each chunk commits on its own and ``pause``
+    seconds pass between chunks, so ingestion never waits long for the write lock.
+    """
+    alias = router.db_for_write(WeatherData)
+    deleted = folded = 0
+    for site_id in _site_ids(site_ids):
+        expiring = WeatherData.objects.filter(site_id=site_id, timestamp__lt=cutoff)
+        if dry_run:
+            deleted += expiring.count()
+            continue
+        while True:
+            # End the chunk on an hour boundary so an hour is never half folded.
+            edge = expiring.order_by('timestamp').values_list('timestamp', flat=True)[chunk_size:chunk_size + 1].first()
+            boundary = cutoff if edge is None else min(cutoff, bucket_floor(edge, 'hour') + timedelta(hours=1))
+            chunk = expiring.filter(timestamp__lt=boundary)
+            with transaction.atomic(using=alias):
+                rows = list(chunk.values_list('site_id', 'timestamp', *ROLLUP_FIELDS))
+                if not rows:
+                    break
+                folded += _fold_unrolled(site_id, rows)
+                chunk.delete()
+            deleted += len(rows)
+            if pause:
+                time.sleep(pause)
+    return deleted, folded
+
+
+def prune_rollups(resolution, cutoff, site_ids=None, chunk_size=DEFAULT_COMPACT_CHUNK_SIZE, pause=0, dry_run=False):
+    """Delete ``resolution`` rollup buckets starting before ``cutoff``, ``chunk_size`` at a time.
+
+    Coarser rollups already hold the same observations. Returns the number of buckets deleted.
+    """
+    model = ROLLUP_MODELS[resolution]
+    expiring = model.objects.filter(bucket_start__lt=cutoff)
+    if site_ids:
+        expiring = expiring.filter(site_id__in=site_ids)
+    if dry_run:
+        return expiring.count()
+    deleted = 0
+    while True:
+        pks = list(expiring.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        deleted += model.objects.filter(pk__in=pks).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+def compacted_tables():
+    return [WeatherData._meta.db_table] + [model._meta.db_table for model in ROLLUP_MODELS.values()]
+
+
+def vacuum(alias=None, pages=DEFAULT_VACUUM_PAGES, pause=0, full=False):
+    """Return free pages to the filesystem. Returns a short description of what was done.
+
+    On SQLite with auto_vacuum=INCREMENTAL, frees ``pages`` pages per short transaction. A full
+    VACUUM rewrites the whole file under an exclusive lock; with ``full`` it also switches the
+    database to incremental mode so later runs don't need it. PostgreSQL runs plain VACUUM,
+    which doesn't block writers.
+    """
+    connection = connections[alias or router.db_for_write(WeatherData)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for table in compacted_tables():
+                cursor.execute(f"VACUUM {connection.ops.quote_name(table)}")
+            return "vacuumed"
+        if connection.vendor != 'sqlite':
+            return f"skipped: VACUUM is not supported on {connection.vendor}"
+        if full:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("VACUUM")
+            return "rewrote the database with auto_vacuum=INCREMENTAL"
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != 2:
+            return "skipped: auto_vacuum is not INCREMENTAL (run once with --vacuum-full to enable it)"
+        freed = 0
+        while True:
+            cursor.execute("PRAGMA freelist_count")
+            free = cursor.fetchone()[0]
+            if not free:
+                return f"freed {freed} pages"
+            cursor.execute(f"PRAGMA incremental_vacuum({min(free, pages)})")
+            cursor.fetchall()
+            freed += min(free, pages)
+            if pause:
+                time.sleep(pause)
+
+
+def analyze(alias=None):
+    """Refresh planner statistics for the compacted tables (sampled on SQLite, so it stays quick)."""
+    connection = connections[alias or router.db_for_write(WeatherData)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("PRAGMA analysis_limit = 1000")
+        for table in compacted_tables():
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
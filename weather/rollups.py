@@ -0,0 +1,168 @@
+# weather/rollups.py
+from datetime import timezone as dt_timezone
+
+import pandas as pd
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Min
+from django.db.models.functions import NullIf
+
+from .models import ROLLUP_FIELDS, HourlyRollup, DailyRollup, MonthlyRollup, WeatherData
+
+# Coarsest first, so choose_rollup_resolution() can stop at the first one that is dense enough.
+ROLLUP_MODELS = {'month': MonthlyRollup, 'day': DailyRollup, 'hour': HourlyRollup}
+ROLLUP_BUCKET_SECONDS = {'month': 30 * 86400, 'day': 86400, 'hour': 3600}
+ROLLUP_AGGREGATES = ('min', 'max', 'sum', 'count')
+DEFAULT_TREND_POINTS = 150
+DEFAULT_REBUILD_CHUNK_SIZE = 20000
+# Days each tier is kept by compact_weather; None keeps it forever. Raw rows are WeatherData.
+DEFAULT_RETENTION_DAYS = {'raw': 30, 'hour': 365, 'day': None, 'month': None}
+
+
+def get_trend_points():
+    return getattr(settings, 'WEATHER_TREND_POINTS', DEFAULT_TREND_POINTS)
+
+
+def get_retention_days():
+    return {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'WEATHER_RETENTION_DAYS', {})}
+
+
+def _bucket_starts(timestamps, resolution):
+    """UTC bucket start for every timestamp in a tz-aware Series."""
+    timestamps = timestamps.dt.tz_convert('UTC')
+    if resolution == 'month':
+        return timestamps.dt.tz_localize(None).dt.to_period('M').dt.start_time.dt.tz_localize('UTC')
+    return timestamps.dt.floor('h' if resolution == 'hour' else 'D')
+
+
+def bucket_floor(moment, resolution):
+    """Start of the bucket containing ``moment``."""
+    moment = moment.astimezone(dt_timezone.utc)
+    if resolution == 'month':
+        return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert_sql(model, connection):
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    least, greatest = ('MIN', 'MAX') if connection.vendor == 'sqlite' else ('LEAST', 'GREATEST')
+    columns = ['site_id', 'bucket_start'] + [f'{field}_{aggregate}' for field in ROLLUP_FIELDS for aggregate in ROLLUP_AGGREGATES]
+    updates = []
+    for field in ROLLUP_FIELDS:
+        low, high, total, count = (quote(f'{field}_{aggregate}') for aggregate in ROLLUP_AGGREGATES)
+        # NULL means "no observations yet", so each side falls back to the other instead of poisoning the result.
+        updates += [
+            f"{low} = {least}(COALESCE({table}.{low}, excluded.{low}), COALESCE(excluded.{low}, {table}.{low}))",
+            f"{high} = {greatest}(COALESCE({table}.{high}, excluded.{high}), COALESCE(excluded.{high}, {table}.{high}))",
+            f"{total} = CASE WHEN {table}.{total} IS NULL THEN excluded.{total} "
+            f"WHEN excluded.{total} IS NULL THEN {table}.{total} ELSE {table}.{total} + excluded.{total} END",
+            f"{count} = {table}.{count} + excluded.{count}",
+        ]
+    return (
+        f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({quote('site_id')}, {quote('bucket_start')}) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def _fold_frame(frame):
+    """Add the observations in ``frame`` (site_id, timestamp and ROLLUP_FIELDS columns) to every rollup table."""
+    if frame.empty:
+        return
+    frame = frame.astype({field: 'float64' for field in ROLLUP_FIELDS})
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+    alias = router.db_for_write(HourlyRollup)
+    connection = connections[alias]
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for resolution, model in ROLLUP_MODELS.items():
+            grouped = frame.assign(bucket_start=_bucket_starts(frame['timestamp'], resolution)).groupby(['site_id', 'bucket_start'])[ROLLUP_FIELDS]
+            aggregates = {'min': grouped.min(), 'max': grouped.max(), 'sum': grouped.sum(min_count=1), 'count': grouped.count()}
+            columns = [aggregates[aggregate][field] for field in ROLLUP_FIELDS for aggregate in ROLLUP_AGGREGATES]
+            values = [column.astype(object).where(column.notna(), None).tolist() for column in columns]
+            rows = [
+                [int(site_id), connection.ops.adapt_datetimefield_value(bucket_start.to_pydatetime()), *row]
+                for (site_id, bucket_start), row in zip(aggregates['count'].index, zip(*values))
+            ]
+            cursor.executemany(_upsert_sql(model, connection), rows)
+
+
+def update_rollups(observations):
+    """Fold newly written WeatherData rows (saved or not) into the hourly, daily and monthly rollups."""
+    observations = list(observations)
+    if not observations:
+        return
+    _fold_frame(pd.DataFrame(
+        [(obs.site_id, obs.timestamp, *(getattr(obs, field) for field in ROLLUP_FIELDS)) for obs in observations],
+        columns=['site_id', 'timestamp'] + ROLLUP_FIELDS,
+    ))
+
+
+def _lock_observations(connection):
+    """Make other WeatherData writers wait until the current transaction ends. SQLite takes its
+    database-wide write lock at the transaction's first write; PostgreSQL needs a table lock."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {connection.ops.quote_name(WeatherData._meta.db_table)} IN SHARE ROW EXCLUSIVE MODE")
+
+
+def rebuild_rollups(site_ids=None, chunk_size=DEFAULT_REBUILD_CHUNK_SIZE):
+    """Recompute the rollups from raw WeatherData, ``chunk_size`` rows at a time. Returns rows folded.
+
+    Only buckets from the month of a site's oldest raw row onwards are rebuilt; older buckets are
+    all that is left of compacted observations and are kept. Each site is rebuilt in one
+    transaction holding the write lock, so observations written meanwhile wait for it instead of
+    being counted twice; ingestion stalls for as long as one site takes.
+    """
+    raw = WeatherData.objects.all()
+    if site_ids:
+        raw = raw.filter(site_id__in=site_ids)
+    alias = router.db_for_write(WeatherData)
+    oldest = list(raw.values('site_id').annotate(oldest=Min('timestamp')).values_list('site_id', 'oldest'))
+    folded = 0
+    for site_id, oldest_timestamp in oldest:
+        with transaction.atomic(using=alias):
+            _lock_observations(connections[alias])
+            for model in ROLLUP_MODELS.values():
+                model.objects.filter(site_id=site_id, bucket_start__gte=bucket_floor(oldest_timestamp, 'month')).delete()
+            chunk = []
+            for row in raw.filter(site_id=site_id).order_by('pk').values_list('site_id', 'timestamp', *ROLLUP_FIELDS).iterator(chunk_size=chunk_size):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    _fold_frame(pd.DataFrame(chunk, columns=['site_id', 'timestamp'] + ROLLUP_FIELDS))
+                    folded, chunk = folded + len(chunk), []
+            _fold_frame(pd.DataFrame(chunk, columns=['site_id', 'timestamp'] + ROLLUP_FIELDS))
+            folded += len(chunk)
+    return folded
+
+
+def choose_rollup_resolution(span_seconds, min_points, archived=False):
+    """Coarsest rollup resolution that still gives ``min_points`` buckets over the span, or None for raw rows.
+
+    Tiers that compact_weather has already trimmed inside the span are skipped; if no retained tier
+    is dense enough, the finest one that still covers the span is used. With ``archived`` every
+    tier counts as covered, because the Parquet archive can fill in what was trimmed.
+    """
+    retention = get_retention_days()
+    covers = lambda tier: archived or retention.get(tier) is None or retention[tier] * 86400 >= span_seconds
+    retained = [resolution for resolution in ROLLUP_BUCKET_SECONDS if covers(resolution)]
+    for resolution in retained:
+        if span_seconds / ROLLUP_BUCKET_SECONDS[resolution] >= min_points:
+            return resolution
+    if covers('raw') or not retained:
+        return None
+    return retained[-1]
+
+
+def rollup_series(site, field, start_time, resolution):
+    """[(bucket_start, mean, min, max)] for ``field`` from ``start_time`` onwards, skipping empty buckets."""
+    model = ROLLUP_MODELS[resolution]
+    rows = (
+        model.objects.filter(site=site, bucket_start__gte=bucket_floor(start_time, resolution), **{f'{field}_count__gt': 0})
+        .order_by('bucket_start')
+        .annotate(mean=F(f'{field}_sum') / NullIf(F(f'{field}_count'), 0))
+        .values_list('bucket_start', 'mean', f'{field}_min', f'{field}_max')
+    )
+    return list(rows)
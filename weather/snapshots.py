@@ -0,0 +1,36 @@
+# weather/snapshots.py
+from django.db import connections, router, transaction
+
+from .models import SNAPSHOT_FIELDS, LatestObservation
+
+
+def _upsert_sql(connection):
+    quote = connection.ops.quote_name
+    table = quote(LatestObservation._meta.db_table)
+    columns = ['site_id', 'timestamp'] + SNAPSHOT_FIELDS
+    updates = ', '.join(f"{quote(column)} = excluded.{quote(column)}" for column in columns[1:])
+    # Only move forward in time, so a late or backfilled batch never replaces a newer observation.
+    return (
+        f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({quote('site_id')}) DO UPDATE SET {updates} "
+        f"WHERE excluded.{quote('timestamp')} >= {table}.{quote('timestamp')}"
+    )
+
+
+def update_latest_observations(observations):
+    """Point each site's LatestObservation at the newest of ``observations`` (WeatherData rows, saved or not)."""
+    newest = {}
+    for obs in observations:
+        if obs.site_id not in newest or obs.timestamp >= newest[obs.site_id].timestamp:
+            newest[obs.site_id] = obs
+    if not newest:
+        return
+    alias = router.db_for_write(LatestObservation)
+    connection = connections[alias]
+    rows = [
+        [site_id, connection.ops.adapt_datetimefield_value(obs.timestamp), *(getattr(obs, field) for field in SNAPSHOT_FIELDS)]
+        for site_id, obs in newest.items()
+    ]
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(connection), rows)
@@ -1,3 +1,1068 @@
-from django.test import TestCase
+import importlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openmeteo_sdk.Variable import Variable as SdkVariableEnum
+
+from . import archive, caching, views
+from .caching import CacheEntry, get_or_compute, get_or_compute_entry, read, store
+from .backfill import backfill_observations, build_backfill_observations, date_windows
+from .cache_backends import SQLiteCache
+from .db import TimeSeriesRouter
+from .downsampling import lttb_indices, take
+from .ingestion import (
+    FORECAST_DAILY_PARAMS, daily_forecast_from_db, forecast_summary_from_db, ingest_current_weather, ingest_forecasts,
+)
+from .models import (
+    BackfillCheckpoint, DailyRollup, HourlyForecast, HourlyRollup, LatestObservation, MonthlyRollup, WeatherData, WeatherForecast, WeatherSite,
+)
+from .observations import ObservationWriter, save_observations
+from .refresh import fetch_current_weather_concurrently, refresh_sites
+from .retention import compact_observations, prune_rollups, retention_cutoff, validate_retention
+from .rollups import choose_rollup_resolution, rebuild_rollups, update_rollups
+from .snapshots import update_latest_observations
+from .utils import (
+    WeatherAPIClient, _record_upstream_cache_outcome, get_weather_client, time_axis, time_axis_labels, upstream_cache_stats,
+    upstream_cache_ttl,
+)
+from .windrose import DEFAULT_SPEED_BIN_EDGES, wind_rose_histogram
+
+TEST_CACHE_DIR = tempfile.mkdtemp(prefix='weather-tests-')
+TEST_SETTINGS = {
+    'CACHES': {
+        alias: {'BACKEND': 'weather.cache_backends.SQLiteCache', 'LOCATION': os.path.join(TEST_CACHE_DIR, f'{alias}.sqlite3')}
+        for alias in ('default', 'upstream')
+    },
+    'WEATHER_WRITE_QUEUE': False,
+    'WEATHER_ARCHIVE_DIR': os.path.join(TEST_CACHE_DIR, 'archive'),
+}
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_CACHE_DIR, ignore_errors=True)
+
+
+def make_site(name='Khavda', **fields):
+    return WeatherSite.objects.create(**{
+        'name': name, 'latitude': 23.8, 'longitude': 69.7, 'capacity': '30 GW', 'site_type': 'Solar', 'state': 'Gujarat', **fields
+    })
+
+
+def hour_start(moment=None):
+    return (moment or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def current_response(temperature=25.0, moment=None):
+    """A get_current_weather() result with the fields stored in WeatherData."""
+    return {
+        'time': (moment or timezone.now()).isoformat(), 'interval': 900, 'temperature_2m': temperature,
+        'relative_humidity_2m': 40.0, 'wind_speed_10m': 5.0, 'wind_direction_10m': 270.0, 'surface_pressure': 1005.0,
+        'precipitation': 0.0, 'uv_index': 6.0, 'cloud_cover': 10.0, 'apparent_temperature': temperature + 1, 'visibility': 24.0,
+    }
+
+
+class FakeVariable:
+    """Stands in for an openmeteo_sdk VariableWithValues."""
+
+    def __init__(self, values, variable=None, altitude=0, member=0, unit=None):
+        self.values = np.asarray(values, dtype=np.float32)
+        self.variable, self.altitude, self.member, self.unit = variable, altitude, member, unit
+
+    def ValuesAsNumpy(self): return self.values
+    def ValuesLength(self): return len(self.values)
+    def Value(self): return self.values[0]
+    def Variable(self): return self.variable
+    def Altitude(self): return self.altitude
+    def EnsembleMember(self): return self.member
+    def Unit(self): return self.unit
+
+
+class FakeBlock:
+    """Stands in for the Current(), Hourly() and Daily() blocks of a response."""
+
+    def __init__(self, variables, start=1_700_000_000, interval=3600):
+        self.variables, self.start, self.interval = variables, start, interval
+
+    def Time(self): return self.start
+    def TimeEnd(self): return self.start + self.variables[0].ValuesLength() * self.interval
+    def Interval(self): return self.interval
+    def VariablesLength(self): return len(self.variables)
+    def Variables(self, i): return self.variables[i]
+
+
+class FakeResponse:
+    def __init__(self, location_id=0, current=None, daily=None, hourly=None, utc_offset=0):
+        self.location_id, self.current, self.daily, self.hourly = location_id, current, daily, hourly
+        self.utc_offset = utc_offset
+
+    def LocationId(self): return self.location_id
+    def UtcOffsetSeconds(self): return self.utc_offset
+    def Current(self): return self.current
+    def Daily(self): return self.daily
+    def Hourly(self): return self.hourly
+
+
+class FakeWeatherClient:
+    """WeatherAPIClient stand-in that records calls and returns canned data."""
+    batch_size = 50
+
+    def __init__(self, delay=0, slow_sites=()):
+        self.calls = []
+        self.delay, self.slow_sites = delay, set(slow_sites)
+        self._lock = threading.Lock()
+
+    def _record(self, name):
+        with self._lock:
+            self.calls.append(name)
+
+    def _hourly(self, params, days):
+        start = hour_start().replace(hour=0)
+        times = [(start + timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M:%SZ') for h in range(days * 24)]
+        return {'time': times, **{param: [float(h % 24) for h in range(days * 24)] for param in params}}
+
+    def _daily(self, params, days):
+        start = timezone.now().date()
+        times = [(start + timedelta(days=d)).isoformat() for d in range(days)]
+        return {'time': times, **{param: [float(d) for d in range(days)] for param in params}}
+
+    def get_current_weather(self, latitude, longitude):
+        self._record('current')
+        time.sleep(self.delay)
+        return current_response()
+
+    def get_current_weather_many(self, sites):
+        self._record('current_many')
+        if any(site.name in self.slow_sites for site in sites):
+            time.sleep(self.delay)
+        return {site.id: current_response(20.0 + site.id) for site in sites}
+
+    def get_forecast(self, latitude, longitude, daily_params=None, hourly_params=None, forecast_days=7, include_current=False, as_numpy=False):
+        self._record('forecast')
+        time.sleep(self.delay)
+        forecast = {}
+        if include_current:
+            forecast['current'] = current_response()
+        if daily_params:
+            forecast['daily'] = self._daily(daily_params, forecast_days)
+        if hourly_params:
+            forecast['hourly'] = self._hourly(hourly_params, forecast_days)
+        return forecast
+
+    def get_forecast_many(self, sites, daily_params=None, hourly_params=None, forecast_days=7, as_numpy=False):
+        self._record('forecast_many')
+        return {
+            site.id: {'daily': self._daily(daily_params or [], forecast_days), 'hourly': self._hourly(hourly_params or [], forecast_days)}
+            for site in sites
+        }
+
+
+@override_settings(**TEST_SETTINGS)
+class WeatherTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+@override_settings(**TEST_SETTINGS)
+class WeatherTransactionTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+
+class BatchedClientTests(WeatherTestCase):
+    """user-001: one upstream call per batch of sites, responses paired by location."""
+
+    def _current_responses(self, url, params):
+        return [
+            FakeResponse(index, current=FakeBlock([FakeVariable([20.0 + index]) for _ in WeatherAPIClient.CURRENT_PARAMS], interval=900))
+            for index, _ in enumerate(params['latitude'])
+        ]
+
+    def test_current_weather_many_batches_sites(self):
+        sites = [make_site(f"Site {i}", latitude=20 + i) for i in range(5)]
+        client = WeatherAPIClient(batch_size=2)
+        with mock.patch.object(client, '_weather_api', side_effect=self._current_responses) as weather_api:
+            results = client.get_current_weather_many(sites)
+        self.assertEqual(weather_api.call_count, 3)
+        self.assertEqual([len(call.args[1]['latitude']) for call in weather_api.call_args_list], [2, 2, 1])
+        self.assertEqual([results[site.id]['temperature_2m'] for site in sites], [20.0, 21.0, 20.0, 21.0, 20.0])
+
+    def test_failed_batch_returns_empty_results_for_its_sites(self):
+        sites = [make_site(f"Site {i}") for i in range(3)]
+        client = WeatherAPIClient(batch_size=2)
+        responses = [self._current_responses, RuntimeError('upstream down')]
+
+        def weather_api(url, params):
+            outcome = responses.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome(url, params)
+
+        with mock.patch.object(client, '_weather_api', side_effect=weather_api), self.assertLogs('weather.utils', 'ERROR'):
+            results = client.get_current_weather_many(sites)
+        self.assertIsNotNone(results[sites[0].id]['time'])
+        self.assertIsNone(results[sites[2].id]['time'])
+
+
+class SharedClientTests(WeatherTestCase):
+    """user-002: one pooled client per process."""
+
+    def test_get_weather_client_is_shared(self):
+        self.assertIs(get_weather_client(), get_weather_client())
+
+    @override_settings(WEATHER_API_POOL_SIZE=7)
+    def test_connection_pool_is_sized_from_settings(self):
+        client = WeatherAPIClient()
+        for prefix in ('http://', 'https://'):
+            adapter = client.session.get_adapter(prefix)
+            self.assertEqual(adapter._pool_maxsize, 7)
+            self.assertGreater(adapter.max_retries.total, 0)
+
+
+class ConcurrentRefreshTests(WeatherTestCase):
+    """user-003 and user-021: bounded fan-out with deadlines, rows stored in one batch."""
+
+    def test_slow_chunk_times_out_without_holding_the_rest(self):
+        sites = [make_site(f"Site {i}") for i in range(4)]
+        client = FakeWeatherClient(delay=1.0, slow_sites={'Site 2'})
+        with mock.patch('weather.refresh.get_weather_client', return_value=client), self.assertLogs('weather.refresh', 'WARNING'):
+            outcome = fetch_current_weather_concurrently(sites, max_workers=4, chunk_size=1, site_timeout=0.3, batch_timeout=5)
+        self.assertEqual(outcome['timed_out'], [sites[2].id])
+        self.assertEqual(set(outcome['results']), {sites[0].id, sites[1].id, sites[3].id})
+        self.assertLess(outcome['elapsed'], 0.9)
+
+    def test_parallelism_is_bounded(self):
+        sites = [make_site(f"Site {i}") for i in range(6)]
+        running, peak, lock = [0], [0], threading.Lock()
+
+        class CountingClient(FakeWeatherClient):
+            def get_current_weather_many(self, chunk):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.05)
+                with lock:
+                    running[0] -= 1
+                return super().get_current_weather_many(chunk)
+
+        with mock.patch('weather.refresh.get_weather_client', return_value=CountingClient()):
+            outcome = fetch_current_weather_concurrently(sites, max_workers=2, chunk_size=1, site_timeout=5, batch_timeout=5)
+        self.assertEqual(len(outcome['results']), 6)
+        self.assertLessEqual(peak[0], 2)
+
+    def test_refresh_sites_stores_every_observation_in_one_write(self):
+        sites = [make_site(f"Site {i}") for i in range(3)]
+        with mock.patch('weather.refresh.get_weather_client', return_value=FakeWeatherClient()), \
+                mock.patch('weather.observations.update_rollups', wraps=update_rollups) as rollups:
+            summary = refresh_sites(sites, chunk_size=2)
+        self.assertEqual(summary['updated_count'], 3)
+        self.assertEqual(WeatherData.objects.count(), 3)
+        self.assertEqual(rollups.call_count, 1)
+        self.assertEqual(LatestObservation.objects.count(), 3)
+
+    def test_chunk_durations_are_keyed_by_site_id(self):
+        sites = [make_site(f"Site {i}") for i in range(2)]
+        with mock.patch('weather.refresh.get_weather_client', return_value=FakeWeatherClient()):
+            summary = refresh_sites(sites, chunk_size=1)
+            out = StringIO()
+            call_command('refresh_weather', stdout=out)
+        self.assertEqual(set(summary['chunk_seconds']), {site.id for site in sites})
+        self.assertIn(f"Site 1 (ID {sites[1].id})", out.getvalue())
+
+
+class IngestionTests(WeatherTestCase):
+    """user-004 and user-015: scheduled ingestion, forecasts served from the database."""
+
+    def test_ingest_current_weather_stores_rows_and_caches_responses(self):
+        sites = [make_site(f"Site {i}") for i in range(2)]
+        self.assertEqual(ingest_current_weather(sites, client=FakeWeatherClient()), 2)
+        self.assertEqual(WeatherData.objects.count(), 2)
+        self.assertEqual(read(caching.current_weather_key(sites[0].id)).value['temperature_2m'], 20.0 + sites[0].id)
+
+    def test_current_weather_is_served_from_ingested_rows(self):
+        site = make_site()
+        ingest_current_weather([site], client=FakeWeatherClient())
+        client = FakeWeatherClient()
+        with mock.patch('weather.views.get_weather_client', return_value=client):
+            with self.settings(WEATHER_INGESTION_ENABLED=True):
+                self.assertEqual(views._fetch_current_weather(site)['temperature_2m'], 20.0 + site.id)
+            self.assertEqual(client.calls, [])
+            # Without scheduled ingestion the stored row could be the request path's own.
+            views._fetch_current_weather(site)
+        self.assertEqual(client.calls, ['current'])
+
+    def test_ingest_forecasts_upserts_runs(self):
+        site = make_site()
+        client = FakeWeatherClient()
+        written = ingest_forecasts([site], client=client, forecast_days=3)
+        self.assertEqual(written, 3 + 3 * 24)
+        ingest_forecasts([site], client=client, forecast_days=3)
+        self.assertEqual(WeatherForecast.objects.count(), 3)
+        self.assertEqual(HourlyForecast.objects.count(), 3 * 24)
+        summary = forecast_summary_from_db(site, forecast_days=3)
+        self.assertEqual(summary['daily']['temperature_2m_max'], [0.0, 1.0, 2.0])
+        self.assertEqual(read(caching.forecast_summary_key(site.id)).value['daily']['time'], summary['daily']['time'])
+
+    def test_stale_forecasts_are_only_served_on_request(self):
+        site = make_site()
+        ingest_forecasts([site], client=FakeWeatherClient(), forecast_days=3)
+        WeatherForecast.objects.update(created_at=timezone.now() - timedelta(days=1))
+        self.assertIsNone(daily_forecast_from_db(site, FORECAST_DAILY_PARAMS[:3]))
+        payload, age = daily_forecast_from_db(site, FORECAST_DAILY_PARAMS[:3], fresh_only=False, with_age=True)
+        self.assertEqual(len(payload['daily']['time']), 3)
+        self.assertGreater(age, 23 * 3600)
+
+    def test_steps_only_an_earlier_run_covered_are_dropped(self):
+        site = make_site()
+        ingest_forecasts([site], client=FakeWeatherClient(), forecast_days=5)
+        WeatherForecast.objects.update(created_at=timezone.now() - timedelta(hours=3))
+        ingest_forecasts([site], client=FakeWeatherClient(), forecast_days=3)
+        self.assertEqual(len(forecast_summary_from_db(site)['daily']['time']), 3)
+
+    def test_ingest_weather_once(self):
+        sites = [make_site(f"Site {i}") for i in range(3)]
+        client = FakeWeatherClient()
+        with mock.patch('weather.management.commands.ingest_weather.get_weather_client', return_value=client):
+            call_command('ingest_weather', '--once', '--group-size', '2', stdout=StringIO())
+        self.assertEqual(client.calls.count('current_many'), 2)
+        self.assertEqual(client.calls.count('forecast_many'), 2)
+        self.assertEqual(WeatherData.objects.count(), 3)
+        self.assertEqual(set(WeatherForecast.objects.values_list('site_id', flat=True)), {site.id for site in sites})
+
+
+@mock.patch('weather.views.UPSTREAM_DEADLINE', None)
+class DashboardViewTests(WeatherTestCase):
+    """user-005, user-006 and user-012: bundle, shared hourly frame, ETag/304."""
+
+    def setUp(self):
+        super().setUp()
+        self.site = make_site()
+        self.client_patch = mock.patch('weather.views.get_weather_client', return_value=FakeWeatherClient())
+        self.weather_client = self.client_patch.start()()
+        self.addCleanup(self.client_patch.stop)
+
+    def test_bundle_comes_from_one_upstream_call(self):
+        response = self.client.get(reverse('weather:api_dashboard_bundle', args=[self.site.id]))
+        self.assertEqual(response.status_code, 200)
+        bundle = response.json()
+        self.assertEqual(set(bundle), {'current', 'hourly_charts', 'daily_precipitation_chart', 'forecast_summary', 'wind_rose'})
+        self.assertEqual(len(bundle['hourly_charts']['temperature']['labels']), 7 * 24)
+        self.client.get(reverse('weather:api_dashboard_bundle', args=[self.site.id]))
+        self.assertEqual(self.weather_client.calls, ['forecast'])
+
+    def test_hourly_charts_share_one_frame(self):
+        for chart_type in views.HOURLY_FORECAST_PARAM_MAP:
+            response = self.client.get(reverse('weather:api_hourly_forecast_chart_data', args=[self.site.id, chart_type]), {'forecast_days': 2})
+            self.assertEqual(len(response.json()['labels']), 48)
+        self.assertEqual(self.weather_client.calls, ['forecast'])
+
+    def test_conditional_request_gets_not_modified(self):
+        url = reverse('weather:api_hourly_forecast_chart_data', args=[self.site.id, 'temperature'])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_cached_entry_reports_its_age(self):
+        store(caching.current_weather_key(self.site.id), current_response())
+        with mock.patch('weather.caching.time.time', return_value=time.time() + 600), mock.patch('weather.caching._revalidate') as revalidate:
+            response = self.client.get(reverse('weather:api_weather_data', args=[self.site.id]))
+        revalidate.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Data-Stale'], '1')
+        self.assertGreaterEqual(int(response['Age']), 600)
+
+    def test_current_weather_survives_the_observation_write(self):
+        url = reverse('weather:api_weather_data', args=[self.site.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(WeatherData.objects.filter(site=self.site).count(), 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class DashboardDeadlineTests(WeatherTransactionTestCase):
+    """user-005 and user-011: a slow upstream is answered from the database after the deadline."""
+
+    def test_bundle_falls_back_to_stored_data(self):
+        site = make_site()
+        ingest_forecasts([site], client=FakeWeatherClient(), forecast_days=7)
+        WeatherForecast.objects.update(created_at=timezone.now() - timedelta(days=2))
+        HourlyForecast.objects.update(created_at=timezone.now() - timedelta(days=2))
+        slow_client = FakeWeatherClient(delay=1.5)
+        started = time.monotonic()
+        with mock.patch('weather.views.UPSTREAM_DEADLINE', 0.3), mock.patch('weather.views.get_weather_client', return_value=slow_client):
+            response = self.client.get(reverse('weather:api_dashboard_bundle', args=[site.id]))
+        self.assertLess(time.monotonic() - started, 1.2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Data-Stale'], '1')
+        self.assertEqual(len(response.json()['forecast_summary']['daily']['time']), 7)
+        self.assertNotIn('wind_rose', response.json())
+        time.sleep(1.5)  # let the abandoned upstream call finish before the tables are flushed
+
+    def test_bundle_fallback_only_uses_a_cached_wind_rose(self):
+        site = make_site()
+        ingest_forecasts([site], client=FakeWeatherClient(), forecast_days=7)
+        rose = {'count': 3, 'sectors': 16}
+        store(caching.wind_rose_key(site.id, 'observations', 7, 16, DEFAULT_SPEED_BIN_EDGES), rose, 60)
+        with mock.patch('weather.views._wind_rose_payload') as compute_rose:
+            bundle, _ = views._dashboard_bundle_from_db(site)
+        compute_rose.assert_not_called()
+        self.assertEqual(bundle['wind_rose'], rose)
+
+
+class EnsembleTests(SimpleTestCase):
+    """user-007, user-008 and user-009: vectorised statistics and NumPy decoding."""
+
+    def test_member_statistics_ignore_missing_members(self):
+        matrix = np.array([[1.0, np.nan, np.nan], [3.0, 4.0, np.nan], [5.0, 8.0, np.nan]])
+        statistics = views._ensemble_member_statistics(matrix, [25, 75])
+        np.testing.assert_allclose(statistics['min'][:2], [1.0, 4.0])
+        np.testing.assert_allclose(statistics['mean'][:2], [3.0, 6.0])
+        np.testing.assert_allclose(statistics['max'][:2], [5.0, 8.0])
+        np.testing.assert_allclose(statistics['median'][:2], [3.0, 6.0])
+        np.testing.assert_allclose(statistics['p25'][:2], [2.0, 5.0])
+        self.assertTrue(np.isnan(statistics['mean'][2]))
+
+    def test_ensemble_responses_are_indexed_by_model_and_member(self):
+        client = WeatherAPIClient.__new__(WeatherAPIClient)
+        models = ['icon_seamless', 'gfs_seamless']
+        responses = [
+            FakeResponse(hourly=FakeBlock([
+                FakeVariable([1, 2], SdkVariableEnum.temperature, 2, member, '°C'),
+                FakeVariable([9, 9], SdkVariableEnum.wind_speed, 80, member, 'm/s'),
+            ])) for member in range(2)
+        ]
+        data = client._parse_ensemble(responses, 0, 0, ['temperature_2m', 'wind_speed_100m'], models, as_numpy=True)
+        self.assertEqual(set(data['variables']['temperature_2m']), {'icon_seamless_member_0', 'gfs_seamless_member_1'})
+        self.assertEqual(data['variables']['wind_speed_100m'], {})
+        self.assertEqual(data['hourly_units']['temperature_2m'], '°C')
+        self.assertEqual(data['time']['count'], 2)
+
+    def test_ensemble_decodes_the_same_with_and_without_numpy(self):
+        client = WeatherAPIClient.__new__(WeatherAPIClient)
+        response = FakeResponse(hourly=FakeBlock([
+            FakeVariable([1.5, np.nan], SdkVariableEnum.temperature, 2, 0, '°C'),
+            FakeVariable([2.0, 3.0], SdkVariableEnum.temperature, 2, 1, '°C'),
+        ]))
+        models = ['icon_seamless', 'gfs_seamless']
+        as_lists = client._parse_ensemble([response], 0, 0, ['temperature_2m'], models)
+        as_arrays = client._parse_ensemble([response], 0, 0, ['temperature_2m'], models, as_numpy=True)
+        self.assertEqual(as_lists['variables']['temperature_2m']['icon_seamless_member_0'], [1.5, None])
+        self.assertEqual(as_arrays['time'], time_axis(1_700_000_000, 1_700_000_000 + 2 * 3600, 3600))
+        self.assertEqual(time_axis_labels(as_arrays['time']), as_lists['time'])
+        self.assertEqual(as_arrays['variables']['temperature_2m']['gfs_seamless_member_1'].dtype, np.float32)
+        np.testing.assert_array_equal(as_arrays['variables']['temperature_2m']['gfs_seamless_member_1'], [2.0, 3.0])
+
+    def test_forecast_decodes_the_same_with_and_without_numpy(self):
+        client = WeatherAPIClient.__new__(WeatherAPIClient)
+        hourly = FakeBlock([FakeVariable([1.5, np.nan, 3.0]), FakeVariable([10, 20, 30])], start=1_700_000_000)
+        response = FakeResponse(hourly=hourly, daily=FakeBlock([FakeVariable([7.0])], start=1_699_920_000, interval=86400))
+        params = (['precipitation_sum'], ['temperature_2m', 'cloud_cover'])
+        as_lists = client._parse_forecast(response, 0, 0, *params)
+        as_arrays = client._parse_forecast(response, 0, 0, *params, as_numpy=True)
+        self.assertEqual(as_lists['hourly']['temperature_2m'], [1.5, None, 3.0])
+        self.assertEqual(as_lists['hourly']['time'][0], '2023-11-14T22:13:20Z')
+        self.assertEqual(as_lists['daily']['time'], ['2023-11-14'])
+        self.assertEqual(as_arrays['hourly']['time'], time_axis(1_700_000_000, 1_700_000_000 + 3 * 3600, 3600))
+        self.assertEqual(as_arrays['hourly']['temperature_2m'].dtype, np.float32)
+        np.testing.assert_array_equal(as_arrays['hourly']['cloud_cover'], as_lists['hourly']['cloud_cover'])
+
+    def test_daily_dates_are_local_to_the_site(self):
+        client = WeatherAPIClient.__new__(WeatherAPIClient)
+        # Local midnight in India (UTC+5:30) is 18:30 UTC on the previous day.
+        ist_midnight = int(datetime(2023, 11, 14, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))).timestamp())
+        hourly = FakeBlock([FakeVariable([20.0, 21.0])], start=ist_midnight)
+        response = FakeResponse(daily=FakeBlock([FakeVariable([7.0, 8.0])], start=ist_midnight, interval=86400), hourly=hourly, utc_offset=19800)
+        forecast = client._parse_forecast(response, 0, 0, ['precipitation_sum'], ['temperature_2m'])
+        self.assertEqual(forecast['daily']['time'], ['2023-11-14', '2023-11-15'])
+        self.assertEqual(forecast['hourly']['time'][0], '2023-11-13T18:30:00Z')
+
+
+class SingleFlightTests(WeatherTestCase):
+    """user-010, user-011 and user-012: single-flight, stale-while-revalidate, deadlines and ETags."""
+
+    def _run_concurrently(self, count, target):
+        results = [None] * count
+        threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, target())) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 1}
+
+        results = self._run_concurrently(5, lambda: get_or_compute('sf-key', compute, 60))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}] * 5)
+
+    def test_follower_takes_over_when_the_leader_fails(self):
+        attempts = []
+
+        def compute():
+            attempts.append(1)
+            time.sleep(0.1)
+            if len(attempts) == 1:
+                raise RuntimeError('upstream failed')
+            return 'second'
+
+        def call():
+            try:
+                return get_or_compute('sf-fail', compute, 60)
+            except RuntimeError:
+                return 'failed'
+
+        results = self._run_concurrently(2, call)
+        self.assertEqual(sorted(results), ['failed', 'second'])
+        self.assertEqual(len(attempts), 2)
+
+    def test_follower_does_not_recompute_while_the_lock_is_held(self):
+        cache.add(caching._lock_key('sf-held'), 'someone-else', 30)
+        compute = mock.Mock(return_value='value')
+        with mock.patch.object(caching, 'SINGLE_FLIGHT_WAIT_TIMEOUT', 0.2):
+            entry = get_or_compute_entry('sf-held', compute, 60, fallback=lambda: ('fallback', 30))
+        compute.assert_not_called()
+        self.assertEqual(entry.value, 'fallback')
+        self.assertGreaterEqual(entry.age, 30)
+
+    def test_leader_does_not_release_a_lock_taken_over_by_another_worker(self):
+        lock_key = caching._lock_key('sf-taken')
+        def compute():
+            # The leader's lock expired and another worker took it meanwhile.
+            cache.set(lock_key, 'other-worker', 30)
+            return 'value'
+        get_or_compute_entry('sf-taken', compute, 60)
+        self.assertEqual(cache.get(lock_key), 'other-worker')
+
+    def test_lock_outlasts_the_clients_retries(self):
+        with self.settings(WEATHER_API_CONNECT_TIMEOUT=3, WEATHER_API_READ_TIMEOUT=20):
+            self.assertGreater(caching.get_single_flight_lock_timeout(), (3 + 20) * (WeatherAPIClient.RETRIES + 1))
+
+    def test_every_caller_answers_within_the_deadline(self):
+        def compute():
+            time.sleep(0.8)
+            return 'fresh'
+
+        started = time.monotonic()
+        results = self._run_concurrently(4, lambda: get_or_compute(
+            'sf-deadline', compute, 60, deadline=0.2, fallback=lambda: ('stale', 100)
+        ))
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(results, ['stale'] * 4)
+        time.sleep(0.8)
+        self.assertEqual(read('sf-deadline').value, 'fresh')
+
+    def test_no_fallback_returns_none(self):
+        self.assertIsNone(get_or_compute_entry('sf-none', lambda: time.sleep(0.5) or 'late', 60, deadline=0.05))
+        time.sleep(0.5)
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        store('swr', 'old')
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'new'
+
+        with mock.patch('weather.caching.time.time', return_value=time.time() + 120):
+            entries = [get_or_compute_entry('swr', compute, 60) for _ in range(3)]
+        self.assertEqual([entry.value for entry in entries], ['old'] * 3)
+        time.sleep(0.3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(read('swr').value, 'new')
+
+    def test_should_cache_rejects_values(self):
+        self.assertEqual(get_or_compute('rejected', lambda: {}, 60, should_cache=bool), {})
+        self.assertIsNone(read('rejected'))
+
+    def test_entry_etag_matches_the_response_body(self):
+        entry = CacheEntry({'a': np.float32(1.5), 'b': np.array([np.nan, 2.0])})
+        self.assertEqual(entry.etag, caching.body_etag(b'{"a": 1.5, "b": [null, 2.0]}'))
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """user-013: the shared cross-worker cache backend."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='weather-cache-')
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': {'ACCESS_RESOLUTION': 0, **options}})
+
+    def test_values_round_trip(self):
+        backend = self.make_cache()
+        backend.set('entry', {'a': [1, 2]})
+        backend.set('count', 3)
+        self.assertEqual(backend.get('entry'), {'a': [1, 2]})
+        self.assertEqual(backend.incr('count', 2), 5)
+        self.assertEqual(backend.get_many(['entry', 'missing']), {'entry': {'a': [1, 2]}})
+        with self.assertRaises(ValueError):
+            backend.incr('entry')
+
+    def test_delete_if_equal_only_removes_a_matching_value(self):
+        backend = self.make_cache()
+        backend.add('lock', 'token-a', 30)
+        self.assertFalse(backend.delete_if_equal('lock', 'token-b'))
+        self.assertEqual(backend.get('lock'), 'token-a')
+        self.assertTrue(backend.delete_if_equal('lock', 'token-a'))
+        self.assertIsNone(backend.get('lock'))
+
+    def test_add_is_atomic_across_connections(self):
+        backend = self.make_cache()
+        results = []
+        barrier = threading.Barrier(8)
+
+        def add():
+            barrier.wait()
+            results.append(backend.add('lock', threading.get_ident(), 30))
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+    def test_add_replaces_an_expired_entry(self):
+        backend = self.make_cache()
+        self.assertTrue(backend.add('lock', 'first', 0.05))
+        self.assertFalse(backend.add('lock', 'second', 30))
+        time.sleep(0.1)
+        self.assertTrue(backend.add('lock', 'third', 30))
+        self.assertEqual(backend.get('lock'), 'third')
+
+    def test_least_recently_used_entries_are_culled(self):
+        backend = self.make_cache(MAX_ENTRIES=10)
+        for i in range(10):
+            backend.set(f'key{i}', i)
+            time.sleep(0.002)
+        backend.get('key0')
+        backend.set('key10', 10)
+        keys = set(backend.iter_keys('key'))
+        self.assertIn('key0', keys)
+        self.assertIn('key10', keys)
+        self.assertNotIn('key1', keys)
+        self.assertLessEqual(len(keys), 9)
+
+    def test_size_limit_culls_entries(self):
+        backend = self.make_cache(MAX_SIZE=10_000)
+        for i in range(10):
+            backend.set(f'blob{i}', b'x' * 2000)
+            time.sleep(0.002)
+        self.assertLessEqual(len(backend.iter_keys('blob')), 5)
+        self.assertIsNotNone(backend.get('blob9'))
+
+    def test_entries_are_shared_between_instances(self):
+        self.make_cache().set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
+
+
+class UpstreamCacheTests(WeatherTestCase):
+    """user-014: upstream TTLs follow model runs; hit rates per endpoint."""
+
+    def test_ttl_ends_when_the_next_run_is_published(self):
+        now = 100 * 3600
+        self.assertEqual(upstream_cache_ttl({}, now=now), 900)
+        self.assertEqual(upstream_cache_ttl({'models': 'ecmwf_ifs025'}, now=now), 4 * 3600)
+        self.assertEqual(upstream_cache_ttl({'models': ['ecmwf_ifs025', 'icon_seamless']}, now=now), 4 * 3600)
+        self.assertEqual(upstream_cache_ttl({'current': ['temperature_2m']}, now=now), 60)
+
+    def test_hits_and_misses_are_counted_per_endpoint(self):
+        for from_cache in (False, True, True):
+            _record_upstream_cache_outcome(mock.Mock(url='https://api.open-meteo.com/v1/forecast?hourly=x', from_cache=from_cache, _cache_outcome_recorded=False))
+        _record_upstream_cache_outcome(mock.Mock(url='https://archive-api.open-meteo.com/v1/archive?hourly=x', from_cache=False, _cache_outcome_recorded=False))
+        stats = upstream_cache_stats()
+        self.assertEqual(stats['forecast'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+        self.assertNotIn('archive', stats)
+
+
+class DownsamplingTests(SimpleTestCase):
+    """user-017: LTTB downsampling."""
+
+    def test_short_series_are_untouched(self):
+        np.testing.assert_array_equal(lttb_indices([1, 2, 3], 10), [0, 1, 2])
+        np.testing.assert_array_equal(lttb_indices(list(range(50)), None), np.arange(50))
+
+    def test_keeps_endpoints_and_peaks(self):
+        series = np.sin(np.linspace(0, 20, 1000))
+        series[437] = 5.0
+        indices = lttb_indices(series, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertIn(437, indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_missing_values_do_not_win_a_bucket(self):
+        series = np.arange(100, dtype=float)
+        series[10:90] = np.nan
+        series[50] = 1000.0
+        indices = lttb_indices(series, 10)
+        self.assertIn(50, indices)
+        self.assertEqual((indices[0], indices[-1]), (0, 99))
+
+    def test_peaks_in_any_series_survive(self):
+        flat, spiky = np.zeros(500), np.zeros(500)
+        spiky[123] = 1.0
+        self.assertIn(123, lttb_indices([flat, spiky], 20))
+
+    def test_take_keeps_the_type(self):
+        self.assertEqual(take(['a', 'b', 'c'], [0, 2]), ['a', 'c'])
+        np.testing.assert_array_equal(take(np.array([1, 2, 3]), [1]), [2])
+
+    def test_chart_payload_is_downsampled_consistently(self):
+        payload = {'labels': list(range(300)), 'datasets': [{'data': list(np.sin(np.arange(300) / 10))}, {'data': [0] * 300}]}
+        payload = views._downsample_series_payload(payload, 30)
+        self.assertEqual(len(payload['labels']), 30)
+        self.assertTrue(all(len(dataset['data']) == 30 for dataset in payload['datasets']))
+
+
+class RollupTests(WeatherTestCase):
+    """user-016: rollups folded on write and used for trends."""
+
+    def setUp(self):
+        super().setUp()
+        self.site = make_site()
+        self.start = hour_start() - timedelta(days=3)
+
+    def observe(self, hours, **values):
+        return save_observations([WeatherData(site=self.site, timestamp=self.start + timedelta(hours=hour), **values) for hour in hours])
+
+    def test_observations_are_folded_into_every_resolution(self):
+        save_observations([
+            WeatherData(site=self.site, timestamp=self.start + timedelta(minutes=minute), temperature=temperature)
+            for minute, temperature in ((0, 20.0), (20, 24.0), (40, None))
+        ])
+        bucket = HourlyRollup.objects.get(site=self.site, bucket_start=self.start)
+        self.assertEqual((bucket.temperature_min, bucket.temperature_max, bucket.temperature_sum, bucket.temperature_count), (20.0, 24.0, 44.0, 2))
+        self.assertEqual(DailyRollup.objects.get(site=self.site).temperature_count, 2)
+        self.assertEqual(MonthlyRollup.objects.get(site=self.site).temperature_count, 2)
+
+    def test_rebuild_is_idempotent_and_restores_missing_rollups(self):
+        self.observe(range(48), temperature=21.0)
+        before = list(HourlyRollup.objects.order_by('bucket_start').values_list('bucket_start', 'temperature_sum', 'temperature_count'))
+        HourlyRollup.objects.all().delete()
+        self.assertEqual(rebuild_rollups(), 48)
+        rebuild_rollups()
+        after = list(HourlyRollup.objects.order_by('bucket_start').values_list('bucket_start', 'temperature_sum', 'temperature_count'))
+        self.assertEqual(before, after)
+
+    def test_migration_folds_existing_observations(self):
+        WeatherData.objects.bulk_create([WeatherData(site=self.site, timestamp=self.start + timedelta(hours=h), temperature=20) for h in range(5)])
+        migration = importlib.import_module('weather.migrations.0007_rebuild_rollups')
+        historical = MigrationLoader(connection).project_state(('weather', '0007_rebuild_rollups')).apps
+        migration.fold_existing_observations(historical, mock.Mock(connection=connection))
+        self.assertEqual(HourlyRollup.objects.filter(site=self.site).count(), 5)
+        daily = DailyRollup.objects.get(site=self.site)
+        self.assertEqual((daily.temperature_min, daily.temperature_sum, daily.temperature_count), (20, 100, 5))
+        self.assertEqual(daily.humidity_count, 0)
+
+    def test_choose_rollup_resolution(self):
+        day = 86400
+        self.assertIsNone(choose_rollup_resolution(day, 150))
+        self.assertEqual(choose_rollup_resolution(7 * day, 150), 'hour')
+        self.assertEqual(choose_rollup_resolution(365 * day, 150), 'day')
+        self.assertEqual(choose_rollup_resolution(20 * 365 * day, 150), 'month')
+        with self.settings(WEATHER_RETENTION_DAYS={'raw': 2, 'hour': 30}):
+            self.assertEqual(choose_rollup_resolution(60 * day, 150), 'day')
+            self.assertEqual(choose_rollup_resolution(60 * day, 150, archived=True), 'hour')
+
+    def test_trend_endpoint_reads_rollups(self):
+        self.observe(range(72), temperature=22.0)
+        response = self.client.get(reverse('weather:api_temperature_trend_data', args=[self.site.id]), {'days': 7, 'points': 100})
+        payload = response.json()
+        self.assertEqual(payload['resolution'], 'hour')
+        self.assertEqual(len(payload['labels']), 72)
+        self.assertEqual(set(payload['datasets'][0]['data']), {22.0})
+
+
+class RetentionTests(WeatherTestCase):
+    """user-018: compaction keeps rollups and drops old raw rows."""
+
+    def setUp(self):
+        super().setUp()
+        self.site = make_site()
+
+    def test_raw_cutoff_is_month_aligned(self):
+        now = datetime(2024, 3, 15, 12, tzinfo=dt_timezone.utc)
+        self.assertEqual(retention_cutoff('raw', {'raw': 30}, now=now), datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(retention_cutoff('hour', {'hour': 10}, now=now), now - timedelta(days=10))
+        self.assertIsNone(retention_cutoff('day', {'day': None}, now=now))
+
+    def test_coarser_tiers_must_be_kept_longer(self):
+        validate_retention({'raw': 30, 'hour': 365, 'day': None, 'month': None})
+        with self.assertRaises(ValueError):
+            validate_retention({'raw': 30, 'hour': 10})
+        with self.assertRaises(ValueError):
+            validate_retention({'raw': 30, 'hour': None, 'day': 100})
+
+    def test_compaction_deletes_raw_rows_and_folds_unrolled_hours(self):
+        old = hour_start() - timedelta(days=60)
+        save_observations([WeatherData(site=self.site, timestamp=old + timedelta(hours=h), temperature=10.0) for h in range(10)])
+        # Rows written before rollups existed have no buckets yet.
+        WeatherData.objects.bulk_create([WeatherData(site=self.site, timestamp=old + timedelta(hours=h), temperature=30.0) for h in range(10, 15)])
+        recent = save_observations([WeatherData(site=self.site, timestamp=hour_start(), temperature=15.0)])
+        deleted, folded = compact_observations(old + timedelta(days=1), chunk_size=4)
+        self.assertEqual((deleted, folded), (15, 5))
+        self.assertEqual(list(WeatherData.objects.values_list('pk', flat=True)), [recent[0].pk])
+        self.assertEqual(HourlyRollup.objects.filter(bucket_start__lt=old + timedelta(days=1)).count(), 15)
+
+    def test_prune_rollups(self):
+        old = hour_start() - timedelta(days=400)
+        save_observations([WeatherData(site=self.site, timestamp=old + timedelta(hours=h), temperature=10.0) for h in range(3)])
+        self.assertEqual(prune_rollups('hour', old + timedelta(days=1), dry_run=True), 3)
+        self.assertEqual(prune_rollups('hour', old + timedelta(days=1), chunk_size=2), 3)
+        self.assertFalse(HourlyRollup.objects.exists())
+        self.assertEqual(DailyRollup.objects.get().temperature_count, 3)
+
+    def test_compact_weather_command_dry_run(self):
+        save_observations([WeatherData(site=self.site, timestamp=hour_start() - timedelta(days=90), temperature=10.0)])
+        out = StringIO()
+        call_command('compact_weather', '--dry-run', stdout=out)
+        self.assertEqual(WeatherData.objects.count(), 1)
+
+
+class WindRoseTests(WeatherTestCase):
+    """user-019: wind rose binned on the server."""
+
+    def test_sectors_wrap_around_north(self):
+        rose = wind_rose_histogram([355, 5, 90, 180, 270, np.nan], [1, 3, 5, 7, 12, 4], sectors=16, speed_bin_edges=(0, 2, 4, 6, 8, 10))
+        self.assertEqual(rose['count'], 5)
+        frequencies = np.array(rose['frequencies'])
+        self.assertEqual(frequencies.shape, (6, 16))
+        self.assertEqual(frequencies[0][0], 20.0)   # 355° at 1 m/s: N, first bin
+        self.assertEqual(frequencies[1][0], 20.0)   # 5° at 3 m/s: N
+        self.assertEqual(frequencies[2][4], 20.0)   # 90°: E
+        self.assertEqual(frequencies[5][12], 20.0)  # 270° at 12 m/s: W, open-ended last bin
+        self.assertAlmostEqual(frequencies.sum(), 100.0)
+        self.assertEqual(rose['speed_bins'][-1], '≥10 m/s')
+        self.assertEqual(rose['mean_speed'], 5.6)
+
+    def test_empty_input(self):
+        rose = wind_rose_histogram([], [], sectors=36)
+        self.assertEqual(rose['count'], 0)
+        self.assertIsNone(rose['mean_speed'])
+        self.assertEqual(len(rose['sector_labels']), 36)
+
+    def test_endpoint_reports_the_range_it_covers(self):
+        site = make_site()
+        now = hour_start()
+        WeatherData.objects.bulk_create([
+            WeatherData(site=site, timestamp=now - timedelta(hours=h), wind_direction=90, wind_speed=3) for h in range(48)
+        ])
+        payload = self.client.get(reverse('weather:api_wind_rose', args=[site.id]), {'days': 30}).json()
+        self.assertEqual((payload['count'], payload['days'], payload['requested_days']), (48, 2, 30))
+        self.assertEqual(payload['end'], f"{np.datetime64(now.replace(tzinfo=None), 'ms')}Z")
+
+    def test_endpoint_validates_parameters(self):
+        site = make_site()
+        url = reverse('weather:api_wind_rose', args=[site.id])
+        self.assertEqual(self.client.get(url, {'sectors': 12}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'speed_bins': '4,2'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'source': 'radar'}).status_code, 400)
+
+
+class SnapshotTests(WeatherTestCase):
+    """user-020: latest-observation snapshot."""
+
+    def test_snapshot_only_moves_forward(self):
+        site = make_site()
+        now = timezone.now()
+        update_latest_observations([WeatherData(site=site, timestamp=now, temperature=30.0)])
+        update_latest_observations([WeatherData(site=site, timestamp=now - timedelta(hours=1), temperature=10.0)])
+        self.assertEqual(LatestObservation.objects.get(site=site).temperature, 30.0)
+        update_latest_observations([
+            WeatherData(site=site, timestamp=now + timedelta(hours=2), temperature=33.0),
+            WeatherData(site=site, timestamp=now + timedelta(hours=1), temperature=31.0),
+        ])
+        self.assertEqual(LatestObservation.objects.get(site=site).temperature, 33.0)
+
+    def test_geojson_uses_one_query(self):
+        sites = [make_site(f"Site {i}") for i in range(5)]
+        save_observations([WeatherData(site=site, temperature=20.0 + i) for i, site in enumerate(sites)])
+        with self.assertNumQueries(1):
+            payload = views._sites_geojson_payload()
+        self.assertEqual([feature['properties']['temperature'] for feature in payload['features']], [20.0, 21.0, 22.0, 23.0, 24.0])
+
+    def test_geojson_is_served_while_another_request_holds_the_lock(self):
+        make_site()
+        cache.add(caching._lock_key(caching.sites_geojson_key()), 'someone-else', 30)
+        with mock.patch.object(caching, 'SINGLE_FLIGHT_WAIT_TIMEOUT', 0.2):
+            response = self.client.get(reverse('weather:api_sites_geojson'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['features']), 1)
+
+
+class ObservationWriterTests(WeatherTestCase):
+    """user-022: batching writer and SQLite connection settings."""
+
+    def test_rows_submitted_together_are_written_in_one_batch(self):
+        writer = ObservationWriter(flush_ms=100, batch_size=500)
+        site = make_site()
+        with mock.patch('weather.observations.save_observations') as save, mock.patch('weather.observations.invalidate_observations') as invalidate, \
+                mock.patch('weather.observations.close_old_connections'):
+            futures = [writer.submit([WeatherData(site=site)], invalidate=i == 0) for i in range(3)]
+            self.assertEqual([future.result(timeout=2) for future in futures], [1, 1, 1])
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(len(save.call_args.args[0]), 3)
+        invalidate.assert_called_once_with([site.id])
+
+    def test_failed_batch_fails_every_future(self):
+        writer = ObservationWriter(flush_ms=10)
+        with mock.patch('weather.observations.save_observations', side_effect=RuntimeError('locked')), \
+                mock.patch('weather.observations.close_old_connections'):
+            with self.assertLogs('weather.observations', 'ERROR'), self.assertRaises(RuntimeError):
+                writer.submit([WeatherData(site_id=1)]).result(timeout=2)
+
+    def test_sqlite_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class TimeSeriesRouterTests(SimpleTestCase):
+    """user-023: time-series models routed to their own database."""
+
+    router = TimeSeriesRouter()
+
+    def test_single_database_defers(self):
+        with mock.patch('weather.db.timeseries_alias', return_value='default'):
+            self.assertEqual(self.router.db_for_read(WeatherData), 'default')
+            self.assertIsNone(self.router.allow_migrate('default', 'weather', 'weatherdata'))
+
+    def test_timeseries_models_are_routed(self):
+        with mock.patch('weather.db.timeseries_alias', return_value='timeseries'):
+            self.assertEqual(self.router.db_for_write(WeatherData), 'timeseries')
+            self.assertEqual(self.router.db_for_read(HourlyRollup), 'timeseries')
+            self.assertIsNone(self.router.db_for_read(WeatherSite))
+            self.assertEqual(self.router.db_for_read(WeatherSite, instance=WeatherData()), 'default')
+            self.assertIsNone(self.router.db_for_read(LatestObservation))
+            self.assertTrue(self.router.allow_relation(WeatherData(), WeatherSite()))
+
+    def test_tables_are_migrated_on_one_side_only(self):
+        with mock.patch('weather.db.timeseries_alias', return_value='timeseries'):
+            self.assertTrue(self.router.allow_migrate('timeseries', 'weather', 'weatherdata'))
+            self.assertFalse(self.router.allow_migrate('timeseries', 'weather', 'weathersite'))
+            self.assertFalse(self.router.allow_migrate('default', 'weather', 'weatherdata'))
+            self.assertIsNone(self.router.allow_migrate('default', 'weather', 'weathersite'))
+            self.assertFalse(self.router.allow_migrate('timeseries', 'auth', 'user'))
+
+
+@skipIf(archive.pq is None, "pyarrow is not installed")
+class ArchiveTests(WeatherTestCase):
+    """user-024: Parquet archive of closed months."""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(shutil.rmtree, archive.get_archive_dir(), True)
+        self.site = make_site()
+        self.month = (hour_start() - timedelta(days=70)).replace(day=1, hour=0)
+        save_observations([
+            WeatherData(site=self.site, timestamp=self.month + timedelta(hours=h), temperature=float(h % 24), wind_direction=180, wind_speed=4)
+            for h in range(24 * 28)
+        ])
+
+    def test_month_round_trip(self):
+        self.assertEqual(archive.archive_month(self.site.id, self.month)[0], 24 * 28)
+        self.assertIsNone(archive.archive_month(self.site.id, self.month))
+        timestamps, values = archive.read_archive(self.site.id, ['temperature'], self.month + timedelta(hours=1), self.month + timedelta(hours=4))
+        self.assertEqual(timestamps.dtype, np.dtype('datetime64[ms]'))
+        np.testing.assert_array_equal(values['temperature'], [1.0, 2.0, 3.0])
+        labels, means = archive.archived_series(self.site.id, 'temperature', self.month, self.month + timedelta(days=2), 'day')
+        self.assertEqual(means, [11.5, 11.5])
+        self.assertEqual(labels[0], self.month.isoformat())
+
+    def test_pruned_history_is_read_from_the_archive(self):
+        for month in archive.closed_months(self.site.id):
+            archive.archive_month(self.site.id, month)
+        WeatherData.objects.all().delete()
+        for model in (HourlyRollup, DailyRollup, MonthlyRollup):
+            model.objects.all().delete()
+        labels, values, resolution = views._observation_series(self.site, 'temperature', self.month, 10)
+        self.assertEqual(resolution, 'day')
+        self.assertEqual(len(labels), 28)
+        self.assertEqual(set(values), {11.5})
+        rose = self.client.get(reverse('weather:api_wind_rose', args=[self.site.id]), {'days': 100}).json()
+        self.assertEqual(rose['count'], 24 * 28)
+
+    def test_archive_without_pyarrow_is_reported(self):
+        os.makedirs(archive.get_archive_dir(), exist_ok=True)
+        archive._warn_missing_pyarrow.cache_clear()
+        with mock.patch.object(archive, 'pq', None), self.assertLogs('weather.archive', 'WARNING'):
+            self.assertFalse(archive.archive_available())
+
+
+class BackfillTests(WeatherTestCase):
+    """user-025: resumable backfill from the archive API."""
+
+    class ArchiveClient:
+        def __init__(self, fail_on=None):
+            self.windows, self.fail_on = [], fail_on
+
+        def get_archive_hourly_many(self, sites, params, first, last):
+            self.windows.append((first, last))
+            if (first, last) == self.fail_on:
+                raise RuntimeError('archive API unavailable')
+            start = int(datetime(first.year, first.month, first.day, tzinfo=dt_timezone.utc).timestamp())
+            count = ((last - first).days + 1) * 24
+            return {site.id: {'time': time_axis(start, start + count * 3600, 3600), **{
+                param: np.full(count, 12.345, dtype=np.float32) for param in params
+            }} for site in sites}
+
+    def test_date_windows(self):
+        self.assertEqual(date_windows(date(2024, 1, 1), date(2024, 1, 10), 4), [
+            (date(2024, 1, 1), date(2024, 1, 4)), (date(2024, 1, 5), date(2024, 1, 8)), (date(2024, 1, 9), date(2024, 1, 10)),
+        ])
+
+    def test_rows_skip_empty_and_observed_hours(self):
+        site = make_site()
+        hourly = {'time': time_axis(0, 4 * 3600, 3600), 'temperature_2m': np.array([1, np.nan, 3, np.nan], dtype=np.float32)}
+        rows = build_backfill_observations(site, hourly, skip_seconds=np.array([0]))
+        self.assertEqual([(row.timestamp.hour, row.temperature) for row in rows], [(2, 3.0)])
+
+    def test_interrupted_backfill_resumes_after_the_last_stored_window(self):
+        site = make_site()
+        start, end = date(2024, 1, 1), date(2024, 1, 9)
+        failing = self.ArchiveClient(fail_on=(date(2024, 1, 4), date(2024, 1, 6)))
+        with self.assertRaises(RuntimeError):
+            list(backfill_observations([site], start, end, window_days=3, client=failing))
+        self.assertEqual(BackfillCheckpoint.objects.get(site=site).completed_through, date(2024, 1, 3))
+        self.assertEqual(WeatherData.objects.count(), 3 * 24)
+
+        resumed = self.ArchiveClient()
+        progress = list(backfill_observations([site], start, end, window_days=3, client=resumed))
+        self.assertEqual(resumed.windows, [(date(2024, 1, 4), date(2024, 1, 6)), (date(2024, 1, 7), date(2024, 1, 9))])
+        self.assertEqual([rows for *_, rows in progress], [72, 72])
+        self.assertEqual(WeatherData.objects.count(), 9 * 24)
+        self.assertEqual(WeatherData.objects.first().temperature, 12.35)
+        self.assertEqual(HourlyRollup.objects.count(), 9 * 24)
+
+    def test_hours_already_observed_are_not_stored_twice(self):
+        site = make_site()
+        save_observations([WeatherData(site=site, timestamp=datetime(2024, 1, 1, 5, tzinfo=dt_timezone.utc), temperature=1.0)])
+        list(backfill_observations([site], date(2024, 1, 1), date(2024, 1, 1), client=self.ArchiveClient()))
+        self.assertEqual(WeatherData.objects.count(), 24)
+        self.assertEqual(HourlyRollup.objects.get(bucket_start=datetime(2024, 1, 1, 5, tzinfo=dt_timezone.utc)).temperature_count, 1)
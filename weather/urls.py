@@ -20,6 +20,7 @@ urlpatterns = [
     # New Forecast chart data endpoints for dashboard
     path('api/forecast-chart/hourly/<int:site_id>/<str:chart_type>/', views.get_hourly_forecast_chart_data, name='api_hourly_forecast_chart_data'),
     path('api/forecast-chart/daily-precipitation/<int:site_id>/', views.get_daily_precipitation_forecast_chart_data, name='api_daily_precipitation_forecast_chart_data'),
+    path('api/dashboard-bundle/<int:site_id>/', views.get_dashboard_bundle, name='api_dashboard_bundle'), # All dashboard panels in one response
 
     path('api/temperature-trend/<int:site_id>/', views.get_temperature_trend_data, name='api_temperature_trend_data'),
     path('api/ensemble-forecast/<int:site_id>/<str:variable_name>/', views.get_ensemble_forecast_trend_data, name='api_ensemble_forecast_trend_data'),
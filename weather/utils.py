@@ -3,24 +3,192 @@ import openmeteo_requests
 from openmeteo_sdk.Variable import Variable as SdkVariableEnum # For mapping
 from openmeteo_sdk.Aggregation import Aggregation as SdkAggregationEnum
 import requests_cache
+from requests.adapters import HTTPAdapter
 from retry_requests import retry
 import logging
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
 import numpy as np
 import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache_backends import DjangoHTTPCache
 
 logger = logging.getLogger(__name__)
 
+# Open-Meteo model -> (hours between runs, hours after a run's nominal time until Open-Meteo serves it).
+# Approximate; override entries with settings.WEATHER_MODEL_UPDATE_SCHEDULE.
+DEFAULT_MODEL_UPDATE_SCHEDULE = {
+    'best_match': (1, 0.25),  # the blended /v1/forecast default picks up new runs hourly
+    'icon_seamless': (6, 4),
+    'gfs_seamless': (6, 5),
+    'ecmwf_ifs025': (12, 8),
+}
+CURRENT_CONDITIONS_UPDATE_MINUTES = 15
+MIN_UPSTREAM_TTL = 60
+UPSTREAM_STATS_ENDPOINTS = ["current", "forecast", "ensemble"]
+
+
+def _seconds_until_next_update(interval_hours, delay_hours, now):
+    interval, delay = interval_hours * 3600, delay_hours * 3600
+    return interval - (now - delay) % interval
+
+
+def _model_update_schedule():
+    return {**DEFAULT_MODEL_UPDATE_SCHEDULE, **getattr(settings, 'WEATHER_MODEL_UPDATE_SCHEDULE', {})}
+
+
+def latest_model_update(model='best_match', now=None):
+    """Unix time at which the most recent run of ``model`` is expected to have become available."""
+    now = time.time() if now is None else now
+    schedule = _model_update_schedule()
+    interval_hours, delay_hours = schedule.get(model, schedule['best_match'])
+    return now - (interval_hours * 3600 - _seconds_until_next_update(interval_hours, delay_hours, now))
+
+
+def upstream_cache_ttl(params, now=None):
+    """Seconds an upstream response for ``params`` stays fresh: until the earliest moment one of
+    its models, or current conditions if requested, is expected to publish new data."""
+    now = time.time() if now is None else now
+    schedule = _model_update_schedule()
+    models = params.get("models") or ["best_match"]
+    if isinstance(models, str):
+        models = models.split(",")
+    ttls = [_seconds_until_next_update(*schedule.get(model, schedule['best_match']), now) for model in models]
+    if params.get("current"):
+        ttls.append(_seconds_until_next_update(CURRENT_CONDITIONS_UPDATE_MINUTES / 60, 1 / 60, now))
+    return max(MIN_UPSTREAM_TTL, int(min(ttls)))
+
+
+def _upstream_stats_key(endpoint, outcome):
+    return f"upstream_cache_stats:{endpoint}:{outcome}"
+
+
+def _upstream_endpoint(url):
+    parts = urlsplit(url)
+    endpoint = parts.path.rstrip("/").rsplit("/", 1)[-1]
+    if endpoint == "forecast" and "current" in parse_qs(parts.query):
+        return "current"
+    return endpoint
+
+
+def _record_upstream_cache_outcome(response, *args, **kwargs):
+    """requests response hook: count cache hits and misses per endpoint in the shared cache."""
+    # requests_cache dispatches hooks again after requests already did for a fresh response.
+    if getattr(response, "_cache_outcome_recorded", False):
+        return response
+    response._cache_outcome_recorded = True
+    endpoint = _upstream_endpoint(response.url)
+    if endpoint not in UPSTREAM_STATS_ENDPOINTS:  # e.g. archive requests, which are never cached
+        return response
+    try:
+        key = _upstream_stats_key(endpoint, "hits" if getattr(response, "from_cache", False) else "misses")
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+    except Exception as e:
+        logger.warning(f"Could not record upstream cache statistics: {e}")
+    return response
+
+
+def upstream_cache_stats():
+    """{endpoint: {"hits", "misses", "hit_rate"}} since the last reset, across all workers."""
+    keys = [_upstream_stats_key(endpoint, outcome) for endpoint in UPSTREAM_STATS_ENDPOINTS for outcome in ("hits", "misses")]
+    counts = cache.get_many(keys)
+    stats = {}
+    for endpoint in UPSTREAM_STATS_ENDPOINTS:
+        hits = counts.get(_upstream_stats_key(endpoint, "hits"), 0)
+        misses = counts.get(_upstream_stats_key(endpoint, "misses"), 0)
+        stats[endpoint] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else None}
+    return stats
+
+
+def reset_upstream_cache_stats():
+    cache.delete_many([_upstream_stats_key(endpoint, outcome) for endpoint in UPSTREAM_STATS_ENDPOINTS for outcome in ("hits", "misses")])
+
+
+def time_axis(start, end, interval):
+    """Compact description of a regular time axis (unix seconds), used by the NumPy decode mode."""
+    return {"start": int(start), "interval": int(interval), "count": max(0, (int(end) - int(start)) // int(interval))}
+
+
+def time_axis_labels(axis, fmt='%Y-%m-%dT%H:%M:%SZ', utc_offset=0):
+    """Expand a time_axis() dict into formatted UTC strings, or local ones shifted by ``utc_offset`` seconds."""
+    seconds = axis["start"] + utc_offset + np.arange(axis["count"], dtype=np.int64) * axis["interval"]
+    if fmt == '%Y-%m-%dT%H:%M:%SZ':
+        return np.char.add(np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s'), 'Z').tolist()
+    return pd.to_datetime(seconds, unit="s", utc=True).strftime(fmt).tolist()
+
+
+class NumpyJSONEncoder(DjangoJSONEncoder):
+    """Serialises NumPy arrays and scalars, turning NaN into null."""
+
+    def default(self, o):
+        if isinstance(o, np.ndarray):
+            if o.dtype.kind == 'f':
+                return np.where(np.isnan(o), None, o.astype(np.float64)).tolist()
+            return o.tolist()
+        if isinstance(o, np.generic):
+            value = o.item()
+            return None if isinstance(value, float) and np.isnan(value) else value
+        return super().default(o)
+
 class WeatherAPIClient:
     ENSEMBLE_API_URL = "https://ensemble-api.open-meteo.com/v1/ensemble"
     DEFAULT_ENSEMBLE_MODELS = ["icon_seamless", "gfs_seamless", "ecmwf_ifs025"]
     BASE_API_URL = "https://api.open-meteo.com/v1/forecast"
-
-    def __init__(self):
-        cache_session = requests_cache.CachedSession('.cache', expire_after=1800)
-        retry_session = retry(cache_session, retries=3, backoff_factor=0.2)
+    ARCHIVE_API_URL = "https://archive-api.open-meteo.com/v1/archive"
+    CURRENT_PARAMS = [
+        "temperature_2m", "relative_humidity_2m", "apparent_temperature", "is_day",
+        "precipitation", "rain", "showers", "snowfall", "weather_code", "cloud_cover",
+        "surface_pressure", "wind_speed_10m", "wind_direction_10m", "wind_gusts_10m", "uv_index",
+        "visibility"
+    ]
+    # Open-Meteo accepts comma-separated coordinate lists; keep each URL a sane length.
+    DEFAULT_BATCH_SIZE = 50
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_CONNECT_TIMEOUT = 3.05
+    DEFAULT_READ_TIMEOUT = 15
+    RETRIES = 3
+    BACKOFF_FACTOR = 0.2
+    # Reanalysis history for a batch of sites over weeks is a large response and slow to assemble.
+    ARCHIVE_READ_TIMEOUT = 120
+
+    def __init__(self, batch_size=None):
+        # Upstream responses live in the shared 'upstream' Django cache rather than a per-process file.
+        # expire_after is only a fallback; each request passes upstream_cache_ttl().
+        cache_session = requests_cache.CachedSession(backend=DjangoHTTPCache('upstream'), expire_after=1800)
+        cache_session.hooks['response'].append(_record_upstream_cache_outcome)
+        retry_session = retry(cache_session, retries=self.RETRIES, backoff_factor=self.BACKOFF_FACTOR)
+        # Replace retry()'s default adapters with explicitly sized pools so that
+        # concurrent threads sharing this client reuse keep-alive connections.
+        pool_size = getattr(settings, 'WEATHER_API_POOL_SIZE', self.DEFAULT_POOL_SIZE)
+        for prefix in ("http://", "https://"):
+            max_retries = retry_session.get_adapter(prefix).max_retries
+            retry_session.mount(prefix, HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries))
+        retry_session.headers["Connection"] = "keep-alive"
+        self.session = retry_session
         self.client = openmeteo_requests.Client(session=retry_session)
+        self.batch_size = batch_size or getattr(settings, 'WEATHER_API_BATCH_SIZE', self.DEFAULT_BATCH_SIZE)
+        self.timeout = (
+            getattr(settings, 'WEATHER_API_CONNECT_TIMEOUT', self.DEFAULT_CONNECT_TIMEOUT),
+            getattr(settings, 'WEATHER_API_READ_TIMEOUT', self.DEFAULT_READ_TIMEOUT),
+        )
         logger.debug("WeatherAPIClient initialized.")
 
+    @classmethod
+    def worst_case_request_seconds(cls):
+        """Longest a forecast call can take: every attempt hits both timeouts, plus retry()'s backoff sleeps."""
+        connect_timeout = getattr(settings, 'WEATHER_API_CONNECT_TIMEOUT', cls.DEFAULT_CONNECT_TIMEOUT)
+        read_timeout = getattr(settings, 'WEATHER_API_READ_TIMEOUT', cls.DEFAULT_READ_TIMEOUT)
+        backoff = sum(cls.BACKOFF_FACTOR * 2 ** attempt for attempt in range(cls.RETRIES))
+        return (connect_timeout + read_timeout) * (cls.RETRIES + 1) + backoff
+
+    def _weather_api(self, url, params):
+        return self.client.weather_api(url, params=params, timeout=self.timeout, expire_after=upstream_cache_ttl(params))
+
     def _map_string_to_sdk_var(self, var_string_name):
         name_lower = var_string_name.lower()
         if name_lower == "shortwave_radiation": return SdkVariableEnum.shortwave_radiation, 0
@@ -40,66 +208,99 @@ class WeatherAPIClient:
         return None, None
 
 
-    def get_current_weather(self, latitude, longitude):
-        current_params_list = [
-            "temperature_2m", "relative_humidity_2m", "apparent_temperature", "is_day",
-            "precipitation", "rain", "showers", "snowfall", "weather_code", "cloud_cover",
-            "surface_pressure", "wind_speed_10m", "wind_direction_10m", "wind_gusts_10m", "uv_index",
-            "visibility"
+    def _iter_batches(self, sites):
+        sites = list(sites)
+        for start in range(0, len(sites), self.batch_size):
+            yield sites[start:start + self.batch_size]
+
+    def _responses_by_site(self, batch, responses, all_models=False):
+        """Pair each site in a batch with its response. Multi-model calls return one response
+        per (location, model) in request order; pass all_models=True to get that list per site,
+        otherwise the first response is used."""
+        by_location = {}
+        for response in responses:
+            by_location.setdefault(response.LocationId(), []).append(response)
+        return [
+            (site, by_location[index] if all_models else by_location[index][0])
+            for index, site in enumerate(batch) if index in by_location
         ]
-        params = {
-            "latitude": latitude, "longitude": longitude, "current": current_params_list,
-            "temperature_unit": "celsius", "wind_speed_unit": "ms",
-            "precipitation_unit": "mm", "timezone": "auto"
-        }
-        logger.debug(f"Requesting current weather for ({latitude}, {longitude}) with params: {params}")
 
-        processed_current_data = {param: None for param in current_params_list}
+    def _empty_current(self):
+        processed_current_data = {param: None for param in self.CURRENT_PARAMS}
         processed_current_data["time"] = None
         processed_current_data["interval"] = None
+        return processed_current_data
 
-        try:
-            responses = self.client.weather_api(self.BASE_API_URL, params=params)
-            response = responses[0]
-            current_api_data = response.Current()
-
-            if current_api_data is None:
-                logger.warning(f"Open-Meteo API (current) did not return 'current' data for ({latitude}, {longitude})")
-                return processed_current_data
-
-            processed_current_data["time"] = pd.to_datetime(current_api_data.Time(), unit = "s", utc = True).isoformat()
-            processed_current_data["interval"] = current_api_data.Interval()
-
-            num_vars_returned = current_api_data.VariablesLength()
-            for i in range(num_vars_returned):
-                if i < len(current_params_list):
-                    var_name_from_request = current_params_list[i]
-                    sdk_variable_object = current_api_data.Variables(i)
-                    value = sdk_variable_object.Value()
-
-                    if isinstance(value, np.float32) and np.isnan(value):
-                        processed_current_data[var_name_from_request] = None
-                    elif isinstance(value, (int, float)) and np.isnan(value):
-                         processed_current_data[var_name_from_request] = None
-                    else:
-                        if isinstance(value, (np.float32, np.float64)):
-                            processed_current_data[var_name_from_request] = float(value)
-                        else:
-                            processed_current_data[var_name_from_request] = value
-                else:
-                    logger.warning(f"Index {i} out of bounds for current_params_list (len {len(current_params_list)}) but API returned more variables ({num_vars_returned}). This is unexpected.")
+    def _parse_current(self, response, latitude, longitude):
+        current_params_list = self.CURRENT_PARAMS
+        processed_current_data = self._empty_current()
+        current_api_data = response.Current()
 
-            logger.debug(f"Processed current weather for ({latitude}, {longitude}): {processed_current_data}")
+        if current_api_data is None:
+            logger.warning(f"Open-Meteo API (current) did not return 'current' data for ({latitude}, {longitude})")
             return processed_current_data
 
-        except Exception as e:
-            logger.error(f"Error in WeatherAPIClient.get_current_weather for ({latitude}, {longitude}): {e}", exc_info=True)
-            return processed_current_data
+        processed_current_data["time"] = pd.to_datetime(current_api_data.Time(), unit = "s", utc = True).isoformat()
+        processed_current_data["interval"] = current_api_data.Interval()
 
-    def get_forecast(self, latitude, longitude, daily_params=None, hourly_params=None, forecast_days=7):
-        if daily_params is None: daily_params = []
-        if hourly_params is None: hourly_params = []
+        num_vars_returned = current_api_data.VariablesLength()
+        for i in range(num_vars_returned):
+            if i < len(current_params_list):
+                var_name_from_request = current_params_list[i]
+                sdk_variable_object = current_api_data.Variables(i)
+                value = sdk_variable_object.Value()
+
+                if isinstance(value, np.float32) and np.isnan(value):
+                    processed_current_data[var_name_from_request] = None
+                elif isinstance(value, (int, float)) and np.isnan(value):
+                     processed_current_data[var_name_from_request] = None
+                else:
+                    if isinstance(value, (np.float32, np.float64)):
+                        processed_current_data[var_name_from_request] = float(value)
+                    else:
+                        processed_current_data[var_name_from_request] = value
+            else:
+                logger.warning(f"Index {i} out of bounds for current_params_list (len {len(current_params_list)}) but API returned more variables ({num_vars_returned}). This is unexpected.")
 
+        logger.debug(f"Processed current weather for ({latitude}, {longitude}): {processed_current_data}")
+        return processed_current_data
+
+    def _current_params(self, latitude, longitude):
+        return {
+            "latitude": latitude, "longitude": longitude, "current": self.CURRENT_PARAMS,
+            "temperature_unit": "celsius", "wind_speed_unit": "ms",
+            "precipitation_unit": "mm", "timezone": "auto"
+        }
+
+    def get_current_weather(self, latitude, longitude):
+        params = self._current_params(latitude, longitude)
+        logger.debug(f"Requesting current weather for ({latitude}, {longitude}) with params: {params}")
+
+        try:
+            responses = self._weather_api(self.BASE_API_URL, params)
+            return self._parse_current(responses[0], latitude, longitude)
+
+        except Exception as e:
+            logger.error(f"Error in WeatherAPIClient.get_current_weather for ({latitude}, {longitude}): {e}", exc_info=True)
+            return self._empty_current()
+
+    def get_current_weather_many(self, sites):
+        """Current conditions for many sites, one upstream call per batch. Returns {site.id: data}."""
+        results = {}
+        for batch in self._iter_batches(sites):
+            params = self._current_params([s.latitude for s in batch], [s.longitude for s in batch])
+            logger.debug(f"Requesting current weather for a batch of {len(batch)} sites")
+            try:
+                responses = self._weather_api(self.BASE_API_URL, params)
+                for site, response in self._responses_by_site(batch, responses):
+                    results[site.id] = self._parse_current(response, site.latitude, site.longitude)
+            except Exception as e:
+                logger.error(f"Error in WeatherAPIClient.get_current_weather_many for batch of {len(batch)} sites: {e}", exc_info=True)
+            for site in batch:
+                results.setdefault(site.id, self._empty_current())
+        return results
+
+    def _forecast_params(self, latitude, longitude, daily_params, hourly_params, forecast_days, include_current=False):
         params = {
             "latitude": latitude, "longitude": longitude,
             "temperature_unit": "celsius", "wind_speed_unit": "ms",
@@ -111,162 +312,287 @@ class WeatherAPIClient:
             params["daily"] = daily_params
         if hourly_params:
             params["hourly"] = hourly_params
+        if include_current:
+            params["current"] = self.CURRENT_PARAMS
+        return params
+
+    def _empty_forecast(self, daily_params, hourly_params, include_current=False):
+        error_response = {}
+        if include_current: error_response["current"] = self._empty_current()
+        if daily_params: error_response["daily"] = {"time": []}
+        if hourly_params: error_response["hourly"] = {"time": []}
+        return error_response
+
+    def _decode_series_block(self, block, params, label, latitude, longitude, time_format, as_numpy, utc_offset=0):
+        """Decode a Daily() or Hourly() block: one ValuesAsNumpy() per variable, no per-value loops.
+
+        With as_numpy=True values stay float32 arrays (NaN for missing) and "time" is a time_axis()
+        dict of UTC epochs; otherwise "time" holds formatted strings, shifted by ``utc_offset``
+        seconds, and values are lists with None.
+        """
+        if block.VariablesLength() == 0 or block.Variables(0).ValuesLength() == 0:
+            logger.warning(f"{label.capitalize()} forecast variables data is empty for ({latitude}, {longitude}).")
+            return {"time": []}
+        axis = time_axis(block.Time(), block.Time() + block.Variables(0).ValuesLength() * block.Interval(), block.Interval())
+        processed = {"time": axis if as_numpy else time_axis_labels(axis, time_format, utc_offset)}
+        for i in range(block.VariablesLength()):
+            if i >= len(params):
+                logger.warning(f"{label.capitalize()} forecast: Index {i} out of bounds for {label}_params.")
+                continue
+            values = block.Variables(i).ValuesAsNumpy()
+            processed[params[i]] = values if as_numpy else np.where(np.isnan(values), None, values.astype(np.float64)).tolist()
+        return processed
+
+    def _parse_forecast(self, response, latitude, longitude, daily_params, hourly_params, include_current=False, as_numpy=False):
+        processed_response = {}
+
+        if include_current:
+            processed_response["current"] = self._parse_current(response, latitude, longitude)
+
+        if daily_params and response.Daily() is not None:
+            # With timezone=auto each day starts at local midnight, so its date is the local one.
+            processed_response["daily"] = self._decode_series_block(
+                response.Daily(), daily_params, "daily", latitude, longitude, '%Y-%m-%d', as_numpy, response.UtcOffsetSeconds()
+            )
+        elif daily_params:
+            processed_response["daily"] = {"time": []}
+
+        if hourly_params and response.Hourly() is not None:
+            processed_response["hourly"] = self._decode_series_block(response.Hourly(), hourly_params, "hourly", latitude, longitude, '%Y-%m-%dT%H:%M:%SZ', as_numpy)
+        elif hourly_params:
+            processed_response["hourly"] = {"time": []}
+
+        logger.debug(f"Processed forecast for ({latitude}, {longitude})")
+        return processed_response
+
+    def get_forecast(self, latitude, longitude, daily_params=None, hourly_params=None, forecast_days=7, include_current=False, as_numpy=False):
+        """Daily and/or hourly forecast. With include_current=True the same request also
+        returns current conditions under "current", shaped like get_current_weather().
+
+        With as_numpy=True series stay float32 arrays (NaN for missing) and each "time" is a
+        time_axis() dict, as in get_ensemble_hourly_data(); serialise with NumpyJSONEncoder.
+        """
+        if daily_params is None: daily_params = []
+        if hourly_params is None: hourly_params = []
 
         if not daily_params and not hourly_params:
             logger.warning("get_forecast called with no daily or hourly params.")
             return {}
 
+        params = self._forecast_params(latitude, longitude, daily_params, hourly_params, forecast_days, include_current)
         logger.debug(f"Requesting forecast for ({latitude}, {longitude}) with params: {params}")
 
-        processed_response = {}
         try:
-            responses = self.client.weather_api(self.BASE_API_URL, params=params)
-            response = responses[0]
-
-            if daily_params and response.Daily() is not None:
-                daily_api_data = response.Daily()
-                if daily_api_data.VariablesLength() == 0 or daily_api_data.Variables(0).ValuesLength() == 0:
-                    logger.warning(f"Daily forecast variables data is empty for ({latitude}, {longitude}).")
-                    processed_response["daily"] = {"time": []}
-                else:
-                    num_days = daily_api_data.Variables(0).ValuesLength()
-                    processed_daily_data = {"time": [
-                        pd.to_datetime(daily_api_data.Time() + i * daily_api_data.Interval(), unit="s", utc=True).strftime('%Y-%m-%d')
-                        for i in range(num_days)
-                    ]}
-                    for i in range(daily_api_data.VariablesLength()):
-                        var_sdk = daily_api_data.Variables(i)
-                        if i < len(daily_params):
-                            var_name_in_list = daily_params[i]
-                            values_numpy = var_sdk.ValuesAsNumpy()
-                            processed_daily_data[var_name_in_list] = [None if np.isnan(v) else v for v in values_numpy.tolist()]
-                        else:
-                            logger.warning(f"Daily forecast: Index {i} out of bounds for daily_params.")
-                    processed_response["daily"] = processed_daily_data
-            elif daily_params:
-                 processed_response["daily"] = {"time": []}
-
-
-            if hourly_params and response.Hourly() is not None:
-                hourly_api_data = response.Hourly()
-                if hourly_api_data.VariablesLength() == 0 or hourly_api_data.Variables(0).ValuesLength() == 0:
-                    logger.warning(f"Hourly forecast variables data is empty for ({latitude}, {longitude}).")
-                    processed_response["hourly"] = {"time": []}
-                else:
-                    time_start_hourly = pd.to_datetime(hourly_api_data.Time(), unit="s", utc=True)
-                    time_end_hourly = pd.to_datetime(hourly_api_data.TimeEnd(), unit="s", utc=True)
-                    interval_seconds_hourly = hourly_api_data.Interval()
-
-                    timestamps_pd_hourly = pd.date_range(
-                        start=time_start_hourly, end=time_end_hourly,
-                        freq=pd.Timedelta(seconds=interval_seconds_hourly), inclusive="left"
-                    )
-                    processed_hourly_timestamps = timestamps_pd_hourly.strftime('%Y-%m-%dT%H:%M:%SZ').tolist()
-
-                    processed_hourly_data = {"time": processed_hourly_timestamps}
-                    for i in range(hourly_api_data.VariablesLength()):
-                        var_sdk = hourly_api_data.Variables(i)
-                        if i < len(hourly_params):
-                            var_name_in_list = hourly_params[i]
-                            values_numpy = var_sdk.ValuesAsNumpy()
-                            processed_hourly_data[var_name_in_list] = [None if np.isnan(v) else float(v) for v in values_numpy.tolist()]
-                        else:
-                            logger.warning(f"Hourly forecast: Index {i} out of bounds for hourly_params.")
-                    processed_response["hourly"] = processed_hourly_data
-            elif hourly_params:
-                processed_response["hourly"] = {"time": []}
-
-            logger.debug(f"Processed forecast for ({latitude}, {longitude})")
-            return processed_response
+            responses = self._weather_api(self.BASE_API_URL, params)
+            return self._parse_forecast(responses[0], latitude, longitude, daily_params, hourly_params, include_current, as_numpy)
 
         except Exception as e:
             logger.error(f"Error in WeatherAPIClient.get_forecast for ({latitude}, {longitude}): {e}", exc_info=True)
-            error_response = {}
-            if daily_params: error_response["daily"] = {"time": []}
-            if hourly_params: error_response["hourly"] = {"time": []}
-            return error_response
-
+            return self._empty_forecast(daily_params, hourly_params, include_current)
 
-    def get_ensemble_hourly_data(self, latitude, longitude, hourly_vars, models=None, forecast_days=7):
-        logger.info(f"get_ensemble_hourly_data called with: lat={latitude}, lon={longitude}, vars={hourly_vars}, models={models}, days={forecast_days}")
-        if models is None:
-            models = self.DEFAULT_ENSEMBLE_MODELS
+    def get_forecast_many(self, sites, daily_params=None, hourly_params=None, forecast_days=7, as_numpy=False):
+        """Batched get_forecast. Returns {site.id: forecast}."""
+        if daily_params is None: daily_params = []
+        if hourly_params is None: hourly_params = []
 
-        params = {
+        if not daily_params and not hourly_params:
+            logger.warning("get_forecast_many called with no daily or hourly params.")
+            return {site.id: {} for site in sites}
+
+        results = {}
+        for batch in self._iter_batches(sites):
+            params = self._forecast_params(
+                [s.latitude for s in batch], [s.longitude for s in batch],
+                daily_params, hourly_params, forecast_days
+            )
+            logger.debug(f"Requesting forecast for a batch of {len(batch)} sites")
+            try:
+                responses = self._weather_api(self.BASE_API_URL, params)
+                for site, response in self._responses_by_site(batch, responses):
+                    results[site.id] = self._parse_forecast(response, site.latitude, site.longitude, daily_params, hourly_params, as_numpy=as_numpy)
+            except Exception as e:
+                logger.error(f"Error in WeatherAPIClient.get_forecast_many for batch of {len(batch)} sites: {e}", exc_info=True)
+            for site in batch:
+                results.setdefault(site.id, self._empty_forecast(daily_params, hourly_params))
+        return results
+
+    def _ensemble_params(self, latitude, longitude, hourly_vars, models, forecast_days):
+        return {
             "latitude": latitude, "longitude": longitude,
             "hourly": hourly_vars,
             "models": models,
             "temperature_unit": "celsius", "wind_speed_unit": "ms", "precipitation_unit": "mm",
             "timeformat": "unixtime", "timezone": "auto", "forecast_days": forecast_days
         }
-        logger.debug(f"Requesting ensemble hourly data with params: {params}")
 
-        try:
-            responses = self.client.weather_api(self.ENSEMBLE_API_URL, params=params)
-            response = responses[0]
-            hourly_api_data = response.Hourly()
+    def _index_ensemble_variables(self, responses, models, as_numpy):
+        """Walk every returned variable once and index it by (Variable enum, altitude).
 
+        Each entry maps "<model>_member_<n>" to its values and carries the unit, so any number of
+        requested variables resolve with a dict lookup instead of a rescan of the response.
+        """
+        index = {}
+        for response_position, response in enumerate(responses):
+            hourly_api_data = response.Hourly()
             if hourly_api_data is None:
-                logger.warning(f"Ensemble API did not return 'hourly' data block for ({latitude}, {longitude})")
-                return None
-
+                continue
+            for i in range(hourly_api_data.VariablesLength()):
+                v = hourly_api_data.Variables(i)
+                member_index = v.EnsembleMember()
+                if len(responses) == len(models):
+                    model_name_for_this_member = models[response_position]
+                else:
+                    model_name_for_this_member = models[member_index % len(models)]
+                if as_numpy:
+                    values = v.ValuesAsNumpy()  # float32; NaN stays NaN until JSON serialisation
+                else:
+                    values = [None if np.isnan(val) else float(val) for val in v.ValuesAsNumpy().tolist()]
+                entry = index.setdefault((v.Variable(), v.Altitude()), {"unit": v.Unit(), "members": {}})
+                entry["members"][f"{model_name_for_this_member}_member_{member_index}"] = values
+        return index
+
+    def _parse_ensemble(self, responses, latitude, longitude, hourly_vars, models, as_numpy=False):
+        """Decode the responses returned for one location (one per model) into per-variable member series."""
+        hourly_api_data = responses[0].Hourly() if responses else None
+
+        if hourly_api_data is None:
+            logger.warning(f"Ensemble API did not return 'hourly' data block for ({latitude}, {longitude})")
+            return None
+
+        if as_numpy:
+            timestamps = time_axis(hourly_api_data.Time(), hourly_api_data.TimeEnd(), hourly_api_data.Interval())
+            logger.debug(f"Ensemble time axis: {timestamps}")
+        else:
             time_start = pd.to_datetime(hourly_api_data.Time(), unit="s", utc=True)
             time_end = pd.to_datetime(hourly_api_data.TimeEnd(), unit="s", utc=True)
             timestamps_pd = pd.date_range(
                 start=time_start, end=time_end, freq=pd.Timedelta(seconds=hourly_api_data.Interval()), inclusive="left"
             )
             timestamps = timestamps_pd.strftime('%Y-%m-%dT%H:%M:%SZ').tolist()
-
             logger.debug(f"Ensemble timestamps: {len(timestamps)} from {timestamps[0] if timestamps else 'N/A'} to {timestamps[-1] if timestamps else 'N/A'}")
-            logger.debug(f"Total variables returned by API in hourly_api_data: {hourly_api_data.VariablesLength()}")
 
+        variable_index = self._index_ensemble_variables(responses, models, as_numpy)
+        logger.debug(f"Indexed {len(variable_index)} (variable, altitude) pairs from {len(responses)} ensemble responses")
 
-            processed_data = {"time": timestamps, "variables": {}, "hourly_units": {}}
+        processed_data = {"time": timestamps, "variables": {}, "hourly_units": {}}
 
-            for requested_var_name_str in hourly_vars: # e.g., "wind_speed_80m"
-                target_sdk_enum, target_altitude = self._map_string_to_sdk_var(requested_var_name_str)
-                logger.info(f"Processing requested_var_name_str='{requested_var_name_str}': mapped to target_sdk_enum={target_sdk_enum}, target_altitude={target_altitude}")
+        for requested_var_name_str in hourly_vars: # e.g., "wind_speed_80m"
+            target_sdk_enum, target_altitude = self._map_string_to_sdk_var(requested_var_name_str)
 
-                if target_sdk_enum is None:
-                    logger.warning(f"Skipping unmappable variable: {requested_var_name_str}")
-                    processed_data["variables"][requested_var_name_str] = {}
-                    continue
+            if target_sdk_enum is None:
+                logger.warning(f"Skipping unmappable variable: {requested_var_name_str}")
+                processed_data["variables"][requested_var_name_str] = {}
+                continue
 
-                var_data_by_model_and_member = {}
-                unit = None
-                found_data_for_requested_var = False
+            entry = variable_index.get((target_sdk_enum, target_altitude))
+            if entry is None:
+                logger.warning(f"No data found in API response matching '{requested_var_name_str}' (Enum: {target_sdk_enum}, Alt: {target_altitude}) across all returned members.")
+                processed_data["variables"][requested_var_name_str] = {}
+                continue
 
-                for i in range(hourly_api_data.VariablesLength()):
-                    v = hourly_api_data.Variables(i)
-                    logger.debug(
-                        f"  API var raw dump: Index={i}, SDKVarEnum={v.Variable()}, SDKAltitude={v.Altitude()}, "
-                        f"SDKUnit={v.Unit()}, SDKEnsembleMember={v.EnsembleMember()}, ValuesLen={v.ValuesLength()}"
-                    )
+            processed_data["variables"][requested_var_name_str] = entry["members"]
+            if entry["unit"]:
+                processed_data["hourly_units"][requested_var_name_str] = entry["unit"]
 
-                    if (v.Variable() == target_sdk_enum and
-                        v.Altitude() == target_altitude):
+        logger.info(f"Successfully processed ensemble hourly data for ({latitude}, {longitude}).")
+        return processed_data
 
-                        found_data_for_requested_var = True
-                        member_index = v.EnsembleMember() 
-                        unit = v.Unit() 
+    def get_ensemble_hourly_data(self, latitude, longitude, hourly_vars, models=None, forecast_days=7, as_numpy=False):
+        """Hourly ensemble members per variable.
 
-                        model_name_for_this_member = models[member_index % len(models)]
-                        member_key = f"{model_name_for_this_member}_member_{member_index}"
-                        values = [None if np.isnan(val) else float(val) for val in v.ValuesAsNumpy().tolist()]
-                        var_data_by_model_and_member[member_key] = values
-
-                        logger.debug(f"    MATCH FOUND & ADDED: {member_key} (for {requested_var_name_str}) with {len(values)} values. Unit: {unit}")
+        With as_numpy=True member values stay float32 arrays (NaN for missing) and "time" is a
+        time_axis() dict instead of a list of strings; serialise with NumpyJSONEncoder.
+        """
+        logger.info(f"get_ensemble_hourly_data called with: lat={latitude}, lon={longitude}, vars={hourly_vars}, models={models}, days={forecast_days}")
+        if models is None:
+            models = self.DEFAULT_ENSEMBLE_MODELS
 
-                processed_data["variables"][requested_var_name_str] = var_data_by_model_and_member
-                if unit: 
-                    processed_data["hourly_units"][requested_var_name_str] = unit
-                
-                if not found_data_for_requested_var:
-                    logger.warning(f"No data found in API response matching '{requested_var_name_str}' (Enum: {target_sdk_enum}, Alt: {target_altitude}) across all returned members.")
+        params = self._ensemble_params(latitude, longitude, hourly_vars, models, forecast_days)
+        logger.debug(f"Requesting ensemble hourly data with params: {params}")
 
-            logger.info(f"Successfully processed ensemble hourly data for ({latitude}, {longitude}).")
-            return processed_data
+        try:
+            responses = self._weather_api(self.ENSEMBLE_API_URL, params)
+            location_responses = [r for r in responses if r.LocationId() == responses[0].LocationId()]
+            return self._parse_ensemble(location_responses, latitude, longitude, hourly_vars, models, as_numpy)
 
         except Exception as e:
             logger.error(f"CRITICAL Error in WeatherAPIClient.get_ensemble_hourly_data for ({latitude}, {longitude}): {e}", exc_info=True)
-            return {"time": [], "variables": {}}
\ No newline at end of file
+            return {"time": [], "variables": {}}
+
+    def get_ensemble_hourly_data_many(self, sites, hourly_vars, models=None, forecast_days=7, as_numpy=False):
+        """Batched get_ensemble_hourly_data. Returns {site.id: data}."""
+        if models is None:
+            models = self.DEFAULT_ENSEMBLE_MODELS
+
+        results = {}
+        for batch in self._iter_batches(sites):
+            params = self._ensemble_params(
+                [s.latitude for s in batch], [s.longitude for s in batch],
+                hourly_vars, models, forecast_days
+            )
+            logger.debug(f"Requesting ensemble hourly data for a batch of {len(batch)} sites")
+            try:
+                responses = self._weather_api(self.ENSEMBLE_API_URL, params)
+                for site, location_responses in self._responses_by_site(batch, responses, all_models=True):
+                    results[site.id] = self._parse_ensemble(location_responses, site.latitude, site.longitude, hourly_vars, models, as_numpy)
+            except Exception as e:
+                logger.error(f"CRITICAL Error in WeatherAPIClient.get_ensemble_hourly_data_many for batch of {len(batch)} sites: {e}", exc_info=True)
+            for site in batch:
+                results.setdefault(site.id, {"time": [], "variables": {}})
+        return results
+
+    def _archive_params(self, latitude, longitude, hourly_params, start_date, end_date):
+        return {
+            "latitude": latitude, "longitude": longitude, "hourly": hourly_params,
+            "start_date": start_date.isoformat(), "end_date": end_date.isoformat(),
+            "temperature_unit": "celsius", "wind_speed_unit": "ms", "precipitation_unit": "mm",
+            "timeformat": "unixtime", "timezone": "GMT",
+        }
+
+    def _parse_archive_hourly(self, response, hourly_params):
+        hourly_api_data = response.Hourly()
+        if hourly_api_data is None:
+            return {"time": time_axis(0, 0, 3600)}
+        processed = {"time": time_axis(hourly_api_data.Time(), hourly_api_data.TimeEnd(), hourly_api_data.Interval())}
+        for i in range(min(hourly_api_data.VariablesLength(), len(hourly_params))):
+            processed[hourly_params[i]] = hourly_api_data.Variables(i).ValuesAsNumpy()
+        return processed
+
+    def get_archive_hourly_many(self, sites, hourly_params, start_date, end_date):
+        """Hourly history from the archive (reanalysis) API for ``sites`` between two UTC dates,
+        inclusive, one upstream call per batch. Returns {site.id: {"time": time_axis() dict,
+        param: float32 array}} with NaN where the archive has no value yet.
+
+        Unlike the other *_many methods errors are raised, so a backfill stops instead of
+        recording an empty window as done. Responses bypass the upstream cache: each is read once
+        and would only push live responses out.
+        """
+        results = {}
+        timeout = (self.timeout[0], max(self.timeout[1], self.ARCHIVE_READ_TIMEOUT))
+        for batch in self._iter_batches(sites):
+            params = self._archive_params(
+                [s.latitude for s in batch], [s.longitude for s in batch], hourly_params, start_date, end_date
+            )
+            logger.debug(f"Requesting archive history {start_date}..{end_date} for a batch of {len(batch)} sites")
+            responses = self.client.weather_api(self.ARCHIVE_API_URL, params=params, timeout=timeout, expire_after=requests_cache.DO_NOT_CACHE)
+            for site, response in self._responses_by_site(batch, responses):
+                results[site.id] = self._parse_archive_hourly(response, hourly_params)
+        return results
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_weather_client():
+    """Return the process-wide WeatherAPIClient, creating it on first use.
+
+    The client holds the HTTP connection pool and the upstream cache handle, so
+    views should share it instead of constructing a new one per request.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = WeatherAPIClient()
+    return _shared_client
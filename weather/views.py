@@ -1,24 +1,68 @@
 # weather/views.py
 import logging
-from datetime import datetime, timedelta
+import warnings
+from datetime import timedelta
 from django.utils import timezone
-import json # For default_ensemble_models_json
 
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, Http404
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.cache import cache_page
 from django.conf import settings
 from django.contrib import messages
-from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 import numpy as np
 import pandas as pd
 
-from .models import WeatherSite, WeatherData, WeatherForecast
-from .utils import WeatherAPIClient
+from .models import WeatherSite, WeatherData
+from .utils import WeatherAPIClient, get_weather_client, time_axis_labels
+from .refresh import refresh_sites
+from .observations import build_observation, record_observations
+from .downsampling import lttb_indices, take
+from .windrose import DEFAULT_SPEED_BIN_EDGES, WIND_ROSE_SECTORS, wind_rose_histogram
+from .rollups import bucket_floor, choose_rollup_resolution, get_trend_points, rollup_series
+from .archive import archive_available, archived_series, read_archive
+from .ingestion import current_weather_from_db, daily_forecast_from_db, forecast_summary_from_db, hourly_forecast_from_db, ingestion_enabled
+from .caching import (
+    body_etag, json_body, get_or_compute, get_or_compute_entry, read, store,
+    current_weather_key, forecast_summary_key, dashboard_bundle_key, hourly_forecast_frame_key, ensemble_frame_key,
+    sites_geojson_key, wind_rose_key,
+)
 
 logger = logging.getLogger(__name__)
 
+# Seconds a request waits for Open-Meteo before answering from stale cache or the database.
+UPSTREAM_DEADLINE = getattr(settings, 'WEATHER_UPSTREAM_DEADLINE', 5)
+
+
+def _conditional_json_response(request, payload, etag=None):
+    """JSON response with a strong ETag, or 304 Not Modified when If-None-Match already has it.
+
+    Pass ``etag`` for cached payloads so a matching poll is answered without serialising.
+    Responses are marked no-cache: clients keep the body but revalidate on every request.
+    """
+    client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+    body = None
+    if etag is None:
+        body = json_body(payload)
+        etag = body_etag(body)
+    if etag in client_etags or '*' in client_etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body if body is not None else json_body(payload), content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _cached_entry_response(request, entry, fresh_seconds):
+    """Conditional response for a CacheEntry. How old the data is goes in the Age and X-Data-Stale
+    headers rather than the body, so an unchanged payload keeps its ETag."""
+    response = _conditional_json_response(request, entry.value, entry.etag)
+    response['Age'] = str(int(entry.age))
+    response['X-Data-Stale'] = '1' if entry.age >= fresh_seconds else '0'
+    return response
+
 # Constants for Ensemble Forecast View
 ENSEMBLE_FORECAST_VARIABLES = [
     ("shortwave_radiation", "Shortwave Radiation (W/m²)"),
@@ -145,70 +189,138 @@ def ensemble_forecast_trends_view(request):
     return render(request, 'weather/ensemble_forecast_trends.html', context)
 
 
-@cache_page(5 * 60)
+def _fetch_current_weather(site):
+    # Observations written by the ingest_weather command; only go upstream when they are stale.
+    # Without ingestion the stored rows are this function's own, so they would stand in for
+    # upstream indefinitely.
+    if ingestion_enabled():
+        stored_data = current_weather_from_db(site)
+        if stored_data:
+            return stored_data
+
+    weather_client = get_weather_client()
+    api_response = weather_client.get_current_weather(site.latitude, site.longitude)
+
+    observation = build_observation(site, api_response)
+    if observation is not None:
+        # Queued: the response doesn't wait for the insert. get_weather_data caches this response,
+        # so the write must not invalidate it again.
+        record_observations([observation], invalidate=False)
+    else:
+        logger.warning(f"WeatherAPIClient.get_current_weather returned None or incomplete data for site {site.name} (ID: {site.id}). API Response: {api_response}")
+    return api_response
+
 def get_weather_data(request, site_id):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
-    cache_key = f"weather_data_current_site_{site_id}"
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return JsonResponse(cached_data)
+    cache_key = current_weather_key(site_id)
 
     try:
-        weather_client = WeatherAPIClient()
-        api_response = weather_client.get_current_weather(site.latitude, site.longitude)
-
-        if api_response and api_response.get("time"):
-            db_data_fields = {
-                'temperature': api_response.get('temperature_2m'),
-                'humidity': api_response.get('relative_humidity_2m'),
-                'wind_speed': api_response.get('wind_speed_10m'),
-                'wind_direction': api_response.get('wind_direction_10m'),
-                'pressure': api_response.get('surface_pressure'),
-                'precipitation': api_response.get('precipitation'),
-                'uv_index': api_response.get('uv_index'),
-                'cloud_cover': api_response.get('cloud_cover'),
-                'feels_like': api_response.get('apparent_temperature'),
-                'visibility': api_response.get('visibility')
-            }
-            for key, value in db_data_fields.items():
-                if value is not None:
-                    try: db_data_fields[key] = float(value)
-                    except (ValueError, TypeError):
-                        db_data_fields[key] = None
-
-            WeatherData.objects.create(site=site, **db_data_fields)
-            cache.set(cache_key, api_response, 5 * 60)
-            return JsonResponse(api_response)
-        else:
-            logger.warning(f"WeatherAPIClient.get_current_weather returned None or incomplete data for site {site.name} (ID: {site.id}). API Response: {api_response}")
-            if isinstance(api_response, dict):
-                 return JsonResponse(api_response)
-            return JsonResponse({'error': 'Unable to fetch current weather data from external API (client returned invalid data)'}, status=502)
+        # Single-flight with stale-while-revalidate: concurrent misses share one upstream call and one
+        # WeatherData row, stale entries are served while a background refresh runs, and a slow upstream
+        # falls back to the latest stored observation after UPSTREAM_DEADLINE seconds.
+        entry = get_or_compute_entry(
+            cache_key, lambda: _fetch_current_weather(site), 5 * 60,
+            should_cache=lambda data: bool(data and data.get("time")),
+            deadline=UPSTREAM_DEADLINE,
+            fallback=lambda: current_weather_from_db(site, fresh_only=False, with_age=True)
+        )
+        if entry is not None and isinstance(entry.value, dict):
+            return _cached_entry_response(request, entry, 5 * 60)
+        return JsonResponse({'error': 'Unable to fetch current weather data from external API (client returned invalid data)'}, status=502)
     except Exception as e:
         logger.error(f"CRITICAL ERROR in get_weather_data for site {site.name} (ID: {site.id}): {str(e)}", exc_info=True)
         return JsonResponse({'error': 'Internal server error while fetching current weather data'}, status=500)
 
-@cache_page(10 * 60)
+def _fetch_forecast_summary(site):
+    stored_data = forecast_summary_from_db(site)
+    if stored_data:
+        return stored_data
+    weather_client = get_weather_client()
+    return weather_client.get_forecast(
+        site.latitude, site.longitude,
+        daily_params=["temperature_2m_max", "temperature_2m_min", "weather_code"],
+        forecast_days=7
+    )
+
+def _has_daily_forecast(data):
+    return bool(data and "daily" in data and data["daily"].get("time"))
+
 def get_forecast_data(request, site_id):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
-    cache_key = f"weather_data_forecast_summary_site_{site_id}"; cached_data = cache.get(cache_key)
-    if cached_data: return JsonResponse(cached_data)
+    cache_key = forecast_summary_key(site_id)
     try:
-        weather_client = WeatherAPIClient()
-        api_forecast_response = weather_client.get_forecast(
-            site.latitude, site.longitude,
-            daily_params=["temperature_2m_max", "temperature_2m_min", "weather_code"],
-            forecast_days=7
+        entry = get_or_compute_entry(
+            cache_key, lambda: _fetch_forecast_summary(site), 10 * 60, should_cache=_has_daily_forecast,
+            deadline=UPSTREAM_DEADLINE,
+            fallback=lambda: forecast_summary_from_db(site, fresh_only=False, with_age=True)
         )
-        if api_forecast_response and "daily" in api_forecast_response and api_forecast_response["daily"].get("time"):
-            cache.set(cache_key, api_forecast_response, 10 * 60)
-            return JsonResponse(api_forecast_response)
+        if entry is not None and _has_daily_forecast(entry.value):
+            return _cached_entry_response(request, entry, 10 * 60)
         else:
             return JsonResponse({'error': 'Unable to fetch forecast summary data from external API or data malformed'}, status=502)
     except Exception as e:
         logger.error(f"Error in get_forecast_data (summary) for site {site.id}: {e}", exc_info=True)
         return JsonResponse({'error': 'Internal server error while fetching forecast summary data'}, status=500)
 
+def _parse_max_points(request):
+    """?max_points= for series endpoints; None (send everything) when missing or below 3."""
+    try:
+        max_points = int(request.GET.get('max_points', 0))
+    except ValueError:
+        return None
+    return max_points if max_points >= 3 else None
+
+def _downsample_series_payload(payload, max_points):
+    """LTTB-downsample a Chart.js payload to ``max_points``.
+
+    One set of indices is chosen across every dataset, so 'labels', each dataset's 'data' and any
+    per-model 'statistics' arrays stay aligned.
+    """
+    if not max_points or len(payload['labels']) <= max_points:
+        return payload
+    indices = lttb_indices([np.asarray(dataset['data'], dtype=np.float64) for dataset in payload['datasets']], max_points)
+    payload['labels'] = take(payload['labels'], indices)
+    for dataset in payload['datasets']:
+        dataset['data'] = take(dataset['data'], indices)
+    for model_statistics in payload.get('statistics', {}).values():
+        for name, values in model_statistics.items():
+            model_statistics[name] = take(values, indices)
+    return payload
+
+def _parse_trend_points(request):
+    try:
+        return max(1, int(request.GET.get('points', get_trend_points())))
+    except ValueError:
+        return get_trend_points()
+
+def _observation_series(site, field, start_time, min_points):
+    """(labels, values, resolution) for ``field`` since ``start_time``.
+
+    Uses the coarsest rollup that still gives ``min_points`` buckets (bucket means), falling back
+    to raw WeatherData rows for short ranges. ``resolution`` is 'hour', 'day', 'month' or 'raw'.
+    Whatever compact_weather has removed from the start of the range is read from the Parquet
+    archive when one exists. Under the default retention (raw 30 days, hourly 365, daily kept) the
+    daily and monthly rollups cover any range, so the archive is only read when rollups have been
+    pruned (a finite 'daily' retention) or are missing for that stretch, e.g. archived rows that
+    predate the rollup tables.
+    """
+    now, archived = timezone.now(), archive_available()
+    resolution = choose_rollup_resolution((now - start_time).total_seconds(), min_points, archived=archived)
+    if resolution:
+        rows = rollup_series(site, field, start_time, resolution)
+        labels, values = [bucket_start.isoformat() for bucket_start, *_ in rows], [mean for _, mean, *_ in rows]
+        db_start = rows[0][0] if rows else now
+    else:
+        rows = list(WeatherData.objects.filter(site=site, timestamp__gte=start_time).order_by('timestamp').values_list('timestamp', field))
+        labels, values = [timestamp.isoformat() for timestamp, _ in rows], [float(value) if value is not None else None for _, value in rows]
+        db_start = rows[0][0] if rows else now
+    if archived and start_time < db_start:
+        # Rollup rows cover whole buckets, so the archive is read from the same bucket boundary.
+        archive_start = bucket_floor(start_time, resolution) if resolution else start_time
+        archived_labels, archived_values = archived_series(site.id, field, archive_start, db_start, resolution)
+        labels, values = archived_labels + labels, archived_values + values
+    return labels, values, resolution or 'raw'
+
 def get_chart_data(request, site_id, chart_type):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
     hours = int(request.GET.get('hours', 24))
@@ -220,9 +332,7 @@ def get_chart_data(request, site_id, chart_type):
     }
     model_field_name = field_map.get(chart_type)
     if not model_field_name: return JsonResponse({'error': 'Invalid chart type specified'}, status=400)
-    weather_data_qs = WeatherData.objects.filter(site=site, timestamp__gte=start_time).order_by('timestamp').values('timestamp', model_field_name)
-    labels = [item['timestamp'].isoformat() for item in weather_data_qs]
-    dataset_values = [float(item[model_field_name]) if item[model_field_name] is not None else None for item in weather_data_qs]
+    labels, dataset_values, resolution = _observation_series(site, model_field_name, start_time, _parse_trend_points(request))
     chart_configs = {
         'temperature': {'label': 'Temperature (°C)', 'color_key': 'primary_blue'}, 'wind_speed': {'label': 'Wind Speed (m/s)', 'color_key': 'purple'},
         'precipitation': {'label': 'Precipitation (mm)', 'color_key': 'red', 'type': 'bar'}, 'pressure': {'label': 'Pressure (hPa)', 'color_key': 'secondary_blue'},
@@ -233,34 +343,194 @@ def get_chart_data(request, site_id, chart_type):
     config = chart_configs.get(chart_type)
     if not config: return JsonResponse({'error': 'Chart configuration error'}, status=500)
     adani_colors = getattr(settings, 'ADANI_COLORS', {}); border_color = adani_colors.get(config['color_key'], '#007bff')
-    response_data = {'labels': labels, 'datasets': [{'label': config['label'], 'data': dataset_values, 'borderColor': border_color, 'backgroundColor': border_color + '33', 'fill': True, 'tension': 0.3}], 'type': config.get('type', 'line')}
-    return JsonResponse(response_data)
+    response_data = {'labels': labels, 'datasets': [{'label': config['label'], 'data': dataset_values, 'borderColor': border_color, 'backgroundColor': border_color + '33', 'fill': True, 'tension': 0.3}], 'type': config.get('type', 'line'), 'resolution': resolution}
+    return _conditional_json_response(request, _downsample_series_payload(response_data, _parse_max_points(request)))
+
+# Dashboard chart type -> Open-Meteo hourly variable
+HOURLY_FORECAST_PARAM_MAP = {'temperature': 'temperature_2m', 'wind_speed': 'wind_speed_10m', 'pressure': 'surface_pressure', 'humidity': 'relative_humidity_2m', 'cloud_cover': 'cloud_cover', 'uv_index': 'uv_index', 'feels_like': 'apparent_temperature'}
+HOURLY_FORECAST_CHART_CONFIGS = {'temperature': {'label': 'Temperature Forecast (°C)', 'color_key': 'primary_blue'},'wind_speed': {'label': 'Wind Speed Forecast (m/s)', 'color_key': 'purple'},'pressure': {'label': 'Pressure Forecast (hPa)', 'color_key': 'secondary_blue'},'humidity': {'label': 'Humidity Forecast (%)', 'color_key': 'secondary_purple'},'cloud_cover': {'label': 'Cloud Cover Forecast (%)', 'color_key': 'primary_blue'},'uv_index': {'label': 'UV Index Forecast', 'color_key': 'red'},'feels_like': {'label': 'Feels Like Forecast (°C)', 'color_key': 'secondary_purple'},}
+
+HOURLY_FORECAST_MAX_DAYS = 16
+HOURLY_FORECAST_FRAME_TTL = 30 * 60
+
+def get_hourly_forecast_frame(site):
+    """Every HOURLY_FORECAST_PARAM_MAP variable for the full forecast horizon, cached.
+
+    Read from HourlyForecast when ingestion has stored a fresh run, otherwise fetched upstream in
+    one call. Charts and forecast_days choices are slices of this frame.
+    """
+    def fetch_frame():
+        stored_frame = hourly_forecast_from_db(site, list(HOURLY_FORECAST_PARAM_MAP.values()))
+        if stored_frame:
+            return stored_frame
+        forecast_data = get_weather_client().get_forecast(
+            site.latitude, site.longitude,
+            hourly_params=list(HOURLY_FORECAST_PARAM_MAP.values()), forecast_days=HOURLY_FORECAST_MAX_DAYS
+        )
+        return forecast_data.get("hourly", {})
+    # None when another caller is still fetching the frame after the single-flight wait.
+    return get_or_compute(
+        hourly_forecast_frame_key(site.id), fetch_frame, HOURLY_FORECAST_FRAME_TTL,
+        should_cache=lambda frame: bool(frame.get("time"))
+    ) or {}
+
+def slice_hourly_forecast_frame(frame, forecast_days):
+    """First ``forecast_days`` days of an hourly frame (the API's hourly axis starts at local midnight today)."""
+    steps = forecast_days * 24
+    return {key: values[:steps] for key, values in frame.items()}
+
+def _parse_forecast_days(request, default=7):
+    try:
+        forecast_days = int(request.GET.get('forecast_days', default))
+    except ValueError:
+        return default
+    return forecast_days if 1 <= forecast_days <= HOURLY_FORECAST_MAX_DAYS else default
+
+def _hourly_forecast_chart_payload(chart_type, hourly_data):
+    open_meteo_param = HOURLY_FORECAST_PARAM_MAP[chart_type]
+    labels = hourly_data.get("time", []); dataset_values = hourly_data.get(open_meteo_param, [])
+    config = HOURLY_FORECAST_CHART_CONFIGS[chart_type]
+    adani_colors = getattr(settings, 'ADANI_COLORS', {}); border_color = adani_colors.get(config['color_key'], '#007bff')
+    return {'labels': labels, 'datasets': [{'label': config['label'], 'data': dataset_values, 'borderColor': border_color, 'backgroundColor': border_color + '33', 'fill': True, 'tension': 0.3}], 'type': 'line'}
+
+def _daily_precipitation_chart_payload(daily_data):
+    labels = daily_data.get("time", []); dataset_values = daily_data.get('precipitation_sum', [])
+    adani_colors = getattr(settings, 'ADANI_COLORS', {}); border_color = adani_colors.get('red', '#BD3861')
+    return {'labels': labels, 'datasets': [{'label': 'Daily Precipitation Sum (mm)', 'data': dataset_values, 'borderColor': border_color, 'backgroundColor': border_color + '77', 'fill': False, 'borderWidth': 1}], 'type': 'bar'}
 
 def get_hourly_forecast_chart_data(request, site_id, chart_type):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
-    om_param_map = {'temperature': 'temperature_2m', 'wind_speed': 'wind_speed_10m', 'pressure': 'surface_pressure', 'humidity': 'relative_humidity_2m', 'cloud_cover': 'cloud_cover', 'uv_index': 'uv_index', 'feels_like': 'apparent_temperature'}
-    open_meteo_param = om_param_map.get(chart_type)
+    open_meteo_param = HOURLY_FORECAST_PARAM_MAP.get(chart_type)
     if not open_meteo_param: return JsonResponse({'error': 'Invalid chart type for hourly forecast'}, status=400)
-    weather_client = WeatherAPIClient(); forecast_data = weather_client.get_forecast(site.latitude, site.longitude, hourly_params=[open_meteo_param], forecast_days=7)
-    if not forecast_data or "hourly" not in forecast_data or not forecast_data["hourly"].get("time"): return JsonResponse({'error': f'Unable to fetch hourly forecast data for {chart_type}'}, status=502)
-    hourly_data = forecast_data["hourly"]; labels = hourly_data.get("time", []); dataset_values = hourly_data.get(open_meteo_param, [])
-    chart_configs = {'temperature': {'label': 'Temperature Forecast (°C)', 'color_key': 'primary_blue'},'wind_speed': {'label': 'Wind Speed Forecast (m/s)', 'color_key': 'purple'},'pressure': {'label': 'Pressure Forecast (hPa)', 'color_key': 'secondary_blue'},'humidity': {'label': 'Humidity Forecast (%)', 'color_key': 'secondary_purple'},'cloud_cover': {'label': 'Cloud Cover Forecast (%)', 'color_key': 'primary_blue'},'uv_index': {'label': 'UV Index Forecast', 'color_key': 'red'},'feels_like': {'label': 'Feels Like Forecast (°C)', 'color_key': 'secondary_purple'},}
-    config = chart_configs.get(chart_type)
-    if not config: return JsonResponse({'error': 'Chart configuration error for forecast'}, status=500)
-    adani_colors = getattr(settings, 'ADANI_COLORS', {}); border_color = adani_colors.get(config['color_key'], '#007bff')
-    response_data = {'labels': labels, 'datasets': [{'label': config['label'], 'data': dataset_values, 'borderColor': border_color, 'backgroundColor': border_color + '33', 'fill': True, 'tension': 0.3}], 'type': 'line'}
-    return JsonResponse(response_data)
+    frame = get_hourly_forecast_frame(site)
+    if not frame.get("time"): return JsonResponse({'error': f'Unable to fetch hourly forecast data for {chart_type}'}, status=502)
+    hourly_data = slice_hourly_forecast_frame(frame, _parse_forecast_days(request))
+    payload = _hourly_forecast_chart_payload(chart_type, hourly_data)
+    return _conditional_json_response(request, _downsample_series_payload(payload, _parse_max_points(request)))
 
 def get_daily_precipitation_forecast_chart_data(request, site_id):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
-    weather_client = WeatherAPIClient(); forecast_data = weather_client.get_forecast(site.latitude, site.longitude, daily_params=['precipitation_sum'], forecast_days=7)
+    forecast_data = daily_forecast_from_db(site, ['precipitation_sum'])
+    if not forecast_data:
+        weather_client = get_weather_client(); forecast_data = weather_client.get_forecast(site.latitude, site.longitude, daily_params=['precipitation_sum'], forecast_days=7)
     if not forecast_data or "daily" not in forecast_data or not forecast_data["daily"].get("time"): return JsonResponse({'error': 'Unable to fetch daily precipitation forecast data'}, status=502)
-    daily_data = forecast_data["daily"]; labels = daily_data.get("time", []); dataset_values = daily_data.get('precipitation_sum', [])
-    adani_colors = getattr(settings, 'ADANI_COLORS', {}); border_color = adani_colors.get('red', '#BD3861')
-    response_data = {'labels': labels, 'datasets': [{'label': 'Daily Precipitation Sum (mm)', 'data': dataset_values, 'borderColor': border_color, 'backgroundColor': border_color + '77', 'fill': False, 'borderWidth': 1}], 'type': 'bar'}
-    return JsonResponse(response_data)
+    payload = _daily_precipitation_chart_payload(forecast_data["daily"])
+    return _conditional_json_response(request, _downsample_series_payload(payload, _parse_max_points(request)))
+
+def get_dashboard_bundle(request, site_id):
+    """Every dashboard panel for one site, built from a single combined upstream forecast call.
+
+    A slow upstream falls back to whatever ingestion stored, however old, after UPSTREAM_DEADLINE seconds.
+    """
+    site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
+    entry = get_or_compute_entry(
+        dashboard_bundle_key(site_id), lambda: _build_dashboard_bundle(site), 5 * 60,
+        deadline=UPSTREAM_DEADLINE, fallback=lambda: _dashboard_bundle_from_db(site)
+    )
+    if entry is None or entry.value is None:
+        return JsonResponse({'error': 'Unable to fetch dashboard forecast data'}, status=502)
+    return _cached_entry_response(request, entry, 5 * 60)
+
+DASHBOARD_DAILY_PARAMS = ["temperature_2m_max", "temperature_2m_min", "weather_code", "precipitation_sum"]
+
+def _build_dashboard_bundle(site):
+    # Prefer what ingestion stored; otherwise one combined upstream call covers every panel.
+    current = current_weather_from_db(site)
+    stored_daily = daily_forecast_from_db(site, DASHBOARD_DAILY_PARAMS)
+    frame = get_hourly_forecast_frame(site) if current and stored_daily else None
+    if frame and frame.get("time"):
+        forecast_data = {"current": current, "hourly": frame, "daily": stored_daily["daily"]}
+    else:
+        # The same call fills the hourly frame at full horizon, so later chart requests are cache hits.
+        forecast_data = get_weather_client().get_forecast(
+            site.latitude, site.longitude,
+            daily_params=DASHBOARD_DAILY_PARAMS, hourly_params=list(HOURLY_FORECAST_PARAM_MAP.values()),
+            forecast_days=HOURLY_FORECAST_MAX_DAYS, include_current=True
+        )
+    frame = forecast_data.get("hourly", {})
+    if frame.get("time"):
+        store(hourly_forecast_frame_key(site.id), frame)
+    return _assemble_dashboard_bundle(site, forecast_data.get("current", {}), frame, forecast_data.get("daily", {}), _wind_rose_payload(site, 7))
+
+def _dashboard_bundle_from_db(site):
+    """(bundle, age_seconds) from the stored observation and forecasts regardless of age, or (None, None)."""
+    current, current_age = current_weather_from_db(site, fresh_only=False, with_age=True)
+    stored_daily, daily_age = daily_forecast_from_db(site, DASHBOARD_DAILY_PARAMS, fresh_only=False, with_age=True)
+    frame = hourly_forecast_from_db(site, list(HOURLY_FORECAST_PARAM_MAP.values()), fresh_only=False)
+    if not stored_daily or not frame:
+        return None, None
+    # Only a rose that is already cached: computing one here could outlast the deadline being rescued.
+    rose = read(wind_rose_key(site.id, 'observations', 7, 16, DEFAULT_SPEED_BIN_EDGES))
+    bundle = _assemble_dashboard_bundle(site, current or {}, frame, stored_daily["daily"], rose.value if rose else None)
+    return bundle, max(current_age or 0.0, daily_age)
+
+def _assemble_dashboard_bundle(site, current, frame, daily, wind_rose):
+    daily_data = {key: values[:7] for key, values in daily.items()}
+    if not frame.get("time") or not daily_data.get("time"):
+        return None
+    hourly_data = slice_hourly_forecast_frame(frame, 7)
+
+    bundle = {
+        'current': current,
+        'hourly_charts': {chart_type: _hourly_forecast_chart_payload(chart_type, hourly_data) for chart_type in HOURLY_FORECAST_PARAM_MAP},
+        'daily_precipitation_chart': _daily_precipitation_chart_payload(daily_data),
+        'forecast_summary': {'daily': {key: daily_data.get(key, []) for key in ["time", "temperature_2m_max", "temperature_2m_min", "weather_code"]}},
+    }
+    if wind_rose is not None:
+        bundle['wind_rose'] = wind_rose
+    return bundle
 
 # --- ENSEMBLE FORECAST TRENDS (MEAN/MIN/MAX VIEW) ---
+DEFAULT_ENSEMBLE_PERCENTILES = [10, 25, 75, 90]
+
+ENSEMBLE_FRAME_TTL = 30 * 60
+
+def get_ensemble_frame(site, forecast_days):
+    """Every ENSEMBLE_FORECAST_VARIABLES series for all default models, from one upstream call, cached per (site, days)."""
+    def fetch_frame():
+        return get_weather_client().get_ensemble_hourly_data(
+            latitude=site.latitude, longitude=site.longitude,
+            hourly_vars=[var_info[0] for var_info in ENSEMBLE_FORECAST_VARIABLES],
+            models=WeatherAPIClient.DEFAULT_ENSEMBLE_MODELS, # Always fetch all models for potential aggregation
+            forecast_days=forecast_days,
+            as_numpy=True
+        )
+    return get_or_compute(
+        ensemble_frame_key(site.id, forecast_days), fetch_frame, ENSEMBLE_FRAME_TTL,
+        should_cache=lambda frame: bool(frame and isinstance(frame.get("time"), dict) and frame["time"].get("count"))
+    )
+
+def _parse_ensemble_percentiles(request):
+    """Percentile bands from ?percentiles=10,25,75,90, falling back to settings.ENSEMBLE_PERCENTILES."""
+    default = getattr(settings, 'ENSEMBLE_PERCENTILES', DEFAULT_ENSEMBLE_PERCENTILES)
+    percentiles_str = request.GET.get('percentiles')
+    if not percentiles_str:
+        return list(default)
+    try:
+        percentiles = sorted({int(p) for p in percentiles_str.split(',') if p.strip()})
+    except ValueError:
+        return list(default)
+    return [p for p in percentiles if 0 < p < 100] or list(default)
+
+def _ensemble_member_statistics(member_matrix, percentiles):
+    """Min/mean/max, median and percentile bands across ensemble members (axis 0) for every time step.
+
+    Values stay NumPy arrays; NumpyJSONEncoder turns NaN into null when the response is written.
+    """
+    with warnings.catch_warnings():
+        # Time steps where every member is missing produce NaN (serialised as null), not a warning.
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        statistics = {
+            'min': np.nanmin(member_matrix, axis=0),
+            'mean': np.nanmean(member_matrix, axis=0, dtype=np.float64),
+            'max': np.nanmax(member_matrix, axis=0),
+        }
+        quantiles = np.nanpercentile(member_matrix, [50] + list(percentiles), axis=0)
+    statistics['median'] = quantiles[0]
+    for percentile, values in zip(percentiles, quantiles[1:]):
+        statistics[f'p{percentile}'] = values
+    return statistics
+
 def get_ensemble_forecast_trend_data(request, site_id, variable_name):
     try:
         site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
@@ -280,20 +550,15 @@ def get_ensemble_forecast_trend_data(request, site_id, variable_name):
     model_filter_from_request = request.GET.get('model_filter', 'all')
     logger.info(f"Requesting AGGREGATED ensemble data for site {site.id}, var {variable_name}, days {forecast_days}, model_filter: {model_filter_from_request}")
 
-    weather_client = WeatherAPIClient()
-    ensemble_api_data = weather_client.get_ensemble_hourly_data(
-        latitude=site.latitude, longitude=site.longitude,
-        hourly_vars=[variable_name],
-        models=WeatherAPIClient.DEFAULT_ENSEMBLE_MODELS, # Always fetch all models for potential aggregation
-        forecast_days=forecast_days
-    )
+    ensemble_api_data = get_ensemble_frame(site, forecast_days)
 
-    if not ensemble_api_data or "time" not in ensemble_api_data or not ensemble_api_data["time"]:
+    time_axis_data = (ensemble_api_data or {}).get("time")
+    if not isinstance(time_axis_data, dict) or not time_axis_data.get("count"):
         logger.error(f"Failed to fetch or parse base ensemble data for site {site.id}, var {variable_name}")
         return JsonResponse({'error': 'No time data or base ensemble data unavailable.'}, status=500)
 
-    labels_utc_iso = ensemble_api_data.get("time", [])
-    num_time_steps = len(labels_utc_iso)
+    labels_utc_iso = time_axis_labels(time_axis_data)
+    num_time_steps = time_axis_data["count"]
     unit = ensemble_api_data.get("hourly_units", {}).get(variable_name, "")
     
     # This will contain all member data for the requested variable_name, e.g., {"icon_seamless_member_0": [...], "gfs_seamless_member_1": [...]}
@@ -303,6 +568,8 @@ def get_ensemble_forecast_trend_data(request, site_id, variable_name):
         logger.warning(f"No member data found for variable '{variable_name}' in ensemble_api_data.variables.")
         return JsonResponse({'error': f'No member data found for variable {variable_name}.'}, status=500)
 
+    percentiles = _parse_ensemble_percentiles(request)
+    statistics_by_model = {}
     output_datasets = []
     model_colors = {
         'icon_seamless': '#2ca02c',  # Green
@@ -325,10 +592,10 @@ def get_ensemble_forecast_trend_data(request, site_id, variable_name):
         model_specific_member_series = []
         for member_key, member_values in all_member_data_for_variable.items():
             if member_key.startswith(model_code + "_member_"):
-                if member_values and len(member_values) == num_time_steps:
+                if member_values is not None and len(member_values) == num_time_steps:
                     model_specific_member_series.append(member_values)
                 else:
-                    logger.warning(f"Member series {member_key} for model {model_code} has mismatched length or is empty. Expected {num_time_steps}, got {len(member_values) if member_values else 0}. Skipping.")
+                    logger.warning(f"Member series {member_key} for model {model_code} has mismatched length or is empty. Expected {num_time_steps}, got {len(member_values) if member_values is not None else 0}. Skipping.")
         
         if not model_specific_member_series:
             logger.warning(f"No valid member series found for model {model_code} and variable {variable_name}. Skipping this model.")
@@ -336,21 +603,13 @@ def get_ensemble_forecast_trend_data(request, site_id, variable_name):
         
         logger.info(f"Found {len(model_specific_member_series)} member series for model {model_code} to aggregate.")
 
-        min_values_for_model = [None] * num_time_steps
-        mean_values_for_model = [None] * num_time_steps
-        max_values_for_model = [None] * num_time_steps
-
-        for t in range(num_time_steps):
-            values_at_t = []
-            for series in model_specific_member_series:
-                if series[t] is not None: # Ensure np.nanmean etc. handle lists of numbers
-                    values_at_t.append(series[t])
-            
-            if values_at_t: # Only calculate if there's actual data
-                min_values_for_model[t] = float(np.nanmin(values_at_t))
-                mean_values_for_model[t] = float(np.nanmean(values_at_t))
-                max_values_for_model[t] = float(np.nanmax(values_at_t))
-            # If values_at_t is empty, they remain None
+        # members x time; None becomes NaN so each statistic is a single vectorized call over axis 0
+        member_matrix = np.vstack(model_specific_member_series)  # float32 straight from the decoder
+        model_statistics = _ensemble_member_statistics(member_matrix, percentiles)
+        statistics_by_model[model_code] = model_statistics
+        min_values_for_model = model_statistics['min']
+        mean_values_for_model = model_statistics['mean']
+        max_values_for_model = model_statistics['max']
 
         base_color_hex = model_colors.get(model_code, '#7f7f7f') # Default to grey
         
@@ -412,11 +671,12 @@ def get_ensemble_forecast_trend_data(request, site_id, variable_name):
     chart_js_data_response = {
         'labels': labels_utc_iso,
         'datasets': output_datasets,
-        'yAxisTitle': y_axis_title_str
+        'yAxisTitle': y_axis_title_str,
+        'statistics': statistics_by_model,
     }
     
     logger.info(f"Returning {len(output_datasets)} AGGREGATED datasets for {variable_name} (filter: {model_filter_from_request})")
-    return JsonResponse(chart_js_data_response)
+    return _conditional_json_response(request, _downsample_series_payload(chart_js_data_response, _parse_max_points(request)))
 
 def satellite_imagery_view(request):
     """View for displaying satellite imagery slideshows."""
@@ -445,60 +705,124 @@ def get_temperature_trend_data(request, site_id):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
     days = int(request.GET.get('days', '7')); days = max(1, min(365, days))
     start_time = timezone.now() - timedelta(days=days)
-    qs = WeatherData.objects.filter(site=site, timestamp__gte=start_time, temperature__isnull=False).order_by('timestamp').values('timestamp', 'temperature')
-    labels = [item['timestamp'].isoformat() for item in qs]
-    temps = [item['temperature'] for item in qs]
+    labels, temps = [], []
+    series_labels, series_values, resolution = _observation_series(site, 'temperature', start_time, _parse_trend_points(request))
+    for label, value in zip(series_labels, series_values):
+        if value is not None:
+            labels.append(label); temps.append(value)
     colors = getattr(settings, 'ADANI_COLORS', {}); border_color = colors.get('primary_blue', '#0B74B0')
-    return JsonResponse({'labels': labels, 'datasets': [{'label': f'Temp (°C) - Last {days} Days', 'data': temps, 'borderColor': border_color, 'backgroundColor': border_color + '20', 'fill': True, 'tension': 0.1}]})
+    response_data = {'labels': labels, 'datasets': [{'label': f'Temp (°C) - Last {days} Days', 'data': temps, 'borderColor': border_color, 'backgroundColor': border_color + '20', 'fill': True, 'tension': 0.1}], 'resolution': resolution}
+    return _conditional_json_response(request, _downsample_series_payload(response_data, _parse_max_points(request)))
+
+WIND_ROSE_TTL = 10 * 60
+WIND_ROSE_SOURCES = ('observations', 'forecast')
+WIND_ROSE_MAX_SPEED_BINS = 12
+
+def _wind_rose_samples(site, days, source):
+    """(directions, speeds, timestamps) arrays: stored observations over the last ``days`` days, or
+    the hourly forecast over the next ``days`` days. Timestamps are UTC datetime64[ms].
+
+    compact_weather deletes raw observations after the raw retention and the rollups don't keep
+    wind direction, so older parts of the window come from the Parquet archive when there is one.
+    """
+    if source == 'forecast':
+        hourly_params = ['wind_direction_10m', 'wind_speed_10m']
+        frame = hourly_forecast_from_db(site, hourly_params) or get_weather_client().get_forecast(
+            site.latitude, site.longitude, hourly_params=hourly_params, forecast_days=min(days, HOURLY_FORECAST_MAX_DAYS)
+        ).get("hourly", {})
+        times = pd.to_datetime(frame.get("time", []), utc=True)
+        window_start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        in_window = np.asarray((times >= window_start) & (times < window_start + timedelta(days=days)))
+        directions, speeds = (np.asarray(frame.get(param) or [], dtype=np.float64)[in_window] for param in hourly_params)
+        return directions, speeds, times[in_window].tz_localize(None).to_numpy().astype('datetime64[ms]')
+    start_time = timezone.now() - timedelta(days=days)
+    rows = list(WeatherData.objects.filter(site=site, timestamp__gte=start_time).order_by('timestamp').values_list('timestamp', 'wind_direction', 'wind_speed'))
+    timestamps = np.array([timestamp.replace(tzinfo=None) for timestamp, _, _ in rows], dtype='datetime64[ms]')
+    samples = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 2)
+    directions, speeds = samples[:, 0], samples[:, 1]
+    db_start = rows[0][0] if rows else timezone.now()
+    if start_time < db_start and archive_available():
+        archived_times, archived = read_archive(site.id, ['wind_direction', 'wind_speed'], start_time, db_start)
+        directions = np.concatenate([archived['wind_direction'].astype(np.float64), directions])
+        speeds = np.concatenate([archived['wind_speed'].astype(np.float64), speeds])
+        timestamps = np.concatenate([archived_times, timestamps])
+    return directions, speeds, timestamps
+
+def _wind_rose_payload(site, days, source='observations', sectors=16, speed_bin_edges=DEFAULT_SPEED_BIN_EDGES):
+    """Direction x speed histogram for the wind rose, cached per (site, source, window, binning).
+
+    'start' and 'end' are the first and last sample actually binned and 'days' the number of days
+    they span, which is less than ``requested_days`` when history or the forecast is shorter.
+    """
+    def compute():
+        directions, speeds, timestamps = _wind_rose_samples(site, days, source)
+        payload = wind_rose_histogram(directions, speeds, sectors=sectors, speed_bin_edges=speed_bin_edges)
+        covered = timestamps[np.isfinite(directions) & np.isfinite(speeds)]
+        if len(covered):
+            first, last = covered.min(), covered.max()
+            span = int(np.ceil((last - first + np.timedelta64(1, 'h')) / np.timedelta64(1, 'D')))
+            payload.update({'start': f"{first}Z", 'end': f"{last}Z", 'days': min(days, span)})
+        else:
+            payload.update({'start': None, 'end': None, 'days': 0})
+        payload.update({'source': source, 'requested_days': days})
+        return payload
+    return get_or_compute(
+        wind_rose_key(site.id, source, days, sectors, speed_bin_edges), compute, WIND_ROSE_TTL,
+        should_cache=lambda payload: payload['count'] > 0
+    )
 
 def get_wind_rose_data(request, site_id):
     site = get_object_or_404(WeatherSite, id=site_id, is_active=True)
-    days = int(request.GET.get('days', 7))
-    start_time = timezone.now() - timedelta(days=days)
-    qs = WeatherData.objects.filter(site=site, timestamp__gte=start_time, wind_speed__isnull=False, wind_direction__isnull=False).order_by('timestamp').values('timestamp', 'wind_speed', 'wind_direction')
-    data_points = [{'direction': i['wind_direction'], 'speed': i['wind_speed'], 'timestamp': i['timestamp'].isoformat()} for i in qs]
-    return JsonResponse({'wind_data': data_points})
-
-def get_sites_geojson(request):
-    sites_qs = WeatherSite.objects.filter(is_active=True)
+    source = request.GET.get('source', 'observations')
+    if source not in WIND_ROSE_SOURCES: return JsonResponse({'error': f"source must be one of {', '.join(WIND_ROSE_SOURCES)}"}, status=400)
+    try:
+        days = int(request.GET.get('days', 7))
+        sectors = int(request.GET.get('sectors', 16))
+        speed_bin_edges = tuple(float(edge) for edge in request.GET['speed_bins'].split(',')) if request.GET.get('speed_bins') else DEFAULT_SPEED_BIN_EDGES
+    except ValueError:
+        return JsonResponse({'error': 'days, sectors and speed_bins must be numbers'}, status=400)
+    if days < 1: return JsonResponse({'error': 'days must be at least 1'}, status=400)
+    if sectors not in WIND_ROSE_SECTORS: return JsonResponse({'error': f"sectors must be one of {', '.join(map(str, WIND_ROSE_SECTORS))}"}, status=400)
+    if not 1 <= len(speed_bin_edges) <= WIND_ROSE_MAX_SPEED_BINS or not np.all(np.isfinite(speed_bin_edges)) or speed_bin_edges[0] < 0 or any(b <= a for a, b in zip(speed_bin_edges, speed_bin_edges[1:])):
+        return JsonResponse({'error': f'speed_bins must be at most {WIND_ROSE_MAX_SPEED_BINS} increasing, non-negative lower bounds'}, status=400)
+    if source == 'forecast':
+        days = min(days, HOURLY_FORECAST_MAX_DAYS)
+    payload = _wind_rose_payload(site, days, source, sectors, speed_bin_edges)
+    if payload is None: return JsonResponse({'error': 'Wind rose is still being computed; retry shortly'}, status=503)
+    return _conditional_json_response(request, payload)
+
+SITES_GEOJSON_TTL = 5 * 60
+
+def _sites_geojson_payload():
     features = []
-    for site_obj in sites_qs:
-        latest_weather = site_obj.weather_data.order_by('-timestamp').first()
+    # One join: the latest temperature comes from the LatestObservation snapshot, not each site's history.
+    for site_obj in WeatherSite.objects.filter(is_active=True).select_related('latest_observation'):
+        latest_weather = getattr(site_obj, 'latest_observation', None)
         temp_val = latest_weather.temperature if latest_weather and latest_weather.temperature is not None else None
         popup_html = f"<h6>{site_obj.name}</h6><p><strong>Type:</strong> {site_obj.site_type}</p>"
         popup_html += f'<p><strong>Temp:</strong> {temp_val}°C</p>' if temp_val is not None else '<p>Temp: N/A</p>'
         popup_html += f"<button class='btn btn-sm btn-primary mt-1' onclick='selectSite(\"{site_obj.id}\")'>View Details</button>"
         feature = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [site_obj.longitude, site_obj.latitude]}, 'properties': {'id': site_obj.id, 'name': site_obj.name, 'type': site_obj.site_type, 'capacity': site_obj.capacity, 'state': site_obj.state, 'temperature': temp_val, 'popup_html': popup_html}}
         features.append(feature)
-    return JsonResponse({'type': 'FeatureCollection', 'features': features})
+    return {'type': 'FeatureCollection', 'features': features}
+
+def get_sites_geojson(request):
+    # Cached with its ETag; new observations drop it, and site edits show up within SITES_GEOJSON_TTL.
+    # If another request is building it and doesn't finish in time, build it here from the database.
+    entry = get_or_compute_entry(sites_geojson_key(), _sites_geojson_payload, SITES_GEOJSON_TTL, fallback=lambda: (_sites_geojson_payload(), 0))
+    return _conditional_json_response(request, entry.value, entry.etag)
 
 @csrf_exempt
 def update_weather_data(request):
     if request.method == 'POST':
         try:
-            client = WeatherAPIClient(); sites_to_update = WeatherSite.objects.filter(is_active=True)
-            updated_count, failed_sites = 0, []
-            for site in sites_to_update:
-                try:
-                    api_response = client.get_current_weather(site.latitude, site.longitude)
-                    if api_response and api_response.get("time"):
-                        db_data = {k: api_response.get(v) for k, v in {'temperature':'temperature_2m', 'humidity':'relative_humidity_2m', 'wind_speed':'wind_speed_10m', 'wind_direction':'wind_direction_10m', 'pressure':'surface_pressure', 'precipitation':'precipitation', 'uv_index':'uv_index', 'cloud_cover':'cloud_cover', 'feels_like':'apparent_temperature', 'visibility':'visibility'}.items()}
-                        for key, val in db_data.items():
-                            if val is not None:
-                                try: db_data[key] = float(val)
-                                except (ValueError, TypeError): db_data[key] = None
-                        WeatherData.objects.create(site=site, **db_data)
-                        updated_count += 1; cache.delete(f"weather_data_current_site_{site.id}")
-                    else:
-                        logger.warning(f"No valid API response for site {site.name} during bulk update. API Response: {api_response}")
-                        failed_sites.append(site.name)
-                except Exception as e_site:
-                    logger.error(f"Error updating site {site.name} during bulk update: {e_site}", exc_info=True)
-                    failed_sites.append(site.name)
-            msg = f'Manual update: {updated_count} of {sites_to_update.count()} sites updated.'
+            summary = refresh_sites(WeatherSite.objects.filter(is_active=True))
+            updated_count, failed_sites, timed_out_sites = summary['updated_count'], summary['failed_sites'], summary['timed_out_sites']
+            msg = f'Manual update: {updated_count} of {summary["total"]} sites updated.'
             if failed_sites: msg += f" Failed for: {', '.join(failed_sites)}."
-            return JsonResponse({'success': True, 'message': msg, 'updated_count': updated_count, 'failed_count': len(failed_sites)})
+            if timed_out_sites: msg += f" Timed out: {', '.join(timed_out_sites)}."
+            return JsonResponse({'success': True, 'message': msg, 'updated_count': updated_count, 'failed_count': len(failed_sites), 'timed_out_count': len(timed_out_sites), 'chunk_seconds': summary['chunk_seconds'], 'elapsed': summary['elapsed']})
         except Exception as e_bulk:
             logger.error(f"CRITICAL ERROR in bulk weather update endpoint: {e_bulk}", exc_info=True)
             return JsonResponse({'success': False, 'error': 'Internal server error during bulk update.'}, status=500)
-    return JsonResponse({'error': 'Method not allowed. Please use POST.'}, status=405)
\ No newline at end of file
+    return JsonResponse({'error': 'Method not allowed. Please use POST.'}, status=405)
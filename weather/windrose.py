@@ -0,0 +1,48 @@
+# weather/windrose.py
+import numpy as np
+
+WIND_ROSE_SECTORS = (16, 36)
+DEFAULT_SPEED_BIN_EDGES = (0, 2, 4, 6, 8, 10)  # m/s; the last bin is open-ended
+COMPASS_POINTS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+
+
+def sector_labels(sectors):
+    if sectors == 16:
+        return list(COMPASS_POINTS)
+    return [f"{direction:g}°" for direction in np.arange(sectors) * (360 / sectors)]
+
+
+def speed_bin_labels(edges):
+    labels = [f"{low:g}–{high:g} m/s" for low, high in zip(edges[:-1], edges[1:])]
+    return labels + [f"≥{edges[-1]:g} m/s"]
+
+
+def wind_rose_histogram(directions, speeds, sectors=16, speed_bin_edges=DEFAULT_SPEED_BIN_EDGES):
+    """Percentage of observations in each direction sector and speed bin.
+
+    Sectors are centred on north and run clockwise. ``speed_bin_edges`` are increasing lower
+    bounds in m/s; speeds below the first edge count in the first bin. Pairs with a missing
+    direction or speed are ignored. ``frequencies[b][s]`` is speed bin b in sector s, so each
+    speed bin is one stacked barpolar trace.
+    """
+    directions = np.asarray(directions, dtype=np.float64)
+    speeds = np.asarray(speeds, dtype=np.float64)
+    valid = np.isfinite(directions) & np.isfinite(speeds)
+    directions, speeds = directions[valid], speeds[valid]
+    edges = np.asarray(speed_bin_edges, dtype=np.float64)
+
+    width = 360 / sectors
+    sector = (np.mod(directions + width / 2, 360) // width).astype(np.intp) % sectors
+    speed_bin = np.clip(np.searchsorted(edges, speeds, side='right') - 1, 0, len(edges) - 1)
+    counts = np.bincount(speed_bin * sectors + sector, minlength=len(edges) * sectors).reshape(len(edges), sectors)
+    total = int(counts.sum())
+    frequencies = counts * (100 / total) if total else counts.astype(np.float64)
+    return {
+        'sectors': sectors,
+        'directions': (np.arange(sectors) * width).tolist(),
+        'sector_labels': sector_labels(sectors),
+        'speed_bins': speed_bin_labels(edges.tolist()),
+        'frequencies': np.round(frequencies, 2).tolist(),
+        'count': total,
+        'mean_speed': round(float(speeds.mean()), 2) if total else None,
+    }
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -75,13 +76,70 @@ WSGI_APPLICATION = 'weather_dashboard.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections are kept open so the pragmas in weather.db (WAL, synchronous=NORMAL, mmap,
+# busy_timeout) are applied once per worker thread. IMMEDIATE transactions take the write lock
+# up front, so a busy writer waits out busy_timeout instead of failing on a lock upgrade.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Observation, forecast and rollup history can live in its own SQLite file, so ingestion and
+# vacuums don't lock the site catalog, admin and sessions. See weather.db.TimeSeriesRouter;
+# after enabling it run `migrate --database=timeseries` and `move_timeseries`.
+if os.environ.get('WEATHER_TIMESERIES_DB'):
+    DATABASES['timeseries'] = {**DATABASES['default'], 'NAME': os.environ['WEATHER_TIMESERIES_DB']}
+DATABASE_ROUTERS = ['weather.db.TimeSeriesRouter']
+
+# Time-series inserts go through one writer thread per process (weather.observations), batched
+# every WEATHER_WRITER_FLUSH_MS or WEATHER_WRITER_BATCH_SIZE rows. Off on Vercel, where a
+# background thread can be frozen between invocations.
+WEATHER_WRITE_QUEUE = not os.environ.get('VERCEL')
+
+# True where the ingest_weather command runs on a schedule. The current-weather endpoint then
+# answers from its stored observations and only calls Open-Meteo once they are stale.
+WEATHER_INGESTION_ENABLED = os.environ.get('WEATHER_INGESTION_ENABLED', 'False') == 'True'
+
+
+# Cache
+# SQLite files on local disk, shared by every worker and process on the host. 'default' holds
+# API responses and single-flight locks; 'upstream' holds raw Open-Meteo responses so large
+# ensemble payloads cannot evict them.
+
+# Vercel lambdas can only write under /tmp.
+CACHE_DIR = os.environ.get('WEATHER_CACHE_DIR') or (
+    os.path.join(tempfile.gettempdir(), 'weather-cache') if os.environ.get('VERCEL') else BASE_DIR / '.cache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'weather.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'responses.sqlite3'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
+    'upstream': {
+        'BACKEND': 'weather.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'upstream.sqlite3'),
+        'TIMEOUT': 1800,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators